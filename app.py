@@ -1,6 +1,18 @@
 import streamlit as st
 import os
-from utils import summarize_text, generate_quiz, generate_study_tips
+import uuid
+from utils import summarize_text_stream, generate_quiz_stream, generate_study_pack, generate_study_tips, condense_chunks, grade_quiz, warm_up
+from backends import BACKEND_NAME
+from ingest import DOCUMENT_TYPES, save_upload, start_extraction, iter_chunks
+from jobs import get_job_manager, DONE, FAILED
+from cache import make_key
+from tip_library import SUBJECTS, LEARNING_STYLES, CHALLENGES, STUDY_TIMES, STUDY_ENVIRONMENTS
+from metrics import get_registry, start_metrics_server
+from sessions import get_session_store
+from review import GRADES, get_card_store
+
+# Metrics page for operators (set STUDYBUDDY_ADMIN to show it)
+ADMIN = os.environ.get("STUDYBUDDY_ADMIN", "") not in ("", "0", "false")
 
 # Page configuration
 st.set_page_config(
@@ -20,19 +32,336 @@ def display_logo():
     </div>
     """, unsafe_allow_html=True)
 
+# Check back on a background extraction until it finishes
+@st.fragment(run_every=1)
+def wait_for_extraction(job):
+    if job.done():
+        st.rerun()
+
+# Uploaded documents are saved to disk and extracted in the background,
+# so the text never has to pass through the page or session state
+def load_document(uploaded_file):
+    if uploaded_file is None:
+        return None
+    if "extractions" not in st.session_state:
+        st.session_state.extractions = {}
+    job = st.session_state.extractions.get(uploaded_file.file_id)
+    if job is None:
+        job = start_extraction(save_upload(uploaded_file))
+        st.session_state.extractions[uploaded_file.file_id] = job
+    if not job.done():
+        st.info(f"Extracting text from {uploaded_file.name}...")
+        wait_for_extraction(job)
+        return None
+    try:
+        text_path = job.result()
+    except Exception as e:
+        st.error(f"Could not read {uploaded_file.name}: {e}")
+        return None
+    st.success(f"Using {uploaded_file.name} as input.")
+    return text_path
+
+# Background generations: the model calls run in the job manager, and the
+# page only keeps the job ID, so reruns don't abort or repeat them
+def summary_job(text_input, document_path, summary_length):
+    if document_path:
+        text_input = condense_chunks(iter_chunks(document_path))
+    yield from summarize_text_stream(text_input, summary_length)
+
+def quiz_job(text_input, document_path, num_questions, question_type):
+    if document_path:
+        text_input = condense_chunks(iter_chunks(document_path))
+    # Large or mixed quizzes are split into concurrent smaller requests
+    parallel = question_type == "Mixed" or num_questions >= 6
+    yield from generate_quiz_stream(text_input, num_questions, question_type, parallel=parallel)
+
+def pack_job(text_input, document_path, summary_length, num_questions, question_type):
+    if document_path:
+        text_input = condense_chunks(iter_chunks(document_path))
+    pack = generate_study_pack(text_input, summary_length, num_questions, question_type)
+    # A new quiz starts unanswered
+    return dict(pack, answers={}, submitted=False)
+
+# A stable ID for this student, kept in the page URL: unlike the Streamlit
+# session ID it survives a page refresh
+def student_id():
+    sid = st.query_params.get("sid")
+    if not sid:
+        sid = uuid.uuid4().hex
+        st.query_params["sid"] = sid
+    return sid
+
+# Summaries, quizzes, answers and tips are kept compactly in the server-side
+# session store (see sessions.py) rather than in st.session_state
+def current_session():
+    return get_session_store().get(student_id())
+
+def save_session(session):
+    get_session_store().save(student_id(), session)
+
+# Review cards are kept per deck: this student's, unless they picked a
+# deck name on the Review page (also kept in the URL)
+def current_deck():
+    return st.query_params.get("deck") or student_id()
+
+def use_deck():
+    deck = st.session_state.deck_name.strip()
+    if deck:
+        st.query_params["deck"] = deck
+    elif "deck" in st.query_params:
+        del st.query_params["deck"]
+
+def start_job(job_key, kind, fn, *args, key=None):
+    try:
+        st.session_state[job_key] = get_job_manager().submit(kind, fn, *args, key=key)
+    except Exception as e:
+        st.error(f"An error occurred: {e}")
+
+# Follow a background job: show its progress, and once it ends store the
+# result in the session store and rerun the page
+@st.fragment(run_every=0.5)
+def follow_job(job_key, result_key, show_progress, finish=list):
+    manager = get_job_manager()
+    job = manager.get(st.session_state[job_key])
+    if job is None or job.done:
+        del st.session_state[job_key]
+        if job is not None and job.status == DONE:
+            session = current_session()
+            if job.kind == "pack":
+                # A study pack fills in the summary and the quiz together
+                for name, value in job.result.items():
+                    setattr(session, name, value)
+                st.session_state.pack_quiz = True
+            else:
+                setattr(session, result_key, finish(job.result))
+            save_session(session)
+        elif job is not None and job.status == FAILED:
+            st.session_state.job_error = job.error
+        st.rerun()
+    show_progress(list(job.partial))
+    if st.button("Cancel", key=f"cancel_{job_key}"):
+        manager.cancel(job.id)
+        del st.session_state[job_key]
+        st.rerun()
+
+def show_summary_progress(deltas):
+    st.subheader("Summary:")
+    st.write("".join(deltas) or "Generating summary...")
+
+def show_quiz_progress(questions):
+    st.subheader("Practice Quiz:")
+    st.info("Generating quiz questions...")
+    for idx, q in enumerate(questions):
+        st.markdown(f"**Question {idx+1}**: {q['question']}")
+        for option in q.get('options') or []:
+            st.markdown(f"- {option}")
+        st.markdown("---")
+
+def show_tips_progress(_):
+    st.info("Generating your personalized study tips...")
+
+# Quiz taking and grading. Answers are collected in a form, so picking an
+# answer doesn't rerun anything, and the fragment keeps the Submit rerun
+# to this section instead of the whole app.
+@st.fragment
+def quiz_section():
+    st.subheader("Practice Quiz:")
+    
+    session = current_session()
+    quiz = session.quiz
+    
+    # Once submitted the form is replaced by the results, so the quiz is graded
+    # and recorded for review only once
+    if not session.submitted:
+        form_slot = st.empty()
+        with form_slot.form("quiz_form"):
+            # Display each question
+            for idx, q in enumerate(quiz):
+                st.markdown(f"**Question {idx+1}**: {q['question']}")
+            
+                # Different display based on question type
+                if q['type'] == 'multiple_choice':
+                    st.radio(
+                        f"Select answer for question {idx+1}:",
+                        options=q['options'],
+                        key=f"q{idx}"
+                    )
+            
+                elif q['type'] == 'true_false':
+                    st.radio(
+                        f"Select answer for question {idx+1}:",
+                        options=["True", "False"],
+                        key=f"q{idx}"
+                    )
+            
+                elif q['type'] == 'fill_blank':
+                    st.text_input(
+                        f"Your answer for question {idx+1}:",
+                        key=f"q{idx}"
+                    )
+            
+                st.markdown("---")
+        
+            # Submit button for quiz
+            if st.form_submit_button("Submit Quiz"):
+                session.answers = {
+                    f"q{idx}": st.session_state.get(f"q{idx}")
+                    for idx in range(len(quiz))
+                }
+                session.correct_answers, results = grade_quiz(
+                    quiz,
+                    [st.session_state.get(f"q{idx}") for idx in range(len(quiz))]
+                )
+                session.submitted = True
+                save_session(session)
+                # Keep the questions for spaced review; missed ones are due right away
+                get_card_store().add_results(current_deck(), quiz, results)
+                form_slot.empty()
+    
+    # Display results if submitted
+    if session.submitted:
+        st.subheader("Quiz Results:")
+        st.success(f"You got {session.correct_answers} out of {len(quiz)} correct!")
+        
+        answers = session.answers
+        for idx, q in enumerate(quiz):
+            st.markdown(f"**Question {idx+1}**: {q['question']}")
+            st.markdown(f"Your answer: {answers.get(f'q{idx}')}")
+            st.markdown(f"Correct answer: {q['answer']}")
+            
+            if q.get('explanation'):
+                st.markdown(f"Explanation: {q['explanation']}")
+            
+            st.markdown("---")
+        
+        # Reset button (the rest of the page changes too, so rerun everything)
+        if st.button("Take Another Quiz"):
+            session.submitted = False
+            session.answers = {}
+            session.quiz = []
+            save_session(session)
+            st.rerun(scope="app")
+
+# Button callbacks run before the fragment reruns, so it shows the result straight away
+def reveal_card(card_id):
+    st.session_state.review_revealed = card_id
+
+def grade_card(card, grade):
+    get_card_store().review(card, grade)
+    st.session_state.pop("review_revealed", None)
+
+# Spaced-repetition review: one due card at a time, checked and
+# rescheduled locally, so reviewing never calls the model
+@st.fragment
+def review_section():
+    store = get_card_store()
+    deck = current_deck()
+    due, total = store.counts(deck)
+    card = store.next_due(deck)
+    if total == 0:
+        st.info("Your deck is empty. Questions from the quizzes you take will show up here for review.")
+        return
+    if card is None:
+        st.success(f"All caught up! Nothing is due right now ({total} cards in your deck).")
+        return
+    
+    st.caption(f"{due} due now · {total} cards in your deck")
+    q = card.question
+    st.markdown(f"**{q['question']}**")
+    
+    # Key the input to this review so it starts empty every time
+    answer_key = f"review_{card.id}_{card.repetitions}_{card.lapses}"
+    if q['type'] == 'multiple_choice':
+        answer = st.radio("Your answer:", options=q['options'], index=None, key=answer_key)
+    elif q['type'] == 'true_false':
+        answer = st.radio("Your answer:", options=["True", "False"], index=None, key=answer_key)
+    else:
+        answer = st.text_input("Your answer:", key=answer_key)
+    
+    if st.session_state.get("review_revealed") != card.id:
+        st.button("Show Answer", on_click=reveal_card, args=(card.id,))
+        return
+    
+    correct, _ = grade_quiz([q], [answer or None])
+    if correct:
+        st.success(f"Correct! The answer is: {q['answer']}")
+    else:
+        st.error(f"The answer is: {q['answer']}")
+    if q.get('explanation'):
+        st.markdown(f"Explanation: {q['explanation']}")
+    
+    st.markdown("How well did you remember it?")
+    for column, (label, grade) in zip(st.columns(len(GRADES)), GRADES.items()):
+        column.button(label, key=f"grade_{label}", on_click=grade_card, args=(card, grade),
+                      use_container_width=True)
+
+# Live view of the process-wide metrics, refreshed every few seconds
+@st.fragment(run_every=2)
+def metrics_dashboard():
+    counters, histograms = get_registry().snapshot()
+    if not counters and not histograms:
+        st.info("No calls recorded yet.")
+        return
+    
+    def describe(name, labels):
+        return name + "".join(f" {key}={value}" for key, value in labels)
+    
+    def at_most(value):
+        return "-" if value is None else f"≤ {value:g}"
+    
+    st.markdown("#### Latency and size")
+    st.dataframe(
+        [
+            {
+                "metric": describe(name, labels),
+                "count": histogram.count,
+                "mean": round(histogram.sum / histogram.count, 3),
+                "p50": at_most(histogram.quantile(0.5)),
+                "p95": at_most(histogram.quantile(0.95)),
+                "p99": at_most(histogram.quantile(0.99)),
+            }
+            for (name, labels), histogram in sorted(histograms.items())
+        ],
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    choices = {describe(name, labels): histogram for (name, labels), histogram in sorted(histograms.items())}
+    choice = st.selectbox("Histogram", list(choices), key="metrics_histogram")
+    histogram = choices[choice]
+    previous = 0
+    rows = []
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        rows.append({"bucket": at_most(bound), "calls": count - previous})
+        previous = count
+    st.dataframe(
+        rows,
+        column_config={
+            "calls": st.column_config.ProgressColumn("calls", format="%d", min_value=0,
+                                                     max_value=max(histogram.count, 1))
+        },
+        use_container_width=True,
+        hide_index=True
+    )
+    
+    st.markdown("#### Counters")
+    st.dataframe(
+        [{"metric": describe(name, labels), "value": value} for (name, labels), value in sorted(counters.items())],
+        use_container_width=True,
+        hide_index=True
+    )
+
 # App header
 st.title("Study Buddy: AI-Powered Learning Assistant")
 st.subheader("Your personal AI assistant for better studying")
 
+# Prometheus endpoint, if STUDYBUDDY_METRICS_PORT is set (starts once per process)
+start_metrics_server()
+
 # Initialize session state
 if "page" not in st.session_state:
     st.session_state.page = "home"
-if "summary" not in st.session_state:
-    st.session_state.summary = ""
-if "quiz" not in st.session_state:
-    st.session_state.quiz = []
-if "tips" not in st.session_state:
-    st.session_state.tips = []
+session = current_session()
 
 # Sidebar navigation
 st.sidebar.title("Navigation")
@@ -46,6 +375,10 @@ if st.sidebar.button("Quiz Generator", use_container_width=True):
     st.session_state.page = "quiz"
 if st.sidebar.button("Study Tips", use_container_width=True):
     st.session_state.page = "tips"
+if st.sidebar.button("Review", use_container_width=True):
+    st.session_state.page = "review"
+if ADMIN and st.sidebar.button("Metrics", use_container_width=True):
+    st.session_state.page = "metrics"
 
 # About section in sidebar
 st.sidebar.markdown("---")
@@ -56,9 +389,9 @@ st.sidebar.info(
     "personalized study tips."
 )
 
-# Check for API key
+# Check for API key (the offline fake backend doesn't need one)
 api_key = os.environ.get("OPENAI_API_KEY")
-if not api_key:
+if not api_key and BACKEND_NAME != "fake":
     st.error(
         "OpenAI API key not found. Please set the OPENAI_API_KEY environment variable."
     )
@@ -75,6 +408,7 @@ if st.session_state.page == "home":
     - **Text Summarizer**: Condense your notes or textbook content into concise summaries
     - **Quiz Generator**: Create practice questions from your study material
     - **Study Tips**: Get personalized study recommendations based on your preferences
+    - **Review**: Go back over your quiz questions with spaced repetition
     
     Use the navigation menu on the left to get started!
     """)
@@ -117,6 +451,13 @@ elif st.session_state.page == "summarizer":
         placeholder="Paste your notes or textbook content here..."
     )
     
+    # Or upload a whole document
+    document_path = load_document(st.file_uploader(
+        "Or upload a document:",
+        type=DOCUMENT_TYPES,
+        key="summarizer_upload"
+    ))
+    
     # Summary length options
     summary_length = st.select_slider(
         "Summary Length",
@@ -124,33 +465,62 @@ elif st.session_state.page == "summarizer":
         value="Medium"
     )
     
+    # A practice quiz can come from the same request as the summary
+    with_quiz = st.checkbox("Also make a practice quiz")
+    if with_quiz:
+        col1, col2 = st.columns(2)
+        with col1:
+            pack_questions = st.slider("Number of Questions", min_value=1, max_value=10, value=5, key="pack_questions")
+        with col2:
+            pack_type = st.selectbox(
+                "Question Type",
+                options=["Multiple Choice", "True/False", "Fill in the Blank", "Mixed"],
+                key="pack_type"
+            )
+    
     # Process text when button is clicked
     if st.button("Generate Summary"):
-        if text_input:
-            with st.spinner("Generating summary..."):
-                try:
-                    summary = summarize_text(text_input, summary_length)
-                    st.session_state.summary = summary
-                except Exception as e:
-                    st.error(f"An error occurred: {e}")
+        if (text_input or document_path) and with_quiz:
+            st.session_state.pop("pack_quiz", None)
+            start_job(
+                "summary_job", "pack", pack_job, text_input, document_path, summary_length, pack_questions, pack_type,
+                key=make_key("pack", document_path or text_input, summary_length=summary_length,
+                             num_questions=pack_questions, question_type=pack_type)
+            )
+        elif text_input or document_path:
+            start_job(
+                "summary_job", "summary", summary_job, text_input, document_path, summary_length,
+                key=make_key("summary", document_path or text_input, summary_length=summary_length)
+            )
         else:
             st.warning("Please enter some text to summarize.")
     
+    if "job_error" in st.session_state:
+        st.error(f"An error occurred: {st.session_state.pop('job_error')}")
+    
+    # Show the summary as it is written; the display below takes over once it's done
+    if "summary_job" in st.session_state:
+        follow_job("summary_job", "summary", show_summary_progress, finish="".join)
+    
     # Display summary if available
-    if st.session_state.summary:
+    if session.summary:
         st.subheader("Summary:")
-        st.write(st.session_state.summary)
+        st.write(session.summary)
         
         # Download button for summary
         st.download_button(
             label="Download Summary",
-            data=st.session_state.summary,
+            data=session.summary,
             file_name="summary.txt",
             mime="text/plain"
         )
         
-        # Option to generate quiz from summary
-        if st.button("Generate Quiz from Summary"):
+        # Take the quiz made with the summary, or generate one from it
+        if st.session_state.get("pack_quiz") and session.quiz:
+            if st.button("Take the Practice Quiz"):
+                st.session_state.page = "quiz"
+                st.rerun()
+        elif st.button("Generate Quiz from Summary"):
             st.session_state.page = "quiz"
             st.rerun()
 
@@ -160,8 +530,9 @@ elif st.session_state.page == "quiz":
     st.markdown("Generate practice questions from your study material.")
     
     # Input text area (with option to use summary if available)
-    if st.session_state.summary and st.checkbox("Use my previous summary"):
-        text_input = st.session_state.summary
+    document_path = None
+    if session.summary and st.checkbox("Use my previous summary"):
+        text_input = session.summary
         st.success("Using your previous summary as input.")
     else:
         text_input = st.text_area(
@@ -169,6 +540,11 @@ elif st.session_state.page == "quiz":
             height=200,
             placeholder="Paste your notes or textbook content here..."
         )
+        document_path = load_document(st.file_uploader(
+            "Or upload a document:",
+            type=DOCUMENT_TYPES,
+            key="quiz_upload"
+        ))
     
     # Quiz options
     col1, col2 = st.columns(2)
@@ -182,104 +558,25 @@ elif st.session_state.page == "quiz":
     
     # Generate quiz button
     if st.button("Generate Quiz"):
-        if text_input:
-            with st.spinner("Generating quiz questions..."):
-                try:
-                    quiz = generate_quiz(text_input, num_questions, question_type)
-                    st.session_state.quiz = quiz
-                except Exception as e:
-                    st.error(f"An error occurred: {e}")
+        if text_input or document_path:
+            start_job(
+                "quiz_job", "quiz", quiz_job, text_input, document_path, num_questions, question_type,
+                key=make_key("quiz", document_path or text_input, num_questions=num_questions, question_type=question_type)
+            )
         else:
             st.warning("Please enter some text to generate questions from.")
     
+    if "job_error" in st.session_state:
+        st.error(f"An error occurred: {st.session_state.pop('job_error')}")
+    
+    # Preview each question as it arrives; the interactive quiz below
+    # takes over once the whole quiz is ready
+    if "quiz_job" in st.session_state:
+        follow_job("quiz_job", "quiz", show_quiz_progress)
+    
     # Display quiz if available
-    if st.session_state.quiz:
-        st.subheader("Practice Quiz:")
-        
-        # Count for correct answers
-        if "correct_answers" not in st.session_state:
-            st.session_state.correct_answers = 0
-            st.session_state.submitted = False
-            st.session_state.answers = {}
-        
-        # Display each question
-        for idx, q in enumerate(st.session_state.quiz):
-            st.markdown(f"**Question {idx+1}**: {q['question']}")
-            
-            # Different display based on question type
-            if q['type'] == 'multiple_choice':
-                answer = st.radio(
-                    f"Select answer for question {idx+1}:",
-                    options=q['options'],
-                    key=f"q{idx}"
-                )
-                if f"q{idx}" not in st.session_state.answers:
-                    st.session_state.answers[f"q{idx}"] = None
-            
-            elif q['type'] == 'true_false':
-                answer = st.radio(
-                    f"Select answer for question {idx+1}:",
-                    options=["True", "False"],
-                    key=f"q{idx}"
-                )
-                if f"q{idx}" not in st.session_state.answers:
-                    st.session_state.answers[f"q{idx}"] = None
-            
-            elif q['type'] == 'fill_blank':
-                answer = st.text_input(
-                    f"Your answer for question {idx+1}:",
-                    key=f"q{idx}"
-                )
-                if f"q{idx}" not in st.session_state.answers:
-                    st.session_state.answers[f"q{idx}"] = None
-            
-            st.markdown("---")
-        
-        # Submit button for quiz
-        if st.button("Submit Quiz"):
-            st.session_state.submitted = True
-            st.session_state.correct_answers = 0
-            
-            # Check answers
-            for idx, q in enumerate(st.session_state.quiz):
-                user_answer = st.session_state[f"q{idx}"]
-                st.session_state.answers[f"q{idx}"] = user_answer
-                
-                if q['type'] == 'multiple_choice':
-                    if user_answer == q['answer']:
-                        st.session_state.correct_answers += 1
-                
-                elif q['type'] == 'true_false':
-                    if user_answer.lower() == q['answer'].lower():
-                        st.session_state.correct_answers += 1
-                
-                elif q['type'] == 'fill_blank':
-                    if user_answer.lower() == q['answer'].lower():
-                        st.session_state.correct_answers += 1
-            
-            st.rerun()
-        
-        # Display results if submitted
-        if st.session_state.submitted:
-            st.subheader("Quiz Results:")
-            st.success(f"You got {st.session_state.correct_answers} out of {len(st.session_state.quiz)} correct!")
-            
-            for idx, q in enumerate(st.session_state.quiz):
-                st.markdown(f"**Question {idx+1}**: {q['question']}")
-                st.markdown(f"Your answer: {st.session_state.answers[f'q{idx}']}")
-                st.markdown(f"Correct answer: {q['answer']}")
-                
-                if q.get('explanation'):
-                    st.markdown(f"Explanation: {q['explanation']}")
-                
-                st.markdown("---")
-            
-            # Reset button
-            if st.button("Take Another Quiz"):
-                st.session_state.submitted = False
-                st.session_state.answers = {}
-                st.session_state.quiz = []
-                st.rerun()
+    if session.quiz:
+        quiz_section()
 
 # Study Tips page
 elif st.session_state.page == "tips":
@@ -295,27 +592,19 @@ elif st.session_state.page == "tips":
         with col1:
             subject = st.selectbox(
                 "What subject are you studying?",
-                ["Math", "Science", "History", "Literature", "Languages", "Computer Science", "Other"]
+                SUBJECTS
             )
         
         with col2:
             learning_style = st.selectbox(
                 "What's your preferred learning style?",
-                ["Visual", "Auditory", "Reading/Writing", "Kinesthetic", "I'm not sure"]
+                LEARNING_STYLES
             )
         
         # Study challenges
         challenges = st.multiselect(
             "What challenges do you face when studying?",
-            [
-                "Staying focused", 
-                "Remembering information",
-                "Understanding complex concepts",
-                "Finding motivation",
-                "Managing study time",
-                "Test anxiety",
-                "Information overload"
-            ]
+            CHALLENGES
         )
         
         # Study schedule
@@ -323,13 +612,13 @@ elif st.session_state.page == "tips":
         with col1:
             study_time = st.select_slider(
                 "How much time do you typically spend studying per day?",
-                options=["Less than 1 hour", "1-2 hours", "2-3 hours", "3-4 hours", "4+ hours"]
+                options=STUDY_TIMES
             )
         
         with col2:
             study_environment = st.selectbox(
                 "Where do you usually study?",
-                ["At home", "Library", "Coffee shop", "School/Campus", "Different places"]
+                STUDY_ENVIRONMENTS
             )
         
         # Additional notes
@@ -343,37 +632,42 @@ elif st.session_state.page == "tips":
     
     # Process form submission
     if submitted:
-        with st.spinner("Generating your personalized study tips..."):
-            try:
-                # Compile study profile
-                study_profile = {
-                    "subject": subject,
-                    "learning_style": learning_style,
-                    "challenges": challenges,
-                    "study_time": study_time,
-                    "study_environment": study_environment,
-                    "additional_info": additional_info
-                }
-                
-                # Generate personalized tips
-                tips = generate_study_tips(study_profile)
-                st.session_state.tips = tips
-            except Exception as e:
-                st.error(f"An error occurred: {e}")
+        # Compile study profile
+        study_profile = {
+            "subject": subject,
+            "learning_style": learning_style,
+            "challenges": challenges,
+            "study_time": study_time,
+            "study_environment": study_environment,
+            "additional_info": additional_info
+        }
+        
+        # Generate personalized tips
+        start_job(
+            "tips_job", "tips", generate_study_tips, study_profile,
+            key=make_key("tips", additional_info, study_profile=dict(study_profile, challenges=sorted(challenges)))
+        )
+    
+    if "job_error" in st.session_state:
+        st.error(f"An error occurred: {st.session_state.pop('job_error')}")
+    
+    if "tips_job" in st.session_state:
+        follow_job("tips_job", "tips", show_tips_progress)
     
     # Display tips if available
-    if st.session_state.tips:
+    tips = session.tips
+    if tips:
         st.subheader("Your Personalized Study Tips:")
         
         # Display each category of tips
-        for category in st.session_state.tips:
+        for category in tips:
             with st.expander(f"{category['title']}", expanded=True):
                 for tip in category['tips']:
                     st.markdown(f"- {tip}")
         
         # Option to download tips
         tips_text = ""
-        for category in st.session_state.tips:
+        for category in tips:
             tips_text += f"# {category['title']}\n\n"
             for tip in category['tips']:
                 tips_text += f"- {tip}\n"
@@ -385,3 +679,27 @@ elif st.session_state.page == "tips":
             file_name="study_tips.txt",
             mime="text/plain"
         )
+
+# Review page
+elif st.session_state.page == "review":
+    st.header("Review")
+    st.markdown("Go over questions from your quizzes, each one just before you'd forget it.")
+    
+    st.text_input(
+        "Deck name (enter the same name next time to keep your cards):",
+        value=st.query_params.get("deck", ""),
+        key="deck_name",
+        on_change=use_deck
+    )
+    
+    review_section()
+
+# Metrics page (operators only)
+elif st.session_state.page == "metrics" and ADMIN:
+    st.header("Metrics")
+    st.write("Model calls, cache lookups and parsing in this server process since it started.")
+    metrics_dashboard()
+
+# Now that the page is on screen, load the model client and caches in the
+# background so the first request doesn't pay for them (once per process)
+warm_up()
@@ -0,0 +1,283 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from openai import RateLimitError
+
+from backends import MODEL, get_backend
+from cache import get_cache, make_key
+from chunking import estimate_tokens
+from dedup import NearDuplicateFilter
+from http_client import rate_limit_retries
+from precompress import precompress
+from routing import route_quiz, route_summary
+from utils import (QUIZ_DUPLICATE_THRESHOLD, QUIZ_TOP_UP_ATTEMPTS, condense_for_summary, parse_quiz, quiz_prompt,
+                   summary_prompt)
+
+# Default limits; set these to your account's rate limits
+REQUESTS_PER_MINUTE = 500
+TOKENS_PER_MINUTE = 30000
+CONCURRENCY = 8
+MAX_RETRIES = 6
+
+
+class TokenBucket:
+    """
+    Token bucket that refills continuously at `rate_per_minute`.
+
+    A request for more than the bucket's capacity waits for a full bucket
+    and then takes all of it, so oversized requests still go through.
+    """
+
+    def __init__(self, rate_per_minute):
+        self.capacity = rate_per_minute
+        self.available = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.available < amount:
+                await asyncio.sleep((amount - self.available) / self.rate)
+                self._refill()
+            self.available -= amount
+
+
+class AdaptiveBackoff:
+    """
+    Shared pause that every request honours after a 429.
+
+    Each rate-limit error doubles the pause (up to `max_delay`) and holds all
+    new requests until it has passed; each success halves it again.
+    """
+
+    def __init__(self, base_delay=1.0, max_delay=60.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.delay = 0.0
+        self.resume_at = 0.0
+
+    async def wait(self):
+        pause = self.resume_at - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+    def rate_limited(self, retry_after=None):
+        self.delay = min(self.max_delay, max(self.base_delay, self.delay * 2))
+        delay = max(self.delay, retry_after or 0)
+        # Jitter so the waiting requests don't all fire at the same instant
+        self.resume_at = max(self.resume_at, time.monotonic() + delay * random.uniform(1.0, 1.5))
+
+    def succeeded(self):
+        self.delay /= 2
+
+
+def _retry_after(error):
+    try:
+        return float(error.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class BatchRunner:
+    """
+    Runs model calls for a batch under a concurrency limit, request and token
+    rate limits, and adaptive backoff on rate-limit errors.
+
+    Calls go through the configured backend (see backends.get_backend), on a
+    thread pool sized to the concurrency limit, so the fake backend and the
+    stub server work here too. The backend's own 429 retries are turned off
+    for these calls, so every rate-limit error feeds the shared backoff.
+    Long documents are condensed section by section by
+    utils.condense_for_summary first, like in the app; those section calls
+    are not counted against the rate limits here.
+
+    Use it as a context manager, or call close(), to shut down its threads.
+    """
+
+    def __init__(self, concurrency=CONCURRENCY, requests_per_minute=REQUESTS_PER_MINUTE,
+                 tokens_per_minute=TOKENS_PER_MINUTE, max_retries=MAX_RETRIES, backend=None):
+        self.backend = backend
+        # Model calls and condensing run here, off the event loop
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-call")
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.backoff = AdaptiveBackoff()
+        self.max_retries = max_retries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shut down the thread pool without waiting for calls still queued"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _in_thread(self, fn, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, lambda: fn(*args, **kwargs))
+
+    @staticmethod
+    def _complete_once(backend, prompt, max_tokens, json_mode, model, operation):
+        # A 429 comes straight back here instead of being retried by the backend
+        with rate_limit_retries(False):
+            return backend.complete(prompt, max_tokens, json_mode=json_mode, model=model, operation=operation)
+
+    async def complete(self, prompt, max_tokens, json_mode=False, model=MODEL, operation=None):
+        """
+        Send one chat completion, waiting for rate-limit capacity first
+
+        Args:
+            prompt (str): The user prompt
+            max_tokens (int): Completion token limit
+            json_mode (bool): Whether to request a JSON object response
+            model (str): Model name
+            operation (str): What the call is for (e.g. "summary"), for deadlines and metrics
+
+        Returns:
+            str: The message content
+        """
+        backend = self.backend or get_backend()
+        for attempt in range(self.max_retries + 1):
+            await self.backoff.wait()
+            await self.requests.acquire(1)
+            await self.tokens.acquire(estimate_tokens(prompt) + max_tokens)
+            async with self.semaphore:
+                try:
+                    content = await self._in_thread(self._complete_once, backend, prompt, max_tokens, json_mode,
+                                                    model, operation)
+                except RateLimitError as e:
+                    # Pause every request, not just this one
+                    if attempt == self.max_retries:
+                        raise
+                    self.backoff.rate_limited(_retry_after(e))
+                    continue
+            self.backoff.succeeded()
+            return content
+
+    async def summarize(self, text, summary_length="Medium"):
+        cache = get_cache()
+        cache_key = make_key("summary", text, summary_length=summary_length)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+        condensed = await self._in_thread(condense_for_summary, text)
+        route = route_summary(condensed, summary_length)
+        summary = await self.complete(summary_prompt(condensed, summary_length), route.max_tokens,
+                                      model=route.model, operation="summary")
+        cache.set(cache_key, summary)
+        return summary
+
+    async def quiz(self, text, num_questions=5, question_type="Mixed"):
+        cache = get_cache()
+        cache_key = make_key("quiz", text, num_questions=num_questions, question_type=question_type)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+        # Trimmed to one prompt's worth, as in utils.generate_quiz
+        source = (await self._in_thread(precompress, text, operation="quiz")).text
+        seen = NearDuplicateFilter(QUIZ_DUPLICATE_THRESHOLD)
+        result = []
+        # The first request, then top-ups for anything dropped as invalid or duplicate
+        for attempt in range(QUIZ_TOP_UP_ATTEMPTS + 1):
+            shortfall = num_questions - len(result)
+            if shortfall <= 0:
+                break
+            route = route_quiz(source, shortfall, question_type)
+            content = await self.complete(quiz_prompt(source, shortfall, question_type), route.max_tokens,
+                                          json_mode=True, model=route.model, operation="quiz")
+            try:
+                questions = parse_quiz(content)
+            except ValueError:
+                if attempt == 0:
+                    raise
+                continue
+            result += [q for q in questions if seen.add(q["question"])][:shortfall]
+        cache.set(cache_key, result)
+        return result
+
+
+async def batch_generate(documents, summary_length="Medium", num_questions=5, question_type="Mixed",
+                         include_summary=True, include_quiz=True, concurrency=CONCURRENCY,
+                         requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                         max_retries=MAX_RETRIES):
+    """
+    Generate summaries and quizzes for many documents concurrently
+
+    Documents are read lazily, so only about `concurrency` of them are held
+    in memory at once.
+
+    Args:
+        documents (iterable): Document texts, or (doc_id, text) pairs
+        summary_length (str): The desired length of each summary
+        num_questions (int): Number of questions per quiz
+        question_type (str): Type of questions to generate
+        include_summary (bool): Whether to generate summaries
+        include_quiz (bool): Whether to generate quizzes
+        concurrency (int): Maximum number of requests in flight
+        requests_per_minute (int): Request rate limit
+        tokens_per_minute (int): Prompt plus completion token rate limit
+        max_retries (int): Retries per request after a rate-limit error
+
+    Yields:
+        dict: {"id", "summary", "quiz", "error"} for each document, in completion order
+    """
+    runner = BatchRunner(concurrency, requests_per_minute, tokens_per_minute, max_retries)
+
+    async def process(doc_id, text):
+        result = {"id": doc_id, "summary": None, "quiz": None, "error": None}
+        jobs = {}
+        if include_summary:
+            jobs["summary"] = runner.summarize(text, summary_length)
+        if include_quiz:
+            jobs["quiz"] = runner.quiz(text, num_questions, question_type)
+        outcomes = await asyncio.gather(*jobs.values(), return_exceptions=True)
+        errors = []
+        for name, outcome in zip(jobs, outcomes):
+            if isinstance(outcome, Exception):
+                errors.append(f"Error generating {name}: {outcome}")
+            else:
+                result[name] = outcome
+        if errors:
+            result["error"] = "; ".join(errors)
+        return result
+
+    def numbered(items):
+        for index, item in enumerate(items):
+            if isinstance(item, str):
+                yield index, item
+            else:
+                yield item
+
+    queue = numbered(documents)
+    pending = set()
+
+    def fill():
+        for doc_id, text in queue:
+            pending.add(asyncio.ensure_future(process(doc_id, text)))
+            if len(pending) >= concurrency:
+                break
+
+    fill()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.discard(task)
+                yield task.result()
+            fill()
+    finally:
+        for task in pending:
+            task.cancel()
+        runner.close()
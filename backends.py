@@ -0,0 +1,300 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from chunking import estimate_tokens
+from http_client import HedgedCaller, call_with_retries, make_openai_client
+from metrics import track_call
+
+# Which backend the generator functions use: "openai" or "fake"
+BACKEND_NAME = os.environ.get("STUDYBUDDY_BACKEND", "openai")
+
+# the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
+# do not change this unless explicitly requested by the user
+MODEL = "gpt-4o"
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+
+
+class LLMBackend:
+    """
+    Interface the generator functions in utils.py call through.
+
+    Subclasses implement `complete` for a whole response and `stream` for a
+    response delivered as text deltas.
+    """
+
+    def complete(self, prompt, max_tokens, temperature=0.7, json_mode=False, model=MODEL, operation=None):
+        """
+        Run a single-prompt chat completion
+
+        Args:
+            prompt (str): The user prompt
+            max_tokens (int): Completion token limit
+            temperature (float): Sampling temperature
+            json_mode (bool): Whether to request a JSON object response
+            model (str): Model name
+            operation (str): What the call is for (e.g. "summary"); sets its deadline
+
+        Returns:
+            str: The message content
+        """
+        raise NotImplementedError
+
+    def stream(self, prompt, max_tokens, temperature=0.7, json_mode=False, model=MODEL, operation=None):
+        """
+        Run a single-prompt chat completion, yielding text as it is generated
+
+        Args:
+            prompt (str): The user prompt
+            max_tokens (int): Completion token limit
+            temperature (float): Sampling temperature
+            json_mode (bool): Whether to request a JSON object response
+            model (str): Model name
+            operation (str): What the call is for (e.g. "summary"); sets its deadline
+
+        Yields:
+            str: Pieces of the message content in order
+        """
+        raise NotImplementedError
+
+
+class OpenAIBackend(LLMBackend):
+    """Backend for the OpenAI API, or anything speaking its chat-completions protocol"""
+
+    def __init__(self, api_key=OPENAI_API_KEY, base_url=None, hedge=None):
+        # base_url falls back to the OPENAI_BASE_URL environment variable
+        self.client = make_openai_client(api_key=api_key, base_url=base_url)
+        self.caller = HedgedCaller() if hedge is None else HedgedCaller(hedge=hedge)
+
+    def complete(self, prompt, max_tokens, temperature=0.7, json_mode=False, model=MODEL, operation=None):
+        kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+
+        def call(timeout):
+            return self.client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                timeout=timeout,
+                **kwargs
+            )
+
+        with track_call(operation, model, max_tokens=max_tokens, temperature=temperature,
+                        json_mode=json_mode) as record:
+            response = self.caller.call(call, operation, on_retry=record.retry, on_hedge=record.hedge)
+            if response.usage is not None:
+                record.usage(response.usage.prompt_tokens, response.usage.completion_tokens)
+        return response.choices[0].message.content
+
+    def stream(self, prompt, max_tokens, temperature=0.7, json_mode=False, model=MODEL, operation=None):
+        kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+
+        def call(timeout):
+            return self.client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                stream_options={"include_usage": True},
+                timeout=timeout,
+                **kwargs
+            )
+
+        with track_call(operation, model, max_tokens=max_tokens, temperature=temperature,
+                        json_mode=json_mode, stream=True) as record:
+            # Only opening the stream is retried; once text has been yielded it can't be taken back
+            stream = call_with_retries(call, operation, on_retry=record.retry)
+            for chunk in stream:
+                if chunk.usage is not None:
+                    record.usage(chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    record.first_token()
+                    yield delta
+
+
+FAKE_QUESTIONS = [
+    {
+        "question": "Which statement best describes {subject}?",
+        "type": "multiple_choice",
+        "options": ["The first option", "The second option", "The third option", "The fourth option"],
+        "answer": "The first option",
+        "explanation": "The text focuses on the first option."
+    },
+    {
+        "question": "The text presents {subject} as a settled fact.",
+        "type": "true_false",
+        "answer": "True",
+        "explanation": "The text states the concept directly."
+    },
+    {
+        "question": "Fill in the blank: _____ is central to {subject}.",
+        "type": "fill_blank",
+        "answer": "Studying",
+        "explanation": "The text is about studying."
+    },
+]
+
+# Filled into the questions' {subject}, each subject with each context in
+# turn, so that canned questions are distinct and not dropped as near-duplicates
+FAKE_QUESTION_SUBJECTS = [
+    "the main idea of the text", "the author's central argument", "the first key term introduced",
+    "the cause of the process described", "the effect of changing one condition",
+    "the difference between the two main concepts", "the example given in the opening section",
+    "the final conclusion", "the role of energy in the process", "the sequence of steps described",
+    "the evidence offered for the main claim", "the most important definition",
+    "how the parts of the system interact", "why the process matters in practice",
+    "what limits the rate of the process", "the inputs the process needs", "the outputs the process produces",
+    "where the process takes place", "a common misconception the text corrects",
+    "the historical background given", "how the key terms relate to each other",
+    "the exception mentioned near the end", "the comparison drawn in the middle section",
+    "the question the text leaves open",
+]
+FAKE_QUESTION_CONTEXTS = [
+    "as the text first presents it", "in the worked example", "in the summary at the end",
+    "in the second half of the notes", "compared with the rest of the material", "as it applies in practice",
+    "according to the opening paragraph", "in the terms of the glossary",
+]
+
+FAKE_TIP_CATEGORIES = [
+    "Study Environment Optimization",
+    "Learning Techniques",
+    "Memory and Retention Strategies",
+    "Focus and Motivation Tips",
+    "Time Management Strategies",
+]
+
+# How many distinct quiz prompts the fake backend counts repeats of
+FAKE_MAX_TRACKED_PROMPTS = 65536
+
+_QUESTION_COUNT = re.compile(r"Create (\d+) educational")
+_WORD_TARGET = re.compile(r"around (\d+) words")
+
+
+class FakeBackend(LLMBackend):
+    """
+    Deterministic in-process stand-in for the model. Quiz questions depend
+    only on the prompt and how many times that same prompt was sent before,
+    never on other calls, so results don't depend on run order.
+
+    Responses take `latency` seconds to the first token and then arrive at
+    `tokens_per_second`. Quiz, study-pack and study-tip prompts get canned
+    JSON in the shape the real model returns; anything else gets plain text
+    built from the prompt's own words.
+    """
+
+    def __init__(self, latency=0.5, tokens_per_second=80.0, quiz_questions=None, tip_categories=None):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.quiz_questions = quiz_questions or FAKE_QUESTIONS
+        self.tip_categories = tip_categories or FAKE_TIP_CATEGORIES
+        self._repeats = {}
+        self._repeats_lock = threading.Lock()
+
+    def respond(self, prompt, max_tokens, json_mode=False):
+        """
+        Build the canned response for a prompt without any delay
+
+        Args:
+            prompt (str): The user prompt
+            max_tokens (int): Completion token limit
+            json_mode (bool): Whether a JSON object response was requested
+
+        Returns:
+            str: The response content
+        """
+        quiz = _QUESTION_COUNT.search(prompt)
+        if quiz:
+            count = int(quiz.group(1))
+            questions = [dict(self.quiz_questions[i % len(self.quiz_questions)]) for i in range(count)]
+            # Like a model sampling with temperature, a different prompt or a
+            # repeat of the same one gets different questions
+            digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+            with self._repeats_lock:
+                if len(self._repeats) >= FAKE_MAX_TRACKED_PROMPTS:
+                    self._repeats.clear()
+                repeat = self._repeats[digest] = self._repeats.get(digest, -1) + 1
+            start = int.from_bytes(digest[:4], "big") + repeat * count
+            for i, question in enumerate(questions):
+                number = (start + i) % (len(FAKE_QUESTION_SUBJECTS) * len(FAKE_QUESTION_CONTEXTS))
+                subject, context = divmod(number, len(FAKE_QUESTION_CONTEXTS))
+                subject = f"{FAKE_QUESTION_SUBJECTS[subject]} {FAKE_QUESTION_CONTEXTS[context]}"
+                question["question"] = f"{question['question'].replace('{subject}', subject)} ({number + 1})"
+            target = _WORD_TARGET.search(prompt)
+            if target:
+                # A study pack: a summary and a quiz in one response
+                words = prompt.split()
+                summary = " ".join(words[i % len(words)] for i in range(int(target.group(1))))
+                return json.dumps({"summary": summary, "questions": questions})
+            return json.dumps({"questions": questions})
+        if json_mode:
+            categories = [
+                {"title": title, "tips": [f"{title} tip {i}" for i in range(1, 4)]}
+                for title in self.tip_categories
+            ]
+            return json.dumps({"categories": categories})
+        target = _WORD_TARGET.search(prompt)
+        words = prompt.split() or ["summary"]
+        count = min(int(target.group(1)) if target else 100, max_tokens)
+        return " ".join(words[i % len(words)] for i in range(count))
+
+    def complete(self, prompt, max_tokens, temperature=0.7, json_mode=False, model=MODEL, operation=None):
+        with track_call(operation, model, max_tokens=max_tokens, temperature=temperature,
+                        json_mode=json_mode) as record:
+            content = self.respond(prompt, max_tokens, json_mode)
+            time.sleep(self.latency + estimate_tokens(content) / self.tokens_per_second)
+            record.usage(estimate_tokens(prompt), estimate_tokens(content))
+        return content
+
+    def stream(self, prompt, max_tokens, temperature=0.7, json_mode=False, model=MODEL, operation=None):
+        with track_call(operation, model, max_tokens=max_tokens, temperature=temperature,
+                        json_mode=json_mode, stream=True) as record:
+            content = self.respond(prompt, max_tokens, json_mode)
+            time.sleep(self.latency)
+            for piece in re.findall(r"\S+\s*|\s+", content):
+                time.sleep(1 / self.tokens_per_second)
+                record.first_token()
+                yield piece
+            record.usage(estimate_tokens(prompt), estimate_tokens(content))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    Return the backend the generator functions call, creating it on first use
+
+    Returns:
+        LLMBackend: The configured backend (see STUDYBUDDY_BACKEND)
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if BACKEND_NAME == "fake":
+                    _backend = FakeBackend(
+                        latency=float(os.environ.get("STUDYBUDDY_FAKE_LATENCY", "0.5")),
+                        tokens_per_second=float(os.environ.get("STUDYBUDDY_FAKE_TOKENS_PER_SECOND", "80")),
+                    )
+                else:
+                    _backend = OpenAIBackend()
+    return _backend
+
+
+def set_backend(backend):
+    """
+    Replace the backend used by the generator functions
+
+    Args:
+        backend (LLMBackend): The backend to use from now on
+    """
+    global _backend
+    _backend = backend
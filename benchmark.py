@@ -0,0 +1,195 @@
+"""
+Latency and throughput benchmark for the generator functions in utils.py.
+
+Runs summarize_text, generate_quiz, generate_study_pack (next to a summary
+followed by a quiz, the two-request way to the same result) and
+generate_study_tips at several concurrency levels and reports p50/p95/p99
+latency and calls per second.
+The response cache and single-flight coalescing are disabled so every
+call reaches the backend.
+
+    python benchmark.py --backend fake            # in-process stub, no network
+    python benchmark.py --backend stub            # local HTTP stand-in via the OpenAI client
+    python benchmark.py --backend openai          # the real API (costs money)
+
+Add --slow-fraction/--slow-latency to inject stragglers into the stub
+server, and --hedge to compare tail latency with hedged requests.
+summarize_long summarizes a 40,000-word paste; run it with
+STUDYBUDDY_PRECOMPRESS=0 to see the cost without local pre-compression.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Every call must reach the backend; set before cache and singleflight are imported
+os.environ["STUDYBUDDY_CACHE_DISABLED"] = "1"
+os.environ["STUDYBUDDY_SINGLE_FLIGHT"] = "0"
+
+import backends
+import utils
+
+SAMPLE_TEXT = (
+    "Photosynthesis is the process by which green plants use sunlight, water and carbon "
+    "dioxide to produce glucose and oxygen. It takes place in the chloroplasts, where "
+    "chlorophyll absorbs light energy. The light-dependent reactions produce ATP and NADPH, "
+    "which the Calvin cycle then uses to fix carbon into sugars.\n\n"
+) * 8
+
+
+def _long_notes(words=40000):
+    # Lecture notes pasted from slides: page headers, repeated paragraphs
+    rng = random.Random(0)
+    topics = ["chloroplast", "chlorophyll", "glucose", "oxygen", "carbon dioxide", "ATP", "NADPH", "Calvin cycle",
+              "stomata", "thylakoid", "stroma", "rubisco", "light energy", "electron transport", "photosystem"]
+    verbs = ["produces", "absorbs", "regulates", "converts", "stores", "releases", "drives", "limits"]
+    paragraphs = []
+    count = 0
+    while count < words:
+        if len(paragraphs) % 6 == 0:
+            paragraphs.append(f"BIO 101 Lecture Notes\nPage {len(paragraphs) // 6 + 1}")
+        sentences = [
+            f"In trial {rng.randint(1, 9999)} the {rng.choice(topics)} {rng.choice(verbs)} {rng.choice(topics)} "
+            f"at {rng.randint(5, 45)} degrees, and {rng.randint(1, 99)}% of the {rng.choice(topics)} "
+            f"{rng.choice(verbs)} {rng.choice(topics)}."
+            for _ in range(rng.randint(3, 8))
+        ]
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        if rng.random() < 0.2:
+            paragraphs.append(paragraph)
+        count += len(paragraph.split())
+    return "\n\n".join(paragraphs)
+
+
+LONG_TEXT = _long_notes()
+
+SAMPLE_PROFILE = {
+    "subject": "Science",
+    "learning_style": "Visual",
+    "challenges": ["Staying focused", "Test anxiety"],
+    "study_time": "1-2 hours",
+    "study_environment": "At home",
+    "additional_info": "",
+}
+
+
+def _operations():
+    # Each call gets a unique marker so no two requests are identical
+    return {
+        "summarize_text": lambda i: utils.summarize_text(f"{SAMPLE_TEXT}[{i}]", "Medium"),
+        "summarize_long": lambda i: utils.summarize_text(f"{LONG_TEXT}[{i}]", "Medium"),
+        "generate_quiz": lambda i: utils.generate_quiz(f"{SAMPLE_TEXT}[{i}]", 5, "Mixed"),
+        "summary_then_quiz": lambda i: (
+            utils.summarize_text(f"{SAMPLE_TEXT}[{i}]", "Medium"), utils.generate_quiz(f"{SAMPLE_TEXT}[{i}]", 5, "Mixed")
+        ),
+        "generate_study_pack": lambda i: utils.generate_study_pack(f"{SAMPLE_TEXT}[{i}]", "Medium", 5, "Mixed"),
+        "generate_study_tips": lambda i: utils.generate_study_tips(
+            dict(SAMPLE_PROFILE, additional_info=f"Run {i}")
+        ),
+    }
+
+
+def percentile(samples, fraction):
+    """
+    Nearest-rank percentile of a list of samples
+
+    Args:
+        samples (list): Measured values
+        fraction (float): Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        float: The percentile value
+    """
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run(operation, requests, concurrency):
+    """
+    Call one operation `requests` times with `concurrency` callers
+
+    Args:
+        operation (callable): Function taking the request number
+        requests (int): Total number of calls
+        concurrency (int): Number of concurrent callers
+
+    Returns:
+        dict: Latency percentiles in milliseconds, throughput and error count
+    """
+    latencies = []
+    errors = 0
+
+    def timed(i):
+        start = time.perf_counter()
+        operation(i)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(timed, i) for i in range(requests)]
+        for future in futures:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - start
+
+    if not latencies:
+        latencies = [float("nan")]
+    return {
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "mean": statistics.fmean(latencies) * 1000,
+        "throughput": (requests - errors) / elapsed,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["fake", "stub", "openai"], default="fake")
+    parser.add_argument("--requests", type=int, default=32, help="calls per operation and concurrency level")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake/stub time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0, help="fake/stub generation speed")
+    parser.add_argument("--slow-fraction", type=float, default=0.0, help="stub: share of requests slowed down")
+    parser.add_argument("--slow-latency", type=float, default=0.0, help="stub: extra seconds for slow requests")
+    parser.add_argument("--hedge", action="store_true", help="stub/openai: hedge calls slower than p95")
+    parser.add_argument("--only", help="comma-separated subset of operations to run")
+    args = parser.parse_args()
+
+    if args.backend == "fake":
+        backends.set_backend(backends.FakeBackend(args.latency, args.tokens_per_second))
+    elif args.backend == "stub":
+        import stub_server
+        server = stub_server.serve(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                                   slow_fraction=args.slow_fraction, slow_latency=args.slow_latency)
+        backends.set_backend(backends.OpenAIBackend(
+            api_key="stub", base_url=f"http://127.0.0.1:{server.server_port}/v1", hedge=args.hedge
+        ))
+    elif args.hedge:
+        backends.set_backend(backends.OpenAIBackend(hedge=True))
+
+    operations = _operations()
+    if args.only:
+        operations = {name: operations[name] for name in args.only.split(",")}
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    print(f"backend={args.backend} requests={args.requests} hedge={args.hedge}")
+    print(f"{'operation':<22}{'conc':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'calls/s':>10}{'errors':>8}")
+    for name, operation in operations.items():
+        for concurrency in levels:
+            stats = run(operation, args.requests, concurrency)
+            print(
+                f"{name:<22}{concurrency:>5}{stats['p50']:>10.1f}{stats['p95']:>10.1f}"
+                f"{stats['p99']:>10.1f}{stats['mean']:>10.1f}{stats['throughput']:>10.2f}{stats['errors']:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Cache settings (override with environment variables)
+CACHE_PATH = os.environ.get("STUDYBUDDY_CACHE_PATH", ".cache/responses.sqlite3")
+CACHE_MEMORY_ITEMS = int(os.environ.get("STUDYBUDDY_CACHE_MEMORY_ITEMS", "256"))
+CACHE_MAX_BYTES = int(os.environ.get("STUDYBUDDY_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_TTL_SECONDS = int(os.environ.get("STUDYBUDDY_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_DISABLED = os.environ.get("STUDYBUDDY_CACHE_DISABLED", "") not in ("", "0", "false")
+
+# How many writes between two eviction sweeps of the disk tier
+EVICT_EVERY = 64
+
+
+def normalize_text(text):
+    """
+    Normalize text so that copies differing only in whitespace share a cache entry
+
+    Args:
+        text (str): The raw input text
+
+    Returns:
+        str: The text with whitespace collapsed and trimmed
+    """
+    return " ".join(text.split())
+
+
+def make_key(operation, text, **params):
+    """
+    Build a content-addressed cache key for a model call
+
+    Args:
+        operation (str): Name of the operation (e.g. "summary", "quiz")
+        text (str): The input text sent to the model
+        **params: Any other parameters that change the response
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    payload = json.dumps(
+        {"op": operation, "text": normalize_text(text), "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier response cache: an in-memory LRU in front of a SQLite file.
+
+    The memory tier is per process; the SQLite tier is shared by every
+    process pointing at the same file. Values must be JSON serializable.
+    """
+
+    def __init__(self, path=CACHE_PATH, memory_items=CACHE_MEMORY_ITEMS,
+                 max_bytes=CACHE_MAX_BYTES, ttl_seconds=CACHE_TTL_SECONDS):
+        self.path = path
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+            self._conn.commit()
+
+    def get(self, key):
+        """
+        Look up a cached response
+
+        Args:
+            key (str): Key from make_key()
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    return json.loads(value)
+                del self._memory[key]
+
+            if self._conn is None:
+                return None
+
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if now - created >= self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self._remember(key, created, value)
+            return json.loads(value)
+
+    def set(self, key, value):
+        """
+        Store a response in both tiers
+
+        Args:
+            key (str): Key from make_key()
+            value: JSON-serializable response to store
+        """
+        now = time.time()
+        serialized = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._remember(key, now, serialized)
+            if self._conn is None:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, serialized, len(serialized.encode("utf-8")), now, now),
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 0:
+                self._evict(now)
+
+    def clear(self):
+        """Remove every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.commit()
+
+    def _remember(self, key, created, serialized):
+        # Keep the serialized form so callers can't mutate cached values
+        self._memory[key] = (created, serialized)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now):
+        # Drop expired rows, then least recently used rows until under the size cap
+        self._conn.execute(
+            "DELETE FROM responses WHERE created <= ?", (now - self.ttl_seconds,)
+        )
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total > self.max_bytes:
+            overflow = total - self.max_bytes
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed"
+            )
+            stale = []
+            for key, size in rows:
+                if overflow <= 0:
+                    break
+                stale.append((key,))
+                overflow -= size
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        self._conn.commit()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Return the process-wide response cache, creating it on first use
+
+    Returns:
+        ResponseCache: The shared cache (memory-only if the disk tier is disabled)
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                path = None if CACHE_DISABLED else CACHE_PATH
+                memory_items = 0 if CACHE_DISABLED else CACHE_MEMORY_ITEMS
+                _cache = ResponseCache(path=path, memory_items=memory_items)
+    return _cache
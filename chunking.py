@@ -0,0 +1,92 @@
+import hashlib
+import re
+
+# Rough characters-per-token ratio for English text with the GPT-4o tokenizer
+CHARS_PER_TOKEN = 4
+# A chunk ends after a piece whose content hash says so (see split_text), once
+# it holds this share of the budget; past that, a boundary is expected about
+# every CHUNK_BOUNDARY_SPACING * max_tokens tokens
+CHUNK_MIN_SHARE = 0.4
+CHUNK_BOUNDARY_SPACING = 0.3
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text):
+    """
+    Estimate how many tokens a piece of text will use
+
+    Args:
+        text (str): The text to measure
+
+    Returns:
+        int: Approximate token count
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _pieces(text, max_tokens):
+    # Break text into paragraphs, and oversized paragraphs into sentences,
+    # so that every piece fits within the budget on its own
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            yield paragraph
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            if estimate_tokens(sentence) <= max_tokens:
+                yield sentence
+                continue
+            # A single sentence longer than the budget gets a hard split
+            step = max(1, max_tokens * CHARS_PER_TOKEN - 1)
+            for start in range(0, len(sentence), step):
+                yield sentence[start:start + step]
+
+
+def _is_boundary(piece, piece_tokens, spacing):
+    # Deterministic in the piece's content, with a chance proportional to its size
+    digest = hashlib.blake2b(piece.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64 < piece_tokens / spacing
+
+
+def split_text(text, max_tokens=3000):
+    """
+    Split text into chunks on paragraph or sentence boundaries
+
+    Where a chunk ends is decided by the content of the paragraph it ends
+    on, not by how much text came before it, so an edit only changes the
+    chunks around it: later chunks keep the same boundaries and text (and
+    their cached section notes). Chunks fill at least CHUNK_MIN_SHARE of
+    the budget unless the text runs out, and never exceed it.
+
+    Args:
+        text (str): The text to split
+        max_tokens (int): Token budget for each chunk
+
+    Returns:
+        list: Chunks of text, in order, each within the token budget
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    minimum = max_tokens * CHUNK_MIN_SHARE
+    spacing = max(1, max_tokens * CHUNK_BOUNDARY_SPACING)
+    for piece in _pieces(text, max_tokens):
+        piece_tokens = estimate_tokens(piece)
+        if current and current_tokens + piece_tokens > max_tokens:
+            # Full: a forced boundary, the only kind that depends on position
+            chunks.append("\n\n".join(current))
+            current = []
+            current_tokens = 0
+        current.append(piece)
+        current_tokens += piece_tokens
+        if current_tokens >= minimum and _is_boundary(piece, piece_tokens, spacing):
+            chunks.append("\n\n".join(current))
+            current = []
+            current_tokens = 0
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
@@ -0,0 +1,66 @@
+import re
+
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text, size=4):
+    """
+    Break text into overlapping character n-grams after normalizing case,
+    punctuation and whitespace
+
+    Args:
+        text (str): The text to shingle
+        size (int): Number of characters per shingle
+
+    Returns:
+        set: Character n-grams (the whole text as one shingle if it is shorter than `size`)
+    """
+    normalized = " ".join(_WORD.findall(text.lower()))
+    if len(normalized) <= size:
+        return {normalized}
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+def jaccard(a, b):
+    """
+    Jaccard similarity of two shingle sets
+
+    Args:
+        a (set): First shingle set
+        b (set): Second shingle set
+
+    Returns:
+        float: Size of the intersection over size of the union (0.0 to 1.0)
+    """
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class NearDuplicateFilter:
+    """
+    Remembers the texts it has accepted and rejects new ones whose shingled
+    Jaccard similarity to any of them reaches `threshold`.
+    """
+
+    def __init__(self, threshold=0.7, size=4):
+        self.threshold = threshold
+        self.size = size
+        self._seen = []
+
+    def add(self, text):
+        """
+        Accept the text unless it nearly duplicates one already accepted
+
+        Args:
+            text (str): The candidate text
+
+        Returns:
+            bool: True if the text was new and has been recorded
+        """
+        candidate = shingles(text, self.size)
+        for seen in self._seen:
+            if jaccard(candidate, seen) >= self.threshold:
+                return False
+        self._seen.append(candidate)
+        return True
@@ -0,0 +1,327 @@
+"""
+Headless entry points: a batch CLI and a small HTTP API.
+
+Both call the same generator functions as the Streamlit app
+(summarize_text, generate_quiz, generate_study_pack, generate_study_tips)
+without starting a Streamlit server.
+
+Batch mode walks a directory of notes and writes one JSON line per
+document with its summary and quiz, made with one model request per
+document (generate_study_pack). PDF and Word files are parsed in a
+process pool, and the model calls for all documents run in a thread pool,
+so throughput is limited by the provider rather than by the app:
+
+    python headless.py batch notes/ --output packs.jsonl --workers 16
+
+Serve mode answers JSON requests from other services:
+
+    python headless.py serve --port 8700
+    curl -d '{"text": "...", "summary_length": "Short"}' http://127.0.0.1:8700/summary
+
+Endpoints: POST /summary, POST /quiz, POST /pack, POST /tips and GET /health.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ingest import DOCUMENT_TYPES, extract_to_disk, iter_chunks
+from utils import (LENGTH_MAP, TYPE_MAP, condense_chunks, generate_quiz, generate_study_pack, generate_study_tips,
+                   summarize_text)
+
+BATCH_WORKERS = int(os.environ.get("STUDYBUDDY_BATCH_WORKERS", "8"))
+PARSE_WORKERS = int(os.environ.get("STUDYBUDDY_PARSE_WORKERS", str(os.cpu_count() or 2)))
+# Requests the API works on at once; more get 503 instead of queueing
+API_MAX_CONCURRENT = int(os.environ.get("STUDYBUDDY_API_MAX_CONCURRENT", "32"))
+API_MAX_BODY_BYTES = 8 * 1024 * 1024
+# Same range as the Quiz Generator's slider
+MAX_QUESTIONS = 10
+PROFILE_FIELDS = ("subject", "learning_style", "challenges", "study_time", "study_environment")
+
+
+def find_documents(directory):
+    """
+    Args:
+        directory (str): Folder of notes
+
+    Returns:
+        list: Paths of the supported documents in it and its subfolders, sorted
+    """
+    extensions = tuple(f".{ext}" for ext in DOCUMENT_TYPES)
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            # Skip the sidecar text files that extract_to_disk() writes
+            if name.lower().endswith(extensions) and not name.lower().endswith((".pdf.txt", ".docx.txt")):
+                found.append(os.path.join(root, name))
+    return found
+
+
+def study_pack(text_path, summary_length="Medium", num_questions=5, question_type="Mixed"):
+    """
+    Summarize and quiz one extracted document
+
+    Args:
+        text_path (str): Path from extract_to_disk()
+        summary_length (str): Summary length option
+        num_questions (int): Number of quiz questions
+        question_type (str): Quiz question type option
+
+    Returns:
+        dict: The summary and quiz
+    """
+    # Long documents are condensed section by section, as in the app
+    text = condense_chunks(iter_chunks(text_path))
+    if not text.strip():
+        raise ValueError("document has no text")
+    return generate_study_pack(text, summary_length, num_questions, question_type)
+
+
+def run_batch(directory, output, summary_length="Medium", num_questions=5, question_type="Mixed",
+              workers=BATCH_WORKERS, parse_workers=PARSE_WORKERS, log=None):
+    """
+    Generate a study pack for every document in a folder
+
+    Each document's line is written as soon as it is done, so the output
+    is in completion order, not file order. A document that fails gets a
+    line with its error and the rest carry on. Text extracted from PDF and
+    Word files goes to a temporary directory, never into the notes folder.
+
+    Args:
+        directory (str): Folder of notes
+        output (file): Text stream the JSON lines are written to
+        summary_length (str): Summary length option
+        num_questions (int): Number of quiz questions per document
+        question_type (str): Quiz question type option
+        workers (int): Documents generated concurrently
+        parse_workers (int): Processes for parsing PDF and Word files
+        log (callable): Called with a progress line per document
+
+    Returns:
+        tuple: (documents done, documents failed)
+
+    Raises:
+        ValueError: If num_questions is out of range
+    """
+    if not 1 <= num_questions <= MAX_QUESTIONS:
+        raise ValueError(f"num_questions must be from 1 to {MAX_QUESTIONS}")
+    paths = find_documents(directory)
+    done = failed = 0
+    with tempfile.TemporaryDirectory(prefix="studybuddy-batch-") as extracted, \
+            ProcessPoolExecutor(max_workers=max(1, parse_workers)) as parsers, \
+            ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch") as generators:
+        pending = {}
+        for path in paths:
+            if os.path.splitext(path)[1].lower() in (".pdf", ".docx"):
+                pending[parsers.submit(extract_to_disk, path, extracted)] = ("parse", path, time.perf_counter())
+            else:
+                pending[generators.submit(study_pack, path, summary_length, num_questions, question_type)] = (
+                    "generate", path, time.perf_counter())
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, path, started = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    row = {"path": os.path.relpath(path, directory), "error": str(e)}
+                    failed += 1
+                else:
+                    if stage == "parse":
+                        # Parsed: queue the model calls for it
+                        pending[generators.submit(study_pack, result, summary_length, num_questions,
+                                                  question_type)] = ("generate", path, started)
+                        continue
+                    row = {"path": os.path.relpath(path, directory), **result, "error": None}
+                    done += 1
+                output.write(json.dumps(row, ensure_ascii=False) + "\n")
+                output.flush()
+                if log:
+                    status = "failed" if row["error"] else "ok"
+                    log(f"[{done + failed}/{len(paths)}] {row['path']}: {status} ({time.perf_counter() - started:.1f}s)")
+    return done, failed
+
+
+class RequestError(Exception):
+    """A request the API rejects with 400"""
+
+
+def _choice(body, name, options, default):
+    value = body.get(name, default)
+    if not isinstance(value, str) or value not in options:
+        raise RequestError(f"{name} must be one of: {', '.join(options)}")
+    return value
+
+
+def _text(body):
+    text = body.get("text")
+    if not isinstance(text, str) or not text.strip():
+        raise RequestError("text must be a non-empty string")
+    return text
+
+
+def handle_summary(body):
+    summary_length = _choice(body, "summary_length", LENGTH_MAP, "Medium")
+    return {"summary": summarize_text(_text(body), summary_length)}
+
+
+def _num_questions(body):
+    num_questions = body.get("num_questions", 5)
+    # bool is a subclass of int, but true/false are not question counts
+    if not isinstance(num_questions, int) or isinstance(num_questions, bool) \
+            or not 1 <= num_questions <= MAX_QUESTIONS:
+        raise RequestError(f"num_questions must be an integer from 1 to {MAX_QUESTIONS}")
+    return num_questions
+
+
+def handle_quiz(body):
+    num_questions = _num_questions(body)
+    question_type = _choice(body, "question_type", TYPE_MAP, "Mixed")
+    parallel = question_type == "Mixed" or num_questions >= 6
+    return {"quiz": generate_quiz(_text(body), num_questions, question_type, parallel=parallel)}
+
+
+def handle_pack(body):
+    summary_length = _choice(body, "summary_length", LENGTH_MAP, "Medium")
+    num_questions = _num_questions(body)
+    question_type = _choice(body, "question_type", TYPE_MAP, "Mixed")
+    return generate_study_pack(_text(body), summary_length, num_questions, question_type)
+
+
+def handle_tips(body):
+    profile = body.get("study_profile")
+    if not isinstance(profile, dict) or any(field not in profile for field in PROFILE_FIELDS):
+        raise RequestError(f"study_profile must be an object with: {', '.join(PROFILE_FIELDS)}")
+    if not isinstance(profile["challenges"], list):
+        raise RequestError("study_profile.challenges must be a list")
+    profile = dict(profile, additional_info=profile.get("additional_info") or "")
+    return {"tips": generate_study_tips(profile)}
+
+
+ROUTES = {
+    "/summary": handle_summary,
+    "/quiz": handle_quiz,
+    "/pack": handle_pack,
+    "/tips": handle_tips,
+}
+
+
+class APIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.split("?")[0] == "/health":
+            self._reply(200, {"status": "ok"})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        handler = ROUTES.get(self.path.split("?")[0])
+        length = int(self.headers.get("Content-Length") or 0)
+        if handler is None:
+            self.rfile.read(length)
+            return self._reply(404, {"error": "not found"})
+        if length > API_MAX_BODY_BYTES:
+            self.close_connection = True
+            return self._reply(413, {"error": "request body too large"})
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._reply(400, {"error": "request body must be JSON"})
+        if not isinstance(body, dict):
+            return self._reply(400, {"error": "request body must be a JSON object"})
+        if not self.server.slots.acquire(blocking=False):
+            return self._reply(503, {"error": "too many requests in progress"})
+        try:
+            self._reply(200, handler(body))
+        except RequestError as e:
+            self._reply(400, {"error": str(e)})
+        except Exception as e:
+            self._reply(502, {"error": str(e)})
+        finally:
+            self.server.slots.release()
+
+
+def serve(host="127.0.0.1", port=8700, max_concurrent=API_MAX_CONCURRENT, background=True):
+    """
+    Start the HTTP API
+
+    Args:
+        host (str): Interface to bind
+        port (int): Port to bind (0 picks a free one)
+        max_concurrent (int): Requests handled at once; the rest get 503
+        background (bool): Serve from a daemon thread and return immediately
+
+    Returns:
+        ThreadingHTTPServer: The server
+    """
+    server = ThreadingHTTPServer((host, port), APIHandler)
+    server.daemon_threads = True
+    server.slots = threading.BoundedSemaphore(max_concurrent)
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        server.serve_forever()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="summarize and quiz every document in a folder")
+    batch.add_argument("directory")
+    batch.add_argument("--output", "-o", default="-", help="JSONL file to write (default: stdout)")
+    batch.add_argument("--summary-length", choices=list(LENGTH_MAP), default="Medium")
+    batch.add_argument("--questions", type=int, default=5, help=f"quiz questions per document (1-{MAX_QUESTIONS})")
+    batch.add_argument("--question-type", choices=list(TYPE_MAP), default="Mixed")
+    batch.add_argument("--workers", type=int, default=BATCH_WORKERS, help="documents generated concurrently")
+    batch.add_argument("--parse-workers", type=int, default=PARSE_WORKERS, help="processes for PDF/Word parsing")
+
+    api = commands.add_parser("serve", help="serve the JSON HTTP API")
+    api.add_argument("--host", default="127.0.0.1")
+    api.add_argument("--port", type=int, default=8700)
+    api.add_argument("--max-concurrent", type=int, default=API_MAX_CONCURRENT)
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        print(f"Serving the StudyBuddy API on http://{args.host}:{args.port}")
+        serve(args.host, args.port, args.max_concurrent, background=False)
+        return 0
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"not a directory: {args.directory}")
+    if not 1 <= args.questions <= MAX_QUESTIONS:
+        parser.error(f"--questions must be from 1 to {MAX_QUESTIONS}")
+    log = lambda line: print(line, file=sys.stderr)
+    started = time.perf_counter()
+    if args.output == "-":
+        done, failed = run_batch(args.directory, sys.stdout, args.summary_length, args.questions,
+                                 args.question_type, args.workers, args.parse_workers, log)
+    else:
+        with open(args.output, "w", encoding="utf-8") as output:
+            done, failed = run_batch(args.directory, output, args.summary_length, args.questions,
+                                     args.question_type, args.workers, args.parse_workers, log)
+    print(f"{done} documents done, {failed} failed in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
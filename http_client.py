@@ -0,0 +1,286 @@
+"""
+Shared, tuned HTTP client for model calls.
+
+Explicit connection-pool limits and keep-alive, a deadline per operation,
+exponential backoff with full jitter on retryable errors, and optional
+hedging: when a call runs past the recent p95 latency for its operation, a
+second identical request is sent and whichever finishes first wins.
+"""
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+# httpx and openai are imported on first use: together with pydantic they
+# are most of the app's import time, and pages that don't call the model
+# shouldn't pay for them on a cold start
+
+# Connection pool (override with environment variables)
+MAX_CONNECTIONS = int(os.environ.get("STUDYBUDDY_HTTP_MAX_CONNECTIONS", "64"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("STUDYBUDDY_HTTP_MAX_KEEPALIVE", "32"))
+KEEPALIVE_EXPIRY = float(os.environ.get("STUDYBUDDY_HTTP_KEEPALIVE_EXPIRY", "60"))
+CONNECT_TIMEOUT = float(os.environ.get("STUDYBUDDY_HTTP_CONNECT_TIMEOUT", "5"))
+
+# Total time allowed for one operation, retries included (seconds)
+OPERATION_DEADLINES = {
+    "summary": 60.0,
+    "summary_chunk": 45.0,
+    "quiz": 90.0,
+    "pack": 90.0,
+    "tips": 60.0,
+}
+DEFAULT_DEADLINE = 60.0
+
+# Retries: attempts after the first, and the backoff cap
+MAX_RETRIES = int(os.environ.get("STUDYBUDDY_HTTP_MAX_RETRIES", "3"))
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+# Hedging: off unless enabled; needs some history before it kicks in
+HEDGE_ENABLED = os.environ.get("STUDYBUDDY_HEDGE", "") not in ("", "0", "false")
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+# Off for callers that pace rate-limited requests themselves (see rate_limit_retries)
+_retry_rate_limits = contextvars.ContextVar("retry_rate_limits", default=True)
+
+
+def make_http_client(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                     keepalive_expiry=KEEPALIVE_EXPIRY, connect_timeout=CONNECT_TIMEOUT):
+    """
+    Build the pooled httpx client shared by every model call
+
+    Args:
+        max_connections (int): Upper bound on open connections
+        max_keepalive_connections (int): Idle connections kept for reuse
+        keepalive_expiry (float): Seconds an idle connection is kept
+        connect_timeout (float): Seconds allowed to open a connection
+
+    Returns:
+        httpx.Client: The configured client
+    """
+    import httpx
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(DEFAULT_DEADLINE, connect=connect_timeout),
+    )
+
+
+def make_openai_client(api_key=None, base_url=None, **pool_options):
+    """
+    Build an OpenAI client on the tuned pool, with its own retries turned off
+    (retries are handled by call_with_retries)
+
+    Args:
+        api_key (str): API key
+        base_url (str): API base URL (defaults to OPENAI_BASE_URL or the public API)
+        **pool_options: Options for make_http_client()
+
+    Returns:
+        OpenAI: The client
+    """
+    from openai import OpenAI
+    return OpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        http_client=make_http_client(**pool_options),
+        max_retries=0,
+    )
+
+
+def operation_deadline(operation):
+    """
+    Args:
+        operation (str): Operation name, e.g. "summary"
+
+    Returns:
+        float: Seconds the operation may take in total
+    """
+    return OPERATION_DEADLINES.get(operation, DEFAULT_DEADLINE)
+
+
+def backoff_delay(attempt):
+    """
+    Exponential backoff with full jitter
+
+    Args:
+        attempt (int): Retry number, starting at 0
+
+    Returns:
+        float: Seconds to wait before the retry
+    """
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def is_retryable(error):
+    """
+    Whether an error from the OpenAI client is worth retrying
+
+    Args:
+        error (Exception): The error raised by a call
+
+    Returns:
+        bool: True for timeouts, connection errors, 409/429 and 5xx responses
+    """
+    import httpx
+    import openai
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, httpx.TransportError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+def is_rate_limit(error):
+    """
+    Args:
+        error (Exception): The error raised by a call
+
+    Returns:
+        bool: True for a 429 response
+    """
+    import openai
+    return isinstance(error, openai.APIStatusError) and error.status_code == 429
+
+
+@contextmanager
+def rate_limit_retries(enabled):
+    """
+    Turn retrying of 429 responses on or off for calls made inside the block
+
+    A caller that shares one backoff across many requests (async_batch.py)
+    turns them off, so that each 429 reaches it straight away instead of
+    after this module's own retries.
+
+    Args:
+        enabled (bool): Whether call_with_retries retries 429 responses
+    """
+    token = _retry_rate_limits.set(enabled)
+    try:
+        yield
+    finally:
+        _retry_rate_limits.reset(token)
+
+
+def call_with_retries(call, operation, on_retry=None):
+    """
+    Run a call with retries, keeping every attempt within the operation's deadline
+
+    Args:
+        call (callable): Takes the timeout for this attempt (seconds) and performs the request
+        operation (str): Operation name, used for the deadline
+        on_retry (callable): Called with the error before each retry
+
+    Returns:
+        Whatever `call` returns
+    """
+    deadline = time.monotonic() + operation_deadline(operation)
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        try:
+            return call(max(remaining, 1.0))
+        except Exception as e:
+            if attempt >= MAX_RETRIES or not is_retryable(e):
+                raise
+            if not _retry_rate_limits.get() and is_rate_limit(e):
+                raise
+            delay = backoff_delay(attempt)
+            if time.monotonic() + delay >= deadline:
+                raise
+            if on_retry is not None:
+                on_retry(e)
+            time.sleep(delay)
+            attempt += 1
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies per operation"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    def record(self, operation, seconds):
+        with self._lock:
+            self._samples[operation].append(seconds)
+
+    def percentile(self, operation, fraction):
+        """
+        Args:
+            operation (str): Operation name
+            fraction (float): Percentile as a fraction, e.g. 0.95
+
+        Returns:
+            float: The latency percentile, or None with too few samples
+        """
+        with self._lock:
+            samples = sorted(self._samples[operation])
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+class HedgedCaller:
+    """
+    Runs calls with retries, and optionally hedges slow ones.
+
+    A hedged call waits up to the operation's recent p95 latency for the
+    first request; if it hasn't finished, a second request is started and
+    the first result to arrive is returned. Only about one call in twenty
+    gets hedged, which keeps the extra cost small.
+    """
+
+    def __init__(self, hedge=HEDGE_ENABLED, tracker=None, workers=MAX_CONNECTIONS):
+        self.hedge = hedge
+        self.tracker = tracker or LatencyTracker()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hedge") if hedge else None
+
+    def call(self, call, operation, on_retry=None, on_hedge=None):
+        """
+        Args:
+            call (callable): Takes the per-attempt timeout (seconds) and performs the request
+            operation (str): Operation name
+            on_retry (callable): Called with the error before each retry
+            on_hedge (callable): Called when a second request is sent
+
+        Returns:
+            Whatever `call` returns
+        """
+        start = time.monotonic()
+        threshold = self.tracker.percentile(operation, HEDGE_PERCENTILE) if self.hedge else None
+        if threshold is None:
+            result = call_with_retries(call, operation, on_retry)
+        else:
+            result = self._hedged(call, operation, threshold, on_retry, on_hedge)
+        self.tracker.record(operation, time.monotonic() - start)
+        return result
+
+    def _hedged(self, call, operation, threshold, on_retry, on_hedge):
+        # Each request runs in the caller's context, so rate_limit_retries() applies
+        first = self._pool.submit(contextvars.copy_context().run, call_with_retries, call, operation, on_retry)
+        done, _ = wait([first], timeout=threshold)
+        if done:
+            return first.result()
+        if on_hedge is not None:
+            on_hedge()
+        second = self._pool.submit(contextvars.copy_context().run, call_with_retries, call, operation, on_retry)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    error = e
+        raise error
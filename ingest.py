@@ -0,0 +1,218 @@
+"""
+Document ingestion for uploaded PDF, DOCX and plain-text files.
+
+Uploads are streamed to disk and their text is extracted in a background
+worker, a page or paragraph at a time, into a sidecar text file. The
+generator functions then read that file as a stream of chunks, so memory
+use doesn't grow with the size of the document. Uploads and their text
+files are deleted once they haven't been used for
+STUDYBUDDY_UPLOAD_RETENTION_SECONDS (a day by default).
+"""
+import codecs
+import hashlib
+import mmap
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+
+from chunking import split_text
+
+UPLOAD_DIR = os.environ.get("STUDYBUDDY_UPLOAD_DIR", ".uploads")
+EXTRACTION_WORKERS = int(os.environ.get("STUDYBUDDY_EXTRACTION_WORKERS", "2"))
+UPLOAD_RETENTION_SECONDS = int(os.environ.get("STUDYBUDDY_UPLOAD_RETENTION_SECONDS", "86400"))
+
+DOCUMENT_TYPES = ["pdf", "docx", "txt", "md"]
+BLOCK_SIZE = 1024 * 1024
+
+_WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def cleanup_uploads(directory=UPLOAD_DIR, max_age=UPLOAD_RETENTION_SECONDS):
+    """
+    Delete uploads, text files and abandoned partial files not used for a while
+
+    Args:
+        directory (str): Where uploads are stored
+        max_age (int): Seconds since a file was last written or reused
+
+    Returns:
+        int: Number of files deleted
+    """
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            # Removed by another process in the meantime
+            pass
+    return removed
+
+
+def save_upload(uploaded_file, directory=UPLOAD_DIR):
+    """
+    Stream an uploaded file to disk, named by its content hash
+
+    Args:
+        uploaded_file: A file-like object with a `name` (e.g. a Streamlit UploadedFile)
+        directory (str): Where to store uploads
+
+    Returns:
+        str: Path of the saved file
+    """
+    os.makedirs(directory, exist_ok=True)
+    cleanup_uploads(directory)
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    digest = hashlib.sha256()
+    partial = os.path.join(directory, f".upload-{os.getpid()}-{threading.get_ident()}")
+    uploaded_file.seek(0)
+    with open(partial, "wb") as out:
+        while True:
+            block = uploaded_file.read(BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            out.write(block)
+    path = os.path.join(directory, digest.hexdigest() + extension)
+    os.replace(partial, path)
+    return path
+
+
+def _iter_plain_text(path):
+    # Memory-map the file and decode it a block at a time
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            for start in range(0, len(mapped), BLOCK_SIZE):
+                yield decoder.decode(mapped[start:start + BLOCK_SIZE])
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+
+
+def _iter_pdf_text(path):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise RuntimeError("Reading PDF files requires the pypdf package (pip install pypdf)")
+    # PdfReader parses pages lazily from the open file
+    with open(path, "rb") as f:
+        for page in PdfReader(f).pages:
+            yield (page.extract_text() or "") + "\n\n"
+
+
+def _iter_docx_text(path):
+    # A .docx is a zip; stream its main XML part a paragraph at a time
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as xml:
+        for event, element in ElementTree.iterparse(xml, events=("end",)):
+            if element.tag == _WORD_NAMESPACE + "p":
+                text = "".join(node.text or "" for node in element.iter(_WORD_NAMESPACE + "t"))
+                if text:
+                    yield text + "\n\n"
+                element.clear()
+
+
+def iter_document_text(path):
+    """
+    Yield a document's text a block at a time
+
+    Args:
+        path (str): Path of a PDF, DOCX or plain-text file
+
+    Yields:
+        str: Consecutive pieces of the document's text
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".pdf":
+        return _iter_pdf_text(path)
+    if extension == ".docx":
+        return _iter_docx_text(path)
+    return _iter_plain_text(path)
+
+
+def extract_to_disk(path, directory=None):
+    """
+    Extract a document's text into a sidecar UTF-8 file
+
+    Plain-text files are used as they are.
+
+    Args:
+        path (str): Path of the saved upload
+        directory (str): Where to write the text file (default: next to the upload)
+
+    Returns:
+        str: Path of a plain-text file holding the document's text
+    """
+    if os.path.splitext(path)[1].lower() not in (".pdf", ".docx"):
+        return path
+    if directory is None:
+        text_path = path + ".txt"
+    else:
+        # Documents with the same name in different folders get different files
+        digest = hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+        text_path = os.path.join(directory, f"{digest}-{os.path.basename(path)}.txt")
+    if os.path.exists(text_path):
+        # Mark it as used so cleanup_uploads() keeps it
+        os.utime(text_path)
+        return text_path
+    partial = f"{text_path}.{os.getpid()}-{threading.get_ident()}"
+    with open(partial, "w", encoding="utf-8") as out:
+        for block in iter_document_text(path):
+            out.write(block)
+    os.replace(partial, text_path)
+    return text_path
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def start_extraction(path):
+    """
+    Extract a document's text in a background worker
+
+    Args:
+        path (str): Path of the saved upload
+
+    Returns:
+        concurrent.futures.Future: Resolves to the path from extract_to_disk()
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=EXTRACTION_WORKERS, thread_name_prefix="extract")
+    return _executor.submit(extract_to_disk, path)
+
+
+def iter_chunks(text_path, max_tokens=3000):
+    """
+    Read an extracted text file as a stream of chunks
+
+    Args:
+        text_path (str): Path from extract_to_disk()
+        max_tokens (int): Token budget for each chunk
+
+    Yields:
+        str: Chunks split on paragraph or sentence boundaries
+    """
+    buffer = ""
+    for block in _iter_plain_text(text_path):
+        buffer += block
+        chunks = split_text(buffer, max_tokens)
+        # The last chunk may continue in the next block, so hold it back
+        yield from chunks[:-1]
+        buffer = chunks[-1] if chunks else ""
+    if buffer.strip():
+        yield buffer
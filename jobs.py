@@ -0,0 +1,204 @@
+"""
+Process-wide background job manager.
+
+Model calls run here instead of in the Streamlit script thread, so a rerun
+(a widget click, navigating away) neither aborts nor repeats them. Pages
+keep only the job ID in session state and poll for progress.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_WORKERS = int(os.environ.get("STUDYBUDDY_JOB_WORKERS", "8"))
+JOB_MAX_PENDING = int(os.environ.get("STUDYBUDDY_JOB_MAX_PENDING", "64"))
+# How long finished jobs are kept for their owners to collect
+JOB_RETENTION_SECONDS = int(os.environ.get("STUDYBUDDY_JOB_RETENTION_SECONDS", "900"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's generator loop when every watcher has cancelled"""
+
+
+class Job:
+    """
+    One background generation.
+
+    `partial` collects the items yielded so far when the job's function is
+    a generator (summary text deltas, quiz questions), so pages can render
+    progress before the job finishes.
+    """
+
+    def __init__(self, kind, key):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = QUEUED
+        self.partial = []
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.watchers = 1
+        self.cancel_requested = threading.Event()
+        self.future = None
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded thread pool and keeps their results for a while.
+
+    Submitting a job with the same key as one still in progress attaches to
+    the existing job instead of starting another, so repeated clicks (or
+    several sessions asking for the same thing) trigger one model call.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING,
+                 retention_seconds=JOB_RETENTION_SECONDS):
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, key=None, **kwargs):
+        """
+        Start a job, or attach to an identical one already in progress
+
+        Args:
+            kind (str): What the job produces (e.g. "summary", "quiz")
+            fn (callable): The function to run; generator functions report progress
+            *args: Positional arguments for fn
+            key (str): Identifies identical work; None never shares
+            **kwargs: Keyword arguments for fn
+
+        Returns:
+            str: The job ID
+
+        Raises:
+            RuntimeError: If too many jobs are already waiting
+        """
+        with self._lock:
+            self._expire()
+            if key is not None and key in self._active:
+                job = self._active[key]
+                job.watchers += 1
+                return job.id
+            pending = sum(1 for job in self._active.values() if job.status == QUEUED)
+            if pending >= self.max_pending:
+                raise RuntimeError("The server is busy right now. Please try again in a moment.")
+            job = Job(kind, key)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._active[key] = job
+            job.future = self._pool.submit(self._run, job, fn, args, kwargs)
+            return job.id
+
+    def get(self, job_id):
+        """
+        Look up a job
+
+        Args:
+            job_id (str): ID from submit()
+
+        Returns:
+            Job: The job, or None if it is unknown or has expired
+        """
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Stop watching a job; it is cancelled once nobody is watching
+
+        A queued job never starts. A running generator job stops at its next
+        item; a running plain function finishes, but its result is discarded.
+
+        Args:
+            job_id (str): ID from submit()
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.done:
+                return
+            job.watchers -= 1
+            if job.watchers > 0:
+                return
+            job.cancel_requested.set()
+            # A new submit with the same key starts afresh instead of attaching to this one
+            if job.key is not None and self._active.get(job.key) is job:
+                del self._active[job.key]
+            if job.future.cancel():
+                self._finish(job, CANCELLED)
+
+    def _run(self, job, fn, args, kwargs):
+        with self._lock:
+            if job.cancel_requested.is_set():
+                # Cancelled after the worker picked it up, too late for future.cancel()
+                self._finish(job, CANCELLED)
+                return
+            job.status = RUNNING
+        try:
+            result = fn(*args, **kwargs)
+            if hasattr(result, "__next__"):
+                for item in result:
+                    if job.cancel_requested.is_set():
+                        result.close()
+                        raise JobCancelled()
+                    job.partial.append(item)
+                result = list(job.partial)
+        except JobCancelled:
+            with self._lock:
+                self._finish(job, CANCELLED)
+            return
+        except Exception as e:
+            with self._lock:
+                job.error = str(e)
+                self._finish(job, FAILED)
+            return
+        with self._lock:
+            job.result = result
+            self._finish(job, CANCELLED if job.cancel_requested.is_set() else DONE)
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished = time.time()
+        if job.key is not None and self._active.get(job.key) is job:
+            del self._active[job.key]
+
+    def _expire(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [j.id for j in self._jobs.values() if j.done and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """
+    Return the process-wide job manager, creating it on first use
+
+    Returns:
+        JobManager: The shared manager
+    """
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = JobManager()
+    return _manager
@@ -0,0 +1,83 @@
+import json
+
+
+class ArrayObjectParser:
+    """
+    Incremental parser that pulls objects out of a JSON array as text arrives.
+
+    Feed it the model's output piece by piece; each call returns the objects
+    of the first array in the document that have closed since the last call.
+    Works whether the array is the top-level value or nested under a key,
+    e.g. {"questions": [{...}, {...}]}. Only the text of the object currently
+    being read is buffered.
+    """
+
+    def __init__(self):
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._buffer = []
+
+    def feed(self, text):
+        """
+        Consume the next piece of the document
+
+        Args:
+            text (str): The next piece of the streamed JSON text
+
+        Returns:
+            list: Objects completed by this piece, in order
+        """
+        completed = []
+        for char in text:
+            if self._done:
+                break
+            if self._depth > 0:
+                self._buffer.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif not self._in_array:
+                if char == "[":
+                    self._in_array = True
+            elif char == "{" or char == "[":
+                if self._depth == 0:
+                    self._buffer = [char]
+                self._depth += 1
+            elif char == "}" or char == "]":
+                if self._depth == 0:
+                    # End of the array itself
+                    self._done = True
+                    continue
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        completed.append(json.loads("".join(self._buffer)))
+                    except ValueError:
+                        pass
+                    self._buffer = []
+        return completed
+
+
+def iter_array_objects(pieces):
+    """
+    Yield the objects of the first JSON array in a stream of text pieces
+
+    Args:
+        pieces (iterable): Pieces of JSON text, e.g. streamed model deltas
+
+    Yields:
+        Each element of the array as soon as its closing bracket arrives
+    """
+    parser = ArrayObjectParser()
+    for piece in pieces:
+        yield from parser.feed(piece)
@@ -0,0 +1,404 @@
+"""
+In-process metrics and call traces.
+
+Model calls, cache lookups, retries and response parsing record counters
+and histograms here, labelled by operation. They can be read three ways:
+
+- a Prometheus text endpoint, started when STUDYBUDDY_METRICS_PORT is set
+  (GET /metrics);
+- a rotating JSONL trace with one line per model call, written when
+  STUDYBUDDY_TRACE_PATH is set;
+- the Metrics page in the app, shown when STUDYBUDDY_ADMIN is set.
+"""
+import functools
+import inspect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+
+METRICS_PORT = os.environ.get("STUDYBUDDY_METRICS_PORT")
+METRICS_HOST = os.environ.get("STUDYBUDDY_METRICS_HOST", "127.0.0.1")
+TRACE_PATH = os.environ.get("STUDYBUDDY_TRACE_PATH")
+TRACE_MAX_BYTES = int(os.environ.get("STUDYBUDDY_TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+TRACE_BACKUPS = int(os.environ.get("STUDYBUDDY_TRACE_BACKUPS", "5"))
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, math.inf)
+
+DESCRIPTIONS = {
+    "studybuddy_llm_requests_total": "Model calls by outcome",
+    "studybuddy_llm_request_seconds": "Wall time of model calls, retries included",
+    "studybuddy_llm_ttft_seconds": "Time to the first streamed token",
+    "studybuddy_llm_prompt_tokens_total": "Prompt tokens sent",
+    "studybuddy_llm_completion_tokens_total": "Completion tokens received",
+    "studybuddy_llm_completion_tokens": "Completion tokens per call",
+    "studybuddy_llm_errors_total": "Failed model calls by error type",
+    "studybuddy_llm_retries_total": "Retried model call attempts by error type",
+    "studybuddy_llm_hedges_total": "Hedged (duplicated) model calls",
+    "studybuddy_cache_lookups_total": "Response cache lookups by result",
+    "studybuddy_parse_failures_total": "Responses with no usable JSON",
+    "studybuddy_parse_dropped_items_total": "Questions or tip categories dropped as invalid",
+    "studybuddy_session_spills_total": "Sessions written to disk to stay under the memory caps",
+    "studybuddy_session_loads_total": "Spilled sessions loaded back from disk",
+    "studybuddy_single_flight_total": "Generation calls that started a flight (leader) or joined one (follower)",
+    "studybuddy_single_flight_cancelled_total": "Flights abandoned by every caller before finishing",
+    "studybuddy_precompress_ratio": "Size of pre-compressed inputs relative to the original, in tokens",
+    "studybuddy_precompress_seconds": "Time spent pre-compressing inputs",
+    "studybuddy_precompress_saved_tokens_total": "Prompt tokens removed by pre-compression",
+    "studybuddy_operation_seconds": "Wall time of summary, quiz and tips generation, cache hits included",
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, fraction):
+        """
+        Args:
+            fraction (float): Quantile as a fraction, e.g. 0.95
+
+        Returns:
+            float: Upper bound of the bucket holding the quantile, or None if empty
+        """
+        if not self.count:
+            return None
+        for bound, count in zip(self.buckets, self.counts):
+            if count >= fraction * self.count:
+                return bound
+        return self.buckets[-1]
+
+
+class Registry:
+    """Counters and histograms keyed by metric name and label values"""
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        """
+        Add to a counter
+
+        Args:
+            name (str): Metric name
+            amount (float): Amount to add
+            **labels: Label values
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        """
+        Record a value in a histogram
+
+        Args:
+            name (str): Metric name
+            value (float): The observation
+            buckets (tuple): Bucket upper bounds, used when the histogram is created
+            **labels: Label values
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def snapshot(self):
+        """
+        Copy the current values
+
+        Returns:
+            tuple: ({(name, labels): value}, {(name, labels): Histogram copy})
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {}
+            for key, histogram in self._histograms.items():
+                copy = Histogram(histogram.buckets)
+                copy.counts, copy.sum, copy.count = list(histogram.counts), histogram.sum, histogram.count
+                histograms[key] = copy
+        return counters, histograms
+
+    def render_prometheus(self):
+        """
+        Returns:
+            str: All metrics in the Prometheus text exposition format
+        """
+        counters, histograms = self.snapshot()
+        lines = []
+        for name in sorted({key[0] for key in counters}):
+            lines += _header(name, "counter")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_labels(labels)} {value}")
+        for name in sorted({key[0] for key in histograms}):
+            lines += _header(name, "histogram")
+            for (metric, labels), histogram in sorted(histograms.items(), key=lambda item: item[0]):
+                if metric != name:
+                    continue
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    le = "+Inf" if bound == math.inf else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {count}")
+                lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _header(name, kind):
+    description = DESCRIPTIONS.get(name)
+    return ([f"# HELP {name} {description}"] if description else []) + [f"# TYPE {name} {kind}"]
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+_registry = Registry()
+
+
+def get_registry():
+    """
+    Returns:
+        Registry: The process-wide registry
+    """
+    return _registry
+
+
+def inc(name, amount=1, **labels):
+    """Add to a counter in the process-wide registry (see Registry.inc)"""
+    _registry.inc(name, amount, **labels)
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    """Record a histogram value in the process-wide registry (see Registry.observe)"""
+    _registry.observe(name, value, buckets, **labels)
+
+
+_trace_logger = None
+_trace_lock = threading.Lock()
+
+
+def _trace(record):
+    global _trace_logger
+    if not TRACE_PATH:
+        return
+    if _trace_logger is None:
+        with _trace_lock:
+            if _trace_logger is None:
+                directory = os.path.dirname(TRACE_PATH)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                handler = RotatingFileHandler(TRACE_PATH, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUPS,
+                                              encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger = logging.getLogger("studybuddy.trace")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                logger.addHandler(handler)
+                _trace_logger = logger
+    _trace_logger.info(json.dumps(record, ensure_ascii=False))
+
+
+class CallRecord:
+    """
+    Measurements for one model call; created by track_call()
+
+    Backends report the first streamed token, token usage and retries as
+    they happen. The record is written out when the call ends.
+    """
+
+    def __init__(self, operation, model, **params):
+        self.operation = operation or "other"
+        self.model = model
+        self.params = params
+        self.start = time.monotonic()
+        self.ttft = None
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self.retries = 0
+        self.hedged = False
+
+    def first_token(self):
+        if self.ttft is None:
+            self.ttft = time.monotonic() - self.start
+
+    def usage(self, prompt_tokens, completion_tokens):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+    def retry(self, error):
+        self.retries += 1
+        inc("studybuddy_llm_retries_total", operation=self.operation, error=type(error).__name__)
+
+    def hedge(self):
+        self.hedged = True
+        inc("studybuddy_llm_hedges_total", operation=self.operation)
+
+    def finish(self, status, error=None):
+        elapsed = time.monotonic() - self.start
+        labels = {"operation": self.operation, "model": self.model}
+        inc("studybuddy_llm_requests_total", status=status, **labels)
+        observe("studybuddy_llm_request_seconds", elapsed, status=status, **labels)
+        if self.ttft is not None:
+            observe("studybuddy_llm_ttft_seconds", self.ttft, **labels)
+        if self.prompt_tokens is not None:
+            inc("studybuddy_llm_prompt_tokens_total", self.prompt_tokens, **labels)
+        if self.completion_tokens is not None:
+            inc("studybuddy_llm_completion_tokens_total", self.completion_tokens, **labels)
+            observe("studybuddy_llm_completion_tokens", self.completion_tokens, TOKEN_BUCKETS, **labels)
+        if error is not None:
+            inc("studybuddy_llm_errors_total", operation=self.operation, error=type(error).__name__)
+        _trace({
+            "time": time.time(),
+            "operation": self.operation,
+            "model": self.model,
+            "params": self.params,
+            "status": status,
+            "error": f"{type(error).__name__}: {error}" if error is not None else None,
+            "seconds": round(elapsed, 4),
+            "ttft": round(self.ttft, 4) if self.ttft is not None else None,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "retries": self.retries,
+            "hedged": self.hedged,
+        })
+
+
+class track_call:
+    """
+    Context manager that times a model call and records it on exit
+
+        with track_call("quiz", model, max_tokens=2000) as record:
+            ...
+            record.usage(prompt_tokens, completion_tokens)
+
+    A call abandoned part-way (a stream closed by its consumer) is recorded
+    as "cancelled".
+    """
+
+    def __init__(self, operation, model, **params):
+        self.record = CallRecord(operation, model, **params)
+
+    def __enter__(self):
+        return self.record
+
+    def __exit__(self, kind, error, traceback):
+        if kind is None:
+            self.record.finish("ok")
+        elif issubclass(kind, Exception):
+            self.record.finish("error", error)
+        else:
+            self.record.finish("cancelled")
+        return False
+
+
+def timed(operation):
+    """
+    Decorator recording a function's wall time as studybuddy_operation_seconds
+
+    Generator functions are timed until they are exhausted (or closed).
+
+    Args:
+        operation (str): Label for the timings
+
+    Returns:
+        callable: The decorator
+    """
+    def decorate(fn):
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with _timer(operation):
+                    yield from fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with _timer(operation):
+                    return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class _timer:
+    def __init__(self, operation):
+        self.operation = operation
+
+    def __enter__(self):
+        self.start = time.monotonic()
+
+    def __exit__(self, kind, error, traceback):
+        status = "ok" if kind is None else "error" if issubclass(kind, Exception) else "cancelled"
+        observe("studybuddy_operation_seconds", time.monotonic() - self.start, operation=self.operation, status=status)
+        return False
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0].rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        data = get_registry().render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None, host=METRICS_HOST):
+    """
+    Serve /metrics in a background thread, once per process
+
+    Args:
+        port (int): Port to listen on; defaults to STUDYBUDDY_METRICS_PORT,
+            and nothing is started if neither is set
+        host (str): Interface to bind
+
+    Returns:
+        ThreadingHTTPServer: The server, or None if no port is configured
+    """
+    global _server
+    if port is None:
+        if not METRICS_PORT:
+            return None
+        port = int(METRICS_PORT)
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True, name="metrics").start()
+    return _server
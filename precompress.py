@@ -0,0 +1,420 @@
+"""
+Local extractive pre-compression of long inputs.
+
+Pasted lecture notes are often padded with repeated headings, page
+furniture and copied paragraphs, and every one of those tokens slows the
+model down. Before a text goes into a summary or quiz prompt it is
+cleaned up here, without any model call:
+
+1. Whitespace is normalized, and boilerplate lines are dropped: page and
+   slide labels, bare page numbers that run in sequence through the text,
+   copyright footers, rules, and short lines (running headers) that
+   repeat throughout the text.
+2. Repeated sentences are removed: exact copies (ignoring case and
+   punctuation) and near-duplicates (MinHash over word pairs, with the
+   Jaccard similarity estimated from the full signature).
+3. If the text is still over the token budget, sentences are ranked with
+   TextRank over TF-IDF cosine similarity and the best are kept, in their
+   original order, up to the budget.
+
+Texts shorter than PRECOMPRESS_MIN_TOKENS are returned unchanged. Summaries
+only use steps 1 and 2 (max_tokens=None) and leave the rest to the
+section-by-section summary of long inputs; quizzes use all three.
+
+    python precompress.py notes.txt --max-tokens 3000
+"""
+import argparse
+import itertools
+import os
+import re
+import sys
+import time
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+
+from chunking import CHARS_PER_TOKEN, estimate_tokens
+from metrics import inc, observe
+
+PRECOMPRESS_DISABLED = os.environ.get("STUDYBUDDY_PRECOMPRESS", "1") in ("", "0", "false")
+# Quiz inputs are trimmed to this many tokens, so they fit one prompt
+PRECOMPRESS_MAX_TOKENS = int(os.environ.get("STUDYBUDDY_PRECOMPRESS_MAX_TOKENS", "6000"))
+# Shorter texts are left exactly as they are
+PRECOMPRESS_MIN_TOKENS = 1000
+
+# Short lines seen at least this often are running headers or footers
+REPEATED_LINE_WORDS = 8
+REPEATED_LINE_MIN = 3
+# Number-only lines are page numbers when at least this many count up in sequence
+PAGE_NUMBER_RUN = 3
+# Lines this short without closing punctuation are headings, not sentence text
+HEADING_WORDS = 8
+
+NEAR_DUPLICATE_THRESHOLD = 0.8
+# MinHash signature: BANDS bands of ROWS hashes each
+MINHASH_BANDS = 5
+MINHASH_ROWS = 4
+
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_ITERATIONS = 50
+
+RATIO_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0)
+
+_BLANK_LINES = re.compile(r"\n{2,}")
+_BOILERPLATE = re.compile(
+    r"(?:page|slide)\s*\d+(?:\s*(?:of|/)\s*\d+)?"
+    r"|(?:©|\(c\)|copyright\b).{0,120}"
+    r"|all rights reserved\.?"
+    r"|[\W_]+",
+    re.IGNORECASE,
+)
+_PAGE_NUMBER = re.compile(r"(\d+)(?:\s*(?:of|/)\s*\d+)?")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_CLOSED = re.compile(r"[.!?;:,]$")
+_WORD = re.compile(r"\w+")
+
+STOPWORDS = frozenset("""
+    a about above after again all also am an and any are as at be because been before being below between both
+    but by can could did do does doing down during each few for from further had has have having he her here
+    hers him his how i if in into is it its itself just me more most my no nor not now of off on once only or
+    other our ours out over own same she should so some such than that the their theirs them then there these
+    they this those through to too under until up very was we were what when where which while who whom why
+    will with would you your yours
+""".split())
+
+
+@dataclass(slots=True, frozen=True)
+class Compression:
+    """A pre-compressed text and what was removed to get it"""
+
+    text: str
+    original_tokens: int
+    tokens: int
+    duplicates: int = 0
+    trimmed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def ratio(self):
+        """Compressed size over original size, in estimated tokens"""
+        return self.tokens / self.original_tokens if self.original_tokens else 1.0
+
+
+def _page_numbers(lines):
+    # Positions of number-only lines ("12", "12 / 40") that count up in
+    # sequence, like page footers; a lone "1990" or "3/4" is content
+    numbered = []
+    for i, line in enumerate(lines):
+        match = _PAGE_NUMBER.fullmatch(line)
+        if match:
+            numbered.append((i, int(match.group(1))))
+    found = set()
+    run = numbered[:1]
+    for previous, current in zip(numbered, numbered[1:]):
+        if current[1] == previous[1] + 1:
+            run.append(current)
+            continue
+        if len(run) >= PAGE_NUMBER_RUN:
+            found.update(i for i, _ in run)
+        run = [current]
+    if len(run) >= PAGE_NUMBER_RUN:
+        found.update(i for i, _ in run)
+    return found
+
+
+def normalize(text):
+    """
+    Normalize whitespace and drop boilerplate lines
+
+    Args:
+        text (str): The raw text
+
+    Returns:
+        str: The text with one space between words, one blank line between
+            paragraphs, and no page furniture or repeated short lines
+    """
+    text = unicodedata.normalize("NFKC", text).replace("\r\n", "\n").replace("\r", "\n")
+    lines = [" ".join(line.split()) for line in text.split("\n")]
+    # Spaces are single now, so they count the words; page numbers are
+    # handled separately
+    counts = Counter(line.lower() for line in lines
+                     if line and line.count(" ") < REPEATED_LINE_WORDS and not _PAGE_NUMBER.fullmatch(line))
+    page_numbers = _page_numbers(lines)
+    seen = set()
+    kept = []
+    for i, line in enumerate(lines):
+        if line and (i in page_numbers or _BOILERPLATE.fullmatch(line)):
+            continue
+        key = line.lower()
+        if line and counts[key] >= REPEATED_LINE_MIN:
+            # Keep the first of a repeated heading, header or footer
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(line)
+    return _BLANK_LINES.sub("\n\n", "\n".join(kept)).strip()
+
+
+def _is_heading(line):
+    return line.startswith("#") or (line.count(" ") < HEADING_WORDS and not _CLOSED.search(line))
+
+
+def _units(text):
+    # Headings and sentences as (paragraph number, text, is heading)
+    units = []
+    for number, paragraph in enumerate(text.split("\n\n")):
+        body = []
+        for line in paragraph.split("\n"):
+            if _is_heading(line):
+                units.extend((number, s, False) for s in _SENTENCE_END.split(" ".join(body)) if s)
+                body = []
+                units.append((number, line, True))
+            else:
+                body.append(line)
+        units.extend((number, s, False) for s in _SENTENCE_END.split(" ".join(body)) if s)
+    return units
+
+
+def _assemble(units, keep):
+    paragraphs = []
+    current = None
+    lines = []
+    continues = False
+    for i in sorted(keep):
+        number, text, heading = units[i]
+        if number != current:
+            if lines:
+                paragraphs.append("\n".join(lines))
+            current, lines, continues = number, [], False
+        if continues and not heading:
+            lines[-1] += " " + text
+        else:
+            lines.append(text)
+        continues = not heading
+    if lines:
+        paragraphs.append("\n".join(lines))
+    return "\n\n".join(paragraphs)
+
+
+def _word_ids(words):
+    # Content words of each unit as vocabulary IDs, flattened, with the
+    # unit position each one belongs to
+    import numpy as np
+
+    flat = list(itertools.chain.from_iterable(words))
+    vocabulary = {word: i for i, word in enumerate(dict.fromkeys(flat))}
+    ids = np.fromiter(map(vocabulary.__getitem__, flat), dtype=np.int64, count=len(flat))
+    owner = np.repeat(np.arange(len(words)), [len(unit) for unit in words])
+    # Drop stopwords and single characters
+    content = np.fromiter((len(w) > 1 and w not in STOPWORDS for w in vocabulary), dtype=bool, count=len(vocabulary))
+    mask = content[ids]
+    return ids[mask], owner[mask], len(vocabulary)
+
+
+def _near_duplicates(flat, owner, vocabulary_size, count):
+    """
+    Find units that nearly repeat an earlier one
+
+    Args:
+        flat (numpy.ndarray): Word IDs of all units, in order
+        owner (numpy.ndarray): Unit position of each word ID
+        vocabulary_size (int): Number of distinct word IDs
+        count (int): Number of units
+
+    Returns:
+        set: Positions of the units to drop
+    """
+    import numpy as np
+
+    # Shingles: word pairs within a unit, or the word itself for one-word units
+    same = owner[:-1] == owner[1:]
+    pairs = flat[:-1][same] * vocabulary_size + flat[1:][same]
+    pair_owner = owner[:-1][same]
+    lengths = np.bincount(owner, minlength=count)
+    single = lengths[owner] == 1
+    shingles = np.concatenate([pairs, flat[single] + vocabulary_size * vocabulary_size]).astype(np.uint64)
+    shingle_owner = np.concatenate([pair_owner, owner[single]])
+    if not len(shingles):
+        return set()
+    order = np.argsort(shingle_owner, kind="stable")
+    shingles = shingles[order] & np.uint64(0xFFFFFFFF)
+    shingle_owner = shingle_owner[order]
+    starts = np.flatnonzero(np.r_[True, shingle_owner[1:] != shingle_owner[:-1]])
+
+    # MinHash signatures, then one bucket key per band
+    rng = np.random.default_rng(0)
+    hashes = MINHASH_BANDS * MINHASH_ROWS
+    a = rng.integers(1, 2 ** 31, size=hashes, dtype=np.uint64)
+    b = rng.integers(0, 2 ** 31, size=hashes, dtype=np.uint64)
+    values = (shingles[:, None] * a + b) % np.uint64(2 ** 61 - 1)
+    signatures = np.minimum.reduceat(values, starts, axis=0)
+    mix = rng.integers(1, 2 ** 63, size=MINHASH_ROWS, dtype=np.uint64) | np.uint64(1)
+    keys = (signatures.reshape(len(starts), MINHASH_BANDS, MINHASH_ROWS) * mix).sum(axis=2)
+
+    # Units whose keys collide in some band are candidates; each is checked
+    # against the earliest unit in its bucket
+    rows = np.arange(len(starts))
+    dropped_rows = np.zeros(len(starts), dtype=bool)
+    for band in keys.T:
+        order = np.argsort(band, kind="stable")
+        first = np.r_[True, band[order][1:] != band[order][:-1]]
+        earliest = order[np.flatnonzero(first)[np.cumsum(first) - 1]]
+        candidate, original = order[~first], earliest[~first]
+        # The share of equal MinHash values estimates the Jaccard similarity
+        agreement = (signatures[candidate] == signatures[original]).mean(axis=1)
+        dropped_rows[candidate[agreement >= NEAR_DUPLICATE_THRESHOLD]] = True
+    dropped = set(shingle_owner[starts[rows[dropped_rows]]].tolist())
+    return dropped
+
+
+def textrank(flat, owner, vocabulary_size, count):
+    """
+    Score units by TextRank over the TF-IDF cosine similarity between them
+
+    The similarity matrix is never built: with unit-length TF-IDF rows X,
+    S @ v is X @ (X.T @ v) minus the diagonal, computed from the sparse
+    entries with bincount, so each iteration is linear in the word count.
+
+    Args:
+        flat (numpy.ndarray): Word IDs of all units, in order
+        owner (numpy.ndarray): Unit position of each word ID
+        vocabulary_size (int): Number of distinct word IDs
+        count (int): Number of units
+
+    Returns:
+        numpy.ndarray: One score per unit (higher is more central)
+    """
+    import numpy as np
+
+    entries, counts = np.unique(owner.astype(np.int64) * vocabulary_size + flat, return_counts=True)
+    rows = entries // vocabulary_size
+    cols = entries % vocabulary_size
+    document_frequency = np.bincount(cols, minlength=vocabulary_size)
+    values = (1 + np.log(counts)) * (np.log((1 + count) / (1 + document_frequency[cols])) + 1)
+    norms = np.sqrt(np.bincount(rows, values ** 2, minlength=count))
+    values /= norms[rows]
+    diagonal = np.bincount(rows, values ** 2, minlength=count)
+
+    def similarity(v):
+        projected = np.bincount(cols, values * v[rows], minlength=vocabulary_size)
+        return np.bincount(rows, values * projected[cols], minlength=count) - diagonal * v
+
+    degree = similarity(np.ones(count))
+    connected = degree > 1e-9
+    scores = np.full(count, 1.0 / count)
+    for _ in range(TEXTRANK_ITERATIONS):
+        spread = np.divide(scores, degree, out=np.zeros(count), where=connected)
+        updated = (1 - TEXTRANK_DAMPING) / count + TEXTRANK_DAMPING * similarity(spread)
+        if np.abs(updated - scores).sum() < 1e-6:
+            return updated
+        scores = updated
+    return scores
+
+
+def _select(units, keep, scores, max_tokens):
+    # Best units first; a unit's paragraph headings come with it
+    headings = {}
+    for i in keep:
+        if units[i][2]:
+            headings.setdefault(units[i][0], []).append(i)
+    chosen = set()
+    opened = set()
+    budget = max_tokens
+    for position in sorted(range(len(keep)), key=lambda p: -scores[p]):
+        i = keep[position]
+        if i in chosen:
+            continue
+        number = units[i][0]
+        extra = [h for h in headings.get(number, ()) if h != i] if number not in opened else []
+        cost = estimate_tokens(units[i][1]) + sum(estimate_tokens(units[h][1]) for h in extra)
+        if cost > budget:
+            continue
+        budget -= cost
+        chosen.add(i)
+        chosen.update(extra)
+        opened.add(number)
+    return chosen
+
+
+def precompress(text, max_tokens=PRECOMPRESS_MAX_TOKENS, operation=None):
+    """
+    Shrink a text before it goes into a prompt, keeping its sentences in order
+
+    Args:
+        text (str): The input text
+        max_tokens (int): Token budget for the result (None for no trimming)
+        operation (str): What the text is for (e.g. "summary"), for metrics
+
+    Returns:
+        Compression: The compressed text and its compression ratio
+    """
+    started = time.perf_counter()
+    original_tokens = estimate_tokens(text)
+    if PRECOMPRESS_DISABLED or original_tokens < PRECOMPRESS_MIN_TOKENS:
+        return Compression(text, original_tokens, original_tokens)
+
+    units = _units(normalize(text))
+    keep = []
+    words = []
+    seen = set()
+    for i, (_, unit, _) in enumerate(units):
+        unit_words = _WORD.findall(unit.lower())
+        key = " ".join(unit_words)
+        if key and key not in seen:
+            seen.add(key)
+            keep.append(i)
+            words.append(unit_words)
+    duplicates = len(units) - len(keep)
+
+    trimmed = 0
+    if words:
+        import numpy as np
+
+        flat, owner, vocabulary_size = _word_ids(words)
+        if len(flat):
+            dropped = _near_duplicates(flat, owner, vocabulary_size, len(keep))
+            if dropped:
+                duplicates += len(dropped)
+                remaining = np.array([p not in dropped for p in range(len(keep))])
+                renumber = np.cumsum(remaining) - 1
+                mask = remaining[owner]
+                flat, owner = flat[mask], renumber[owner[mask]]
+                keep = [i for p, i in enumerate(keep) if remaining[p]]
+            if max_tokens is not None and sum(estimate_tokens(units[i][1]) for i in keep) > max_tokens:
+                scores = textrank(flat, owner, vocabulary_size, len(keep))
+                chosen = _select(units, keep, scores, max_tokens)
+                trimmed = len(keep) - len(chosen)
+                keep = sorted(chosen)
+
+    result = _assemble(units, keep)
+    if max_tokens is not None and estimate_tokens(result) > max_tokens:
+        # Only possible for a text with no sentence breaks at all
+        result = result[:max_tokens * CHARS_PER_TOKEN]
+    compression = Compression(result, original_tokens, estimate_tokens(result), duplicates, trimmed,
+                              time.perf_counter() - started)
+    labels = {"operation": operation} if operation else {}
+    observe("studybuddy_precompress_ratio", compression.ratio, RATIO_BUCKETS, **labels)
+    observe("studybuddy_precompress_seconds", compression.seconds, **labels)
+    inc("studybuddy_precompress_saved_tokens_total", original_tokens - compression.tokens, **labels)
+    return compression
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", help="text file to compress (default: stdin)")
+    parser.add_argument("--max-tokens", type=int, default=PRECOMPRESS_MAX_TOKENS)
+    parser.add_argument("--show", action="store_true", help="print the compressed text")
+    args = parser.parse_args()
+    if args.path:
+        with open(args.path, encoding="utf-8") as source:
+            text = source.read()
+    else:
+        text = sys.stdin.read()
+    result = precompress(text, args.max_tokens)
+    if args.show:
+        print(result.text)
+    print(
+        f"{result.original_tokens} -> {result.tokens} tokens (ratio {result.ratio:.2f}), "
+        f"{result.duplicates} duplicate and {result.trimmed} trimmed sentences, {result.seconds * 1000:.1f} ms",
+        file=sys.stderr,
+    )
@@ -0,0 +1,221 @@
+"""
+Persistent bank of validated quiz questions.
+
+Every question that survives validation is stored in SQLite together with
+a fingerprint of the section of text it was written from, and indexed
+with FTS5. Before asking the model for a quiz, the generator functions
+take what they can from the bank and only generate the shortfall.
+
+A banked question is reused for new text when:
+- it came from a section with the same fingerprint, or
+- a full-text search matches it and the new text covers most of the
+  question's words, including all of its answer.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from cache import normalize_text
+from chunking import split_text
+from dedup import NearDuplicateFilter
+
+BANK_PATH = os.environ.get("STUDYBUDDY_QUESTION_BANK_PATH", ".cache/questions.sqlite3")
+# Size of the text sections that questions are fingerprinted against
+BANK_SECTION_TOKENS = 400
+# Share of a searched question's words that must appear in the new text
+BANK_MIN_COVERAGE = 0.6
+BANK_SEARCH_TERMS = 40
+BANK_SEARCH_LIMIT = 200
+
+# Question types allowed for each option of the Quiz Generator
+BANK_TYPES = {
+    "Multiple Choice": ("multiple_choice",),
+    "True/False": ("true_false",),
+    "Fill in the Blank": ("fill_blank",),
+    "Mixed": ("multiple_choice", "true_false", "fill_blank"),
+}
+
+_WORD = re.compile(r"\w{4,}")
+
+
+def _words(text):
+    return {word for word in _WORD.findall(text.lower()) if not word.isdigit()}
+
+
+def fingerprint(section):
+    """
+    Args:
+        section (str): A section of source text
+
+    Returns:
+        str: A short digest that ignores case and whitespace
+    """
+    return hashlib.sha256(normalize_text(section).lower().encode("utf-8")).hexdigest()[:20]
+
+
+def _sections(text):
+    return [(fingerprint(section), _words(section)) for section in split_text(text, BANK_SECTION_TOKENS)]
+
+
+def _grounded(question, words):
+    # Enough of the question, and all of the answer, appears in the text
+    asked = _words(question["question"]) | _words(question["answer"])
+    if asked and len(asked & words) < BANK_MIN_COVERAGE * len(asked):
+        return False
+    return question["type"] == "true_false" or _words(question["answer"]) <= words
+
+
+class QuestionBank:
+    """
+    SQLite store of questions with an FTS5 index over their text.
+
+    Questions are keyed by their normalized wording, so the same question
+    is stored once however many times it is generated. Retrieval prefers
+    questions that have been served least, so repeated quizzes on the same
+    material rotate through the bank.
+    """
+
+    def __init__(self, path=BANK_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS questions ("
+            " id INTEGER PRIMARY KEY,"
+            " key TEXT UNIQUE NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " type TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " served INTEGER NOT NULL DEFAULT 0,"
+            " created REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS questions_fingerprint ON questions (fingerprint)")
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(question, answer, explanation)"
+            )
+            self.full_text = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: only exact section matches are used
+            self.full_text = False
+        self._conn.commit()
+
+    def add(self, text, questions):
+        """
+        Store questions generated from a text
+
+        Args:
+            text (str): The text the questions were generated from
+            questions (list): Validated question dictionaries
+
+        Returns:
+            int: How many of them were new to the bank
+        """
+        sections = _sections(text)
+        if not sections or not questions:
+            return 0
+        added = 0
+        with self._lock:
+            for question in questions:
+                # File the question under the section it draws on most
+                asked = _words(question["question"]) | _words(question["answer"])
+                section = max(sections, key=lambda s: len(asked & s[1]))[0]
+                key = hashlib.sha256(normalize_text(question["question"]).lower().encode("utf-8")).hexdigest()
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO questions (key, fingerprint, type, data, created) VALUES (?, ?, ?, ?, ?)",
+                    (key, section, question["type"], json.dumps(question, ensure_ascii=False), time.time()),
+                )
+                if cursor.rowcount and self.full_text:
+                    self._conn.execute(
+                        "INSERT INTO questions_fts (rowid, question, answer, explanation) VALUES (?, ?, ?, ?)",
+                        (cursor.lastrowid, question["question"], question["answer"], question.get("explanation", "")),
+                    )
+                added += cursor.rowcount
+            self._conn.commit()
+        return added
+
+    def find(self, text, num_questions, question_type="Mixed"):
+        """
+        Take banked questions that fit a text
+
+        Args:
+            text (str): The text to quiz on
+            num_questions (int): The most questions to return
+            question_type (str): Quiz Generator question type option
+
+        Returns:
+            list: Up to num_questions question dictionaries
+        """
+        sections = _sections(text)
+        if not sections:
+            return []
+        types = BANK_TYPES.get(question_type, BANK_TYPES["Mixed"])
+        fingerprints = [fp for fp, _ in sections]
+        words = set().union(*(w for _, w in sections))
+        with self._lock:
+            exact = self._conn.execute(
+                f"SELECT id, data, served FROM questions WHERE fingerprint IN ({','.join('?' * len(fingerprints))})"
+                f" AND type IN ({','.join('?' * len(types))})",
+                (*fingerprints, *types),
+            ).fetchall()
+            searched = []
+            if self.full_text:
+                counts = Counter(w for w in _WORD.findall(text.lower()) if not w.isdigit())
+                terms = [w for w, _ in counts.most_common(BANK_SEARCH_TERMS)]
+                if terms:
+                    searched = self._conn.execute(
+                        "SELECT q.id, q.data, q.served FROM questions_fts JOIN questions q ON q.id = questions_fts.rowid"
+                        f" WHERE questions_fts MATCH ? AND q.type IN ({','.join('?' * len(types))})"
+                        " ORDER BY bm25(questions_fts) LIMIT ?",
+                        (" OR ".join(f'"{t}"' for t in terms), *types, BANK_SEARCH_LIMIT),
+                    ).fetchall()
+
+            # Same-section questions first, then search hits that the text supports
+            candidates = sorted(exact, key=lambda row: row[2])
+            seen_ids = {row[0] for row in exact}
+            for row in sorted(searched, key=lambda row: row[2]):
+                if row[0] not in seen_ids and _grounded(json.loads(row[1]), words):
+                    seen_ids.add(row[0])
+                    candidates.append(row)
+
+            chosen, ids = [], []
+            duplicates = NearDuplicateFilter()
+            for row_id, data, _ in candidates:
+                if len(chosen) >= num_questions:
+                    break
+                question = json.loads(data)
+                if duplicates.add(question["question"]):
+                    chosen.append(question)
+                    ids.append(row_id)
+            if ids:
+                self._conn.executemany("UPDATE questions SET served = served + 1 WHERE id = ?", [(i,) for i in ids])
+                self._conn.commit()
+        return chosen
+
+
+_bank = None
+_bank_lock = threading.Lock()
+
+
+def get_question_bank():
+    """
+    Return the process-wide question bank, creating it on first use
+
+    Returns:
+        QuestionBank: The shared bank
+    """
+    global _bank
+    if _bank is None:
+        with _bank_lock:
+            if _bank is None:
+                _bank = QuestionBank()
+    return _bank
@@ -0,0 +1,316 @@
+"""
+Spaced-repetition review of quiz questions.
+
+Graded quiz questions become review cards, scheduled with SM-2: each
+review stretches the card's interval by its ease factor, and answers
+graded as forgotten send it back to the start. Reviews are served from
+the store without any model call.
+
+Cards are persisted in SQLite. For "what's due now" each deck also has an
+in-memory min-heap of (due, card id), built on first use; rescheduling a
+card pushes a fresh entry and leaves the old one to be skipped when it
+surfaces, so both operations are O(log n). Only the most recently used
+decks keep their heaps in memory, and decks left unused for
+DECK_TTL_SECONDS are deleted.
+"""
+import hashlib
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from cache import normalize_text
+
+CARDS_PATH = os.environ.get("STUDYBUDDY_CARDS_PATH", ".cache/cards.sqlite3")
+# Decks whose due-date heaps are kept in memory; others are rebuilt from disk
+CARDS_MAX_DECKS = int(os.environ.get("STUDYBUDDY_CARDS_MAX_DECKS", "1024"))
+DECK_TTL_SECONDS = int(os.environ.get("STUDYBUDDY_DECK_TTL_SECONDS", str(180 * 24 * 3600)))
+# How many deck writes between two sweeps of abandoned decks
+EXPIRE_EVERY = 64
+
+DAY = 24 * 3600
+# A forgotten card comes back after this long, to be relearned
+RELEARN_SECONDS = 10 * 60
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+
+# Review grades (SM-2 quality scores)
+AGAIN = 1
+HARD = 3
+GOOD = 4
+EASY = 5
+GRADES = {"Again": AGAIN, "Hard": HARD, "Good": GOOD, "Easy": EASY}
+
+
+@dataclass(slots=True)
+class Card:
+    """One question under review and its SM-2 state"""
+
+    id: int
+    deck: str
+    question: dict
+    ease: float = INITIAL_EASE
+    interval: float = 0.0
+    repetitions: int = 0
+    lapses: int = 0
+    due: float = 0.0
+
+
+def schedule(card, grade, now=None):
+    """
+    Apply one SM-2 review to a card
+
+    Args:
+        card (Card): The card; updated in place
+        grade (int): Recall quality from 0 (forgot) to 5 (perfect)
+        now (float): Review time (defaults to the current time)
+
+    Returns:
+        Card: The same card
+    """
+    now = time.time() if now is None else now
+    if grade < 3:
+        card.repetitions = 0
+        card.interval = 0.0
+        card.lapses += 1
+        card.due = now + RELEARN_SECONDS
+    else:
+        card.repetitions += 1
+        if card.repetitions == 1:
+            card.interval = 1.0
+        elif card.repetitions == 2:
+            card.interval = 6.0
+        else:
+            card.interval = round(card.interval * card.ease, 1)
+        card.due = now + card.interval * DAY
+    card.ease = max(MIN_EASE, card.ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    return card
+
+
+def _question_key(question):
+    return hashlib.sha256(normalize_text(question["question"]).lower().encode("utf-8")).hexdigest()
+
+
+class CardStore:
+    """
+    Review cards for every deck, persisted in SQLite.
+
+    A deck is one student's set of cards. Each deck's due-date heap lives
+    in this process; keep reviews for a deck on one server process. At most
+    `max_decks` heaps are kept, least recently used first out, and decks
+    not written to for `ttl_seconds` are deleted with their cards.
+    """
+
+    def __init__(self, path=CARDS_PATH, max_decks=CARDS_MAX_DECKS, ttl_seconds=DECK_TTL_SECONDS):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_decks = max_decks
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._heaps = OrderedDict()
+        self._due = {}
+        self._writes = 0
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cards ("
+            " id INTEGER PRIMARY KEY,"
+            " deck TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " question TEXT NOT NULL,"
+            " ease REAL NOT NULL,"
+            " interval REAL NOT NULL,"
+            " repetitions INTEGER NOT NULL,"
+            " lapses INTEGER NOT NULL,"
+            " due REAL NOT NULL,"
+            " UNIQUE (deck, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cards_deck_due ON cards (deck, due)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS decks (deck TEXT PRIMARY KEY, used REAL NOT NULL)")
+        # Decks from before their use was tracked count as used now
+        self._conn.execute("INSERT OR IGNORE INTO decks SELECT DISTINCT deck, ? FROM cards", (time.time(),))
+        self._expire()
+        self._conn.commit()
+
+    def _heap(self, deck):
+        # Build the deck's heap from disk the first time it is needed
+        if deck in self._heaps:
+            self._heaps.move_to_end(deck)
+            return self._heaps[deck]
+        rows = self._conn.execute("SELECT id, due FROM cards WHERE deck = ?", (deck,)).fetchall()
+        self._due[deck] = dict(rows)
+        heap = [(due, card_id) for card_id, due in rows]
+        heapq.heapify(heap)
+        self._heaps[deck] = heap
+        while len(self._heaps) > self.max_decks:
+            evicted, _ = self._heaps.popitem(last=False)
+            del self._due[evicted]
+        return heap
+
+    def _touch(self, deck):
+        # Record that the deck is in use, and now and then delete abandoned ones
+        self._conn.execute("INSERT OR REPLACE INTO decks (deck, used) VALUES (?, ?)", (deck, time.time()))
+        self._writes += 1
+        if self._writes % EXPIRE_EVERY == 0:
+            self._expire()
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [deck for (deck,) in self._conn.execute("SELECT deck FROM decks WHERE used < ?", (cutoff,))]
+        for deck in expired:
+            self._conn.execute("DELETE FROM cards WHERE deck = ?", (deck,))
+            self._conn.execute("DELETE FROM decks WHERE deck = ?", (deck,))
+            self._heaps.pop(deck, None)
+            self._due.pop(deck, None)
+
+    def _push(self, deck, card_id, due):
+        current = self._due[deck]
+        heap = self._heaps[deck]
+        current[card_id] = due
+        heapq.heappush(heap, (due, card_id))
+        if len(heap) > 2 * len(current) + 64:
+            # Mostly superseded entries: rebuild from the live due dates
+            heap[:] = [(d, i) for i, d in current.items()]
+            heapq.heapify(heap)
+
+    def _load(self, card_id):
+        row = self._conn.execute(
+            "SELECT id, deck, question, ease, interval, repetitions, lapses, due FROM cards WHERE id = ?",
+            (card_id,),
+        ).fetchone()
+        return Card(row[0], row[1], json.loads(row[2]), *row[3:])
+
+    def _write(self, card):
+        self._conn.execute(
+            "UPDATE cards SET ease = ?, interval = ?, repetitions = ?, lapses = ?, due = ? WHERE id = ?",
+            (card.ease, card.interval, card.repetitions, card.lapses, card.due, card.id),
+        )
+
+    def add_results(self, deck, quiz, results, now=None):
+        """
+        Turn a graded quiz into review cards
+
+        Questions answered wrongly are due straight away; correct ones count
+        as a first successful review. A question already in the deck is
+        rescheduled instead of added again, but answering it correctly before
+        it is due leaves its schedule as it is, so retaking a quiz doesn't
+        stretch its intervals.
+
+        Args:
+            deck (str): The student's deck
+            quiz (list): Question dictionaries
+            results (list): True/False per question, from grade_quiz()
+            now (float): Time of the quiz (defaults to the current time)
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._heap(deck)
+            self._touch(deck)
+            for question, correct in zip(quiz, results):
+                key = _question_key(question)
+                row = self._conn.execute("SELECT id FROM cards WHERE deck = ? AND key = ?", (deck, key)).fetchone()
+                if row is None:
+                    cursor = self._conn.execute(
+                        "INSERT INTO cards (deck, key, question, ease, interval, repetitions, lapses, due)"
+                        " VALUES (?, ?, ?, ?, 0, 0, 0, ?)",
+                        (deck, key, json.dumps(question, ensure_ascii=False), INITIAL_EASE, now),
+                    )
+                    card = self._load(cursor.lastrowid)
+                    if correct:
+                        schedule(card, GOOD, now)
+                else:
+                    card = self._load(row[0])
+                    if correct and card.due > now:
+                        # Answered early: not a review, so nothing changes
+                        continue
+                    schedule(card, GOOD if correct else AGAIN, now)
+                    if not correct:
+                        card.due = now
+                self._write(card)
+                self._push(deck, card.id, card.due)
+            self._conn.commit()
+
+    def next_due(self, deck, now=None):
+        """
+        Args:
+            deck (str): The student's deck
+            now (float): Current time (defaults to the current time)
+
+        Returns:
+            Card: The most overdue card, or None if nothing is due
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            heap = self._heap(deck)
+            current = self._due[deck]
+            while heap:
+                due, card_id = heap[0]
+                if current.get(card_id) != due:
+                    # Superseded by a later reschedule
+                    heapq.heappop(heap)
+                    continue
+                return self._load(card_id) if due <= now else None
+            return None
+
+    def review(self, card, grade, now=None):
+        """
+        Record a review and reschedule the card
+
+        Args:
+            card (Card): A card from next_due()
+            grade (int): Recall quality (see GRADES)
+            now (float): Review time (defaults to the current time)
+
+        Returns:
+            Card: The rescheduled card
+        """
+        with self._lock:
+            self._heap(card.deck)
+            schedule(card, grade, now)
+            self._touch(card.deck)
+            self._write(card)
+            self._conn.commit()
+            self._push(card.deck, card.id, card.due)
+        return card
+
+    def counts(self, deck, now=None):
+        """
+        Args:
+            deck (str): The student's deck
+            now (float): Current time (defaults to the current time)
+
+        Returns:
+            tuple: (cards due now, cards in the deck)
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            (due,) = self._conn.execute(
+                "SELECT COUNT(*) FROM cards WHERE deck = ? AND due <= ?", (deck, now)
+            ).fetchone()
+            (total,) = self._conn.execute("SELECT COUNT(*) FROM cards WHERE deck = ?", (deck,)).fetchone()
+        return due, total
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_card_store():
+    """
+    Return the process-wide card store, creating it on first use
+
+    Returns:
+        CardStore: The shared store
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CardStore()
+    return _store
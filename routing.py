@@ -0,0 +1,123 @@
+"""
+Model and output-budget routing for generation requests.
+
+Every call used to go to the full model with a fixed max_tokens (1000 for
+summaries, 2000 for quizzes). Here each request gets a completion budget
+sized to what was asked for (the summary length, the number and type of
+questions) and goes to the smaller, faster model when both its input and
+its output are small enough that the full model adds little.
+
+Set STUDYBUDDY_ROUTING=0 to send everything to the full model with the
+old fixed budgets.
+"""
+import os
+from dataclasses import dataclass
+
+from backends import MODEL
+from chunking import estimate_tokens
+
+ROUTING_DISABLED = os.environ.get("STUDYBUDDY_ROUTING", "1") in ("", "0", "false")
+SMALL_MODEL = os.environ.get("STUDYBUDDY_SMALL_MODEL", "gpt-4o-mini")
+# Longest input (in tokens) a summary or quiz is sent to the small model with
+SMALL_MODEL_MAX_INPUT_TOKENS = int(os.environ.get("STUDYBUDDY_SMALL_MODEL_MAX_INPUT_TOKENS", "2000"))
+# Summaries and quizzes up to these sizes count as small
+SMALL_SUMMARY_LENGTHS = ("Very Short", "Short")
+SMALL_QUIZ_QUESTIONS = 3
+
+# Completion budgets: roughly 1.3 tokens per word of the target length,
+# with headroom so the model isn't cut off mid-sentence
+SUMMARY_MAX_TOKENS = {
+    "Very Short": 250,
+    "Short": 400,
+    "Medium": 700,
+    "Detailed": 1000,
+}
+# Per question, including its JSON, options and explanation
+QUESTION_MAX_TOKENS = {
+    "Multiple Choice": 170,
+    "True/False": 100,
+    "Fill in the Blank": 110,
+    "Mixed": 140,
+}
+QUIZ_OVERHEAD_TOKENS = 60
+QUIZ_MAX_TOKENS = 2000
+SECTION_NOTES_MAX_TOKENS = 500
+
+
+@dataclass(slots=True, frozen=True)
+class Route:
+    """Where to send a request and how long its response may be"""
+
+    model: str
+    max_tokens: int
+
+
+def _model(text, small_output):
+    if ROUTING_DISABLED or not small_output:
+        return MODEL
+    return SMALL_MODEL if estimate_tokens(text) <= SMALL_MODEL_MAX_INPUT_TOKENS else MODEL
+
+
+def _quiz_tokens(num_questions, question_type):
+    per_question = QUESTION_MAX_TOKENS.get(question_type, QUESTION_MAX_TOKENS["Mixed"])
+    return min(QUIZ_MAX_TOKENS, QUIZ_OVERHEAD_TOKENS + num_questions * per_question)
+
+
+def route_summary(text, summary_length):
+    """
+    Args:
+        text (str): The text going into the summary prompt
+        summary_length (str): Summary length option
+
+    Returns:
+        Route: Model and max_tokens for the summary
+    """
+    if ROUTING_DISABLED:
+        return Route(MODEL, 1000)
+    return Route(_model(text, summary_length in SMALL_SUMMARY_LENGTHS), SUMMARY_MAX_TOKENS[summary_length])
+
+
+def route_quiz(text, num_questions, question_type):
+    """
+    Args:
+        text (str): The text going into the quiz prompt
+        num_questions (int): Questions asked for in this request
+        question_type (str): Question type option
+
+    Returns:
+        Route: Model and max_tokens for the quiz
+    """
+    if ROUTING_DISABLED:
+        return Route(MODEL, QUIZ_MAX_TOKENS)
+    return Route(_model(text, num_questions <= SMALL_QUIZ_QUESTIONS), _quiz_tokens(num_questions, question_type))
+
+
+def route_study_pack(text, summary_length, num_questions, question_type):
+    """
+    Args:
+        text (str): The text going into the study-pack prompt
+        summary_length (str): Summary length option
+        num_questions (int): Questions asked for in this request
+        question_type (str): Question type option
+
+    Returns:
+        Route: Model and max_tokens for the combined summary and quiz
+    """
+    if ROUTING_DISABLED:
+        return Route(MODEL, 1000 + QUIZ_MAX_TOKENS)
+    small = summary_length in SMALL_SUMMARY_LENGTHS and num_questions <= SMALL_QUIZ_QUESTIONS
+    return Route(_model(text, small), SUMMARY_MAX_TOKENS[summary_length] + _quiz_tokens(num_questions, question_type))
+
+
+def route_section_notes(chunk):
+    """
+    Args:
+        chunk (str): One section of a long document
+
+    Returns:
+        Route: Model and max_tokens for the section's notes
+    """
+    # Notes are an intermediate step that the final summary is written from
+    if ROUTING_DISABLED:
+        return Route(MODEL, SECTION_NOTES_MAX_TOKENS)
+    return Route(SMALL_MODEL, SECTION_NOTES_MAX_TOKENS)
@@ -0,0 +1,271 @@
+import hashlib
+import json
+import re
+
+from metrics import inc
+
+# Shapes the app relies on:
+#   question:     {"question": str, "type": one of QUESTION_TYPES,
+#                  "options": [str, ...] (multiple_choice only, 2 or more, containing the answer),
+#                  "answer": str ("True"/"False" for true_false), "explanation": str (optional)}
+#   tip category: {"title": str, "tips": [str, ...] (at least one)}
+QUESTION_TYPES = ("multiple_choice", "true_false", "fill_blank")
+
+# Spellings of question types the model has been seen to use
+_TYPE_ALIASES = {
+    "multiple_choice": "multiple_choice",
+    "multiplechoice": "multiple_choice",
+    "multiple": "multiple_choice",
+    "mcq": "multiple_choice",
+    "mc": "multiple_choice",
+    "true_false": "true_false",
+    "truefalse": "true_false",
+    "true_or_false": "true_false",
+    "boolean": "true_false",
+    "tf": "true_false",
+    "fill_blank": "fill_blank",
+    "fill_in_the_blank": "fill_blank",
+    "fill_in_blank": "fill_blank",
+    "fillblank": "fill_blank",
+    "fill": "fill_blank",
+    "short_answer": "fill_blank",
+}
+
+# Keys the model nests lists under instead of returning a bare array
+_QUESTION_KEYS = ("questions", "quiz", "items", "data", "results")
+_CATEGORY_KEYS = ("categories", "tips", "study_tips", "items", "data", "results")
+
+
+def extract_json(content):
+    """
+    Parse the JSON value in a model response, tolerating code fences and
+    any text before or after it
+
+    Args:
+        content (str): The raw response content
+
+    Returns:
+        The parsed JSON value
+
+    Raises:
+        ValueError: If no JSON value can be found
+    """
+    # strict=False accepts raw newlines inside strings
+    decoder = json.JSONDecoder(strict=False)
+    try:
+        return decoder.decode(content)
+    except ValueError:
+        pass
+    for match in re.finditer(r"[\[{]", content):
+        try:
+            value, _ = decoder.raw_decode(content, match.start())
+            return value
+        except ValueError:
+            continue
+    raise ValueError("Invalid response format from API")
+
+
+def find_items(data, keys, looks_like_item):
+    """
+    Find the list of items in a parsed response, wherever the model put it
+
+    Args:
+        data: The parsed JSON value
+        keys (tuple): Keys the list is usually nested under, in preference order
+        looks_like_item (callable): Returns True for a dict that is itself one item
+
+    Returns:
+        list: The items found (possibly empty)
+    """
+    if isinstance(data, list):
+        return data
+    if not isinstance(data, dict):
+        return []
+    if looks_like_item(data):
+        return [data]
+    for key in keys:
+        if isinstance(data.get(key), list):
+            return data[key]
+    # Otherwise take the first list of objects, one level of nesting deep
+    for value in data.values():
+        if isinstance(value, list) and value and isinstance(value[0], dict):
+            return value
+    for value in data.values():
+        if isinstance(value, dict):
+            items = find_items(value, keys, looks_like_item)
+            if items:
+                return items
+    return []
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "True" if value else "False"
+    return str(value).strip()
+
+
+def repair_question(question):
+    """
+    Coerce a question into the expected shape, or reject it
+
+    Fixes type spellings, True/False casing, answers given as option letters
+    or with different casing, answers missing from the options (inserted at
+    a position derived from the question text), and
+    multiple-choice questions without usable options (which become
+    fill-in-the-blank).
+
+    Args:
+        question: A single item from the model's question list
+
+    Returns:
+        dict: The repaired question, or None if it can't be salvaged
+    """
+    if not isinstance(question, dict):
+        return None
+    text = _text(question.get("question") or question.get("prompt") or question.get("text"))
+    answer = _text(question.get("answer", question.get("correct_answer")))
+    if not text or not answer:
+        return None
+
+    raw_type = re.sub(r"[^a-z]+", "_", _text(question.get("type")).lower()).strip("_")
+    qtype = _TYPE_ALIASES.get(raw_type)
+    options = question.get("options") or question.get("choices")
+    if isinstance(options, dict):
+        options = list(options.values())
+    options = [_text(option) for option in options] if isinstance(options, list) else []
+    options = [option for option in options if option]
+
+    if qtype is None:
+        if len(options) >= 2:
+            qtype = "multiple_choice"
+        elif answer.lower() in ("true", "false"):
+            qtype = "true_false"
+        else:
+            qtype = "fill_blank"
+
+    if qtype == "true_false":
+        if answer.lower() not in ("true", "false"):
+            return None
+        answer = answer.capitalize()
+    elif qtype == "multiple_choice":
+        if len(options) < 2:
+            qtype = "fill_blank"
+        else:
+            letter = re.fullmatch(r"\(?([A-Da-d])[).]?", answer)
+            matches = [option for option in options if option.lower() == answer.lower()]
+            if matches:
+                answer = matches[0]
+            elif letter and ord(letter.group(1).upper()) - ord("A") < len(options):
+                answer = options[ord(letter.group(1).upper()) - ord("A")]
+            else:
+                # Put it at a position that depends on the question, not always last,
+                # so its position doesn't give the answer away
+                digest = hashlib.sha256(text.encode("utf-8")).digest()
+                options.insert(int.from_bytes(digest[:4], "big") % (len(options) + 1), answer)
+
+    repaired = {"question": text, "type": qtype}
+    if qtype == "multiple_choice":
+        repaired["options"] = options
+    repaired["answer"] = answer
+    explanation = _text(question.get("explanation"))
+    if explanation:
+        repaired["explanation"] = explanation
+    return repaired
+
+
+def repair_tip_category(category):
+    """
+    Coerce a study-tip category into {"title": str, "tips": [str, ...]}, or reject it
+
+    Args:
+        category: A single item from the model's category list
+
+    Returns:
+        dict: The repaired category, or None if it can't be salvaged
+    """
+    if not isinstance(category, dict):
+        return None
+    title = _text(category.get("title") or category.get("category") or category.get("name"))
+    tips = category.get("tips") or category.get("items") or category.get("strategies")
+    if isinstance(tips, str):
+        tips = tips.splitlines()
+    if not isinstance(tips, list):
+        return None
+    tips = [re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", _text(tip)) for tip in tips]
+    tips = [tip for tip in tips if tip]
+    if not title or not tips:
+        return None
+    return {"title": title, "tips": tips}
+
+
+def parse_questions(content):
+    """
+    Parse, repair and validate the questions in a quiz response
+
+    Args:
+        content (str): The raw response content
+
+    Returns:
+        tuple: (valid questions, number of items that had to be dropped)
+    """
+    try:
+        data = extract_json(content)
+    except ValueError:
+        inc("studybuddy_parse_failures_total", kind="quiz")
+        raise
+    items = find_items(data, _QUESTION_KEYS, lambda d: "question" in d and "answer" in d)
+    questions = [repair_question(item) for item in items]
+    valid = [q for q in questions if q is not None]
+    if len(valid) < len(questions):
+        inc("studybuddy_parse_dropped_items_total", len(questions) - len(valid), kind="quiz")
+    return valid, len(questions) - len(valid)
+
+
+def parse_tip_categories(content):
+    """
+    Parse, repair and validate the categories in a study-tips response
+
+    Args:
+        content (str): The raw response content
+
+    Returns:
+        tuple: (valid categories, number of items that had to be dropped)
+    """
+    try:
+        data = extract_json(content)
+    except ValueError:
+        inc("studybuddy_parse_failures_total", kind="tips")
+        raise
+    items = find_items(data, _CATEGORY_KEYS, lambda d: "title" in d and "tips" in d)
+    categories = [repair_tip_category(item) for item in items]
+    valid = [c for c in categories if c is not None]
+    if len(valid) < len(categories):
+        inc("studybuddy_parse_dropped_items_total", len(categories) - len(valid), kind="tips")
+    return valid, len(categories) - len(valid)
+
+
+def parse_study_pack(content):
+    """
+    Parse, repair and validate a combined summary-and-quiz response
+
+    Args:
+        content (str): The raw response content
+
+    Returns:
+        tuple: (summary, or "" if it is missing, valid questions)
+    """
+    try:
+        data = extract_json(content)
+    except ValueError:
+        inc("studybuddy_parse_failures_total", kind="pack")
+        raise
+    summary = data.get("summary") if isinstance(data, dict) else None
+    summary = _text(summary) if isinstance(summary, str) else ""
+    items = find_items(data, _QUESTION_KEYS, lambda d: "question" in d and "answer" in d)
+    questions = [repair_question(item) for item in items]
+    valid = [q for q in questions if q is not None]
+    if len(valid) < len(questions):
+        inc("studybuddy_parse_dropped_items_total", len(questions) - len(valid), kind="quiz")
+    return summary, valid
@@ -0,0 +1,147 @@
+import copy
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+# Semantic cache settings (override with environment variables)
+SEMANTIC_THRESHOLD = float(os.environ.get("STUDYBUDDY_SEMANTIC_THRESHOLD", "0.92"))
+SEMANTIC_CAPACITY = int(os.environ.get("STUDYBUDDY_SEMANTIC_CAPACITY", "256"))
+SEMANTIC_DIMENSIONS = 2 ** 13
+# Shorter texts are too easy to confuse, so they only use the exact cache
+SEMANTIC_MIN_WORDS = 30
+
+_WORD = re.compile(r"\w+")
+
+
+def term_frequencies(text, dimensions=SEMANTIC_DIMENSIONS):
+    """
+    Hash the words and word pairs of a text into a fixed-size count vector
+
+    Args:
+        text (str): The text to embed
+        dimensions (int): Number of hash buckets
+
+    Returns:
+        numpy.ndarray: Sublinear (1 + log) term frequencies, float32
+    """
+    words = _WORD.findall(text.lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    buckets = np.fromiter(
+        (zlib.crc32(gram.encode("utf-8")) % dimensions for gram in grams),
+        dtype=np.int64, count=len(grams),
+    )
+    counts = np.bincount(buckets, minlength=dimensions).astype(np.float32)
+    present = counts > 0
+    counts[present] = 1 + np.log(counts[present])
+    return counts
+
+
+class SemanticCache:
+    """
+    Near-duplicate response cache.
+
+    Each entry is stored as a hashed word/bigram term-frequency vector in one
+    NumPy matrix. Lookups weight the vectors by IDF over the cached texts and
+    take the best cosine similarity among entries with the same namespace
+    (operation plus parameters); a match at or above `threshold` is a hit.
+    The least recently used entry is replaced once `capacity` is reached.
+    """
+
+    def __init__(self, threshold=SEMANTIC_THRESHOLD, capacity=SEMANTIC_CAPACITY,
+                 dimensions=SEMANTIC_DIMENSIONS):
+        self.threshold = threshold
+        self.capacity = capacity
+        self.dimensions = dimensions
+        self._vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self._document_frequency = np.zeros(dimensions, dtype=np.float32)
+        self._namespaces = np.full(capacity, -1, dtype=np.int64)
+        self._used = np.zeros(capacity, dtype=np.float64)
+        self._values = [None] * capacity
+        self._namespace_ids = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _idf(self):
+        return np.log((1 + self._size) / (1 + self._document_frequency)) + 1
+
+    def get(self, namespace, text):
+        """
+        Find the cached response for the most similar text in a namespace
+
+        Args:
+            namespace (str): Operation and parameters the response depends on
+            text (str): The input text
+
+        Returns:
+            The cached value, or None if nothing is similar enough
+        """
+        if len(_WORD.findall(text)) < SEMANTIC_MIN_WORDS:
+            return None
+        query = term_frequencies(text, self.dimensions)
+        with self._lock:
+            namespace_id = self._namespace_ids.get(namespace)
+            if namespace_id is None:
+                return None
+            rows = np.flatnonzero(self._namespaces == namespace_id)
+            if rows.size == 0:
+                return None
+            idf = self._idf()
+            query *= idf
+            candidates = self._vectors[rows] * idf
+            norms = np.linalg.norm(candidates, axis=1) * np.linalg.norm(query)
+            similarities = (candidates @ query) / np.maximum(norms, 1e-12)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            row = rows[best]
+            self._used[row] = time.monotonic()
+            return copy.deepcopy(self._values[row])
+
+    def set(self, namespace, text, value):
+        """
+        Store a response under its input text
+
+        Args:
+            namespace (str): Operation and parameters the response depends on
+            text (str): The input text
+            value: The response to return for similar texts
+        """
+        if len(_WORD.findall(text)) < SEMANTIC_MIN_WORDS:
+            return
+        vector = term_frequencies(text, self.dimensions)
+        with self._lock:
+            namespace_id = self._namespace_ids.setdefault(namespace, len(self._namespace_ids))
+            if self._size < self.capacity:
+                row = self._size
+                self._size += 1
+            else:
+                row = int(np.argmin(self._used))
+                self._document_frequency -= self._vectors[row] > 0
+            self._vectors[row] = vector
+            self._document_frequency += vector > 0
+            self._namespaces[row] = namespace_id
+            self._used[row] = time.monotonic()
+            self._values[row] = value
+
+
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache():
+    """
+    Return the process-wide semantic cache, creating it on first use
+
+    Returns:
+        SemanticCache: The shared cache
+    """
+    global _semantic_cache
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticCache()
+    return _semantic_cache
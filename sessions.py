@@ -0,0 +1,302 @@
+"""
+Compact, bounded server-side store for per-session results.
+
+Summaries, quizzes, answers and tips used to live in st.session_state as
+plain strings and dicts for as long as the browser session lasted. Here
+they are kept compact (zlib-compressed text, __slots__ dataclasses with
+tuples) and capped: a session larger than SESSION_MAX_BYTES lives on disk
+between reruns, and once all sessions together pass SESSIONS_MAX_BYTES
+the least recently used ones are spilled to a SQLite file. A spilled
+session is loaded back transparently the next time it is used.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from metrics import inc
+
+# Session store settings (override with environment variables)
+SESSION_PATH = os.environ.get("STUDYBUDDY_SESSION_PATH", ".cache/sessions.sqlite3")
+SESSION_MAX_BYTES = int(os.environ.get("STUDYBUDDY_SESSION_MAX_BYTES", str(1024 * 1024)))
+SESSIONS_MAX_BYTES = int(os.environ.get("STUDYBUDDY_SESSIONS_MAX_BYTES", str(64 * 1024 * 1024)))
+SESSION_TTL_SECONDS = int(os.environ.get("STUDYBUDDY_SESSION_TTL_SECONDS", str(24 * 3600)))
+
+# Shorter texts aren't worth compressing
+COMPRESS_MIN_CHARS = 256
+# How many spills between two sweeps of expired sessions on disk
+EXPIRE_EVERY = 64
+
+
+class CompressedText:
+    """A string held zlib-compressed when that saves space"""
+
+    __slots__ = ("data", "compressed")
+
+    def __init__(self, text):
+        encoded = text.encode("utf-8")
+        packed = zlib.compress(encoded, 6) if len(text) >= COMPRESS_MIN_CHARS else encoded
+        self.compressed = len(packed) < len(encoded)
+        self.data = packed if self.compressed else encoded
+
+    @property
+    def text(self):
+        return (zlib.decompress(self.data) if self.compressed else self.data).decode("utf-8")
+
+    @property
+    def nbytes(self):
+        return len(self.data)
+
+
+@dataclass(slots=True, frozen=True)
+class Question:
+    """One quiz question; see schemas.py for the dict shape it round-trips"""
+
+    question: str
+    type: str
+    answer: str
+    explanation: str = ""
+    options: tuple = ()
+
+    @classmethod
+    def from_dict(cls, q):
+        return cls(q["question"], q["type"], str(q["answer"]), q.get("explanation", ""), tuple(q.get("options", ())))
+
+    def to_dict(self):
+        q = {"question": self.question, "type": self.type, "answer": self.answer, "explanation": self.explanation}
+        if self.type == "multiple_choice":
+            q["options"] = list(self.options)
+        return q
+
+    @property
+    def nbytes(self):
+        return sum(map(len, (self.question, self.type, self.answer, self.explanation, *self.options)))
+
+
+@dataclass(slots=True, frozen=True)
+class TipCategory:
+    """One category of study tips"""
+
+    title: str
+    tips: tuple
+
+    @classmethod
+    def from_dict(cls, c):
+        return cls(c["title"], tuple(c["tips"]))
+
+    def to_dict(self):
+        return {"title": self.title, "tips": list(self.tips)}
+
+    @property
+    def nbytes(self):
+        return len(self.title) + sum(map(len, self.tips))
+
+
+class SessionData:
+    """
+    One browser session's results.
+
+    The attributes read and write the same shapes the pages used to keep in
+    st.session_state (a summary string, lists of question and tip dicts, an
+    answers dict) but are stored compactly. Call SessionStore.save() after
+    changing them.
+    """
+
+    __slots__ = ("_summary", "_quiz", "_answers", "_tips", "correct_answers", "submitted")
+
+    def __init__(self):
+        self._summary = None
+        self._quiz = ()
+        self._answers = ()
+        self._tips = ()
+        self.correct_answers = 0
+        self.submitted = False
+
+    @property
+    def summary(self):
+        return self._summary.text if self._summary is not None else ""
+
+    @summary.setter
+    def summary(self, text):
+        self._summary = CompressedText(text) if text else None
+
+    @property
+    def quiz(self):
+        return [q.to_dict() for q in self._quiz]
+
+    @quiz.setter
+    def quiz(self, questions):
+        self._quiz = tuple(Question.from_dict(q) for q in questions)
+
+    @property
+    def answers(self):
+        return {key: answer for key, answer in self._answers}
+
+    @answers.setter
+    def answers(self, answers):
+        self._answers = tuple(answers.items())
+
+    @property
+    def tips(self):
+        return [c.to_dict() for c in self._tips]
+
+    @tips.setter
+    def tips(self, categories):
+        self._tips = tuple(TipCategory.from_dict(c) for c in categories)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the stored values"""
+        size = self._summary.nbytes if self._summary is not None else 0
+        size += sum(q.nbytes for q in self._quiz)
+        size += sum(len(key) + len(str(answer)) for key, answer in self._answers)
+        return size + sum(c.nbytes for c in self._tips)
+
+    def to_json(self):
+        return json.dumps({
+            "summary": self.summary,
+            "quiz": self.quiz,
+            "answers": list(self._answers),
+            "tips": self.tips,
+            "correct_answers": self.correct_answers,
+            "submitted": self.submitted,
+        }, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, payload):
+        values = json.loads(payload)
+        data = cls()
+        data.summary = values["summary"]
+        data.quiz = values["quiz"]
+        data._answers = tuple(tuple(pair) for pair in values["answers"])
+        data.tips = values["tips"]
+        data.correct_answers = values["correct_answers"]
+        data.submitted = values["submitted"]
+        return data
+
+
+class SessionStore:
+    """
+    Process-wide map of session ID to SessionData with memory caps.
+
+    Sessions are kept in least-recently-used order. Saving a session
+    re-measures it; if the total is over `max_bytes`, cold sessions are
+    written to SQLite (compressed) and dropped from memory until it isn't.
+    Sessions on disk that go unused for `ttl_seconds` are deleted.
+    """
+
+    def __init__(self, path=SESSION_PATH, session_max_bytes=SESSION_MAX_BYTES,
+                 max_bytes=SESSIONS_MAX_BYTES, ttl_seconds=SESSION_TTL_SECONDS):
+        self.session_max_bytes = session_max_bytes
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()
+        self._sizes = {}
+        self._total = 0
+        self._spills = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY,"
+            " data BLOB NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, session_id):
+        """
+        Fetch a session's data, loading it back from disk if it was spilled
+
+        Args:
+            session_id (str): The session ID (the student ID from the page URL)
+
+        Returns:
+            SessionData: The session's data (empty for a new session)
+        """
+        with self._lock:
+            data = self._sessions.get(session_id)
+            if data is not None:
+                self._sessions.move_to_end(session_id)
+                return data
+            row = self._conn.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE sessions SET accessed = ? WHERE id = ?", (time.time(), session_id))
+                self._conn.commit()
+        if row is None:
+            return SessionData()
+        inc("studybuddy_session_loads_total")
+        return SessionData.from_json(zlib.decompress(row[0]).decode("utf-8"))
+
+    def save(self, session_id, data):
+        """
+        Store a session's data after it changed, spilling cold sessions if needed
+
+        Args:
+            session_id (str): The session ID (the student ID from the page URL)
+            data (SessionData): The session's data
+        """
+        size = data.nbytes
+        with self._lock:
+            self._total -= self._sizes.pop(session_id, 0)
+            self._sessions.pop(session_id, None)
+            if size > self.session_max_bytes:
+                # Too big to keep around between reruns
+                self._spill(session_id, data)
+            else:
+                self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                self._sessions[session_id] = data
+                self._sizes[session_id] = size
+                self._total += size
+                while self._total > self.max_bytes and len(self._sessions) > 1:
+                    cold_id, cold = self._sessions.popitem(last=False)
+                    self._total -= self._sizes.pop(cold_id)
+                    self._spill(cold_id, cold)
+            self._conn.commit()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Sessions and bytes held in memory, and sessions on disk
+        """
+        with self._lock:
+            (on_disk,) = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()
+            return {"in_memory": len(self._sessions), "bytes_in_memory": self._total, "on_disk": on_disk}
+
+    def _spill(self, session_id, data):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sessions (id, data, accessed) VALUES (?, ?, ?)",
+            (session_id, zlib.compress(data.to_json().encode("utf-8")), time.time()),
+        )
+        inc("studybuddy_session_spills_total")
+        self._spills += 1
+        if self._spills % EXPIRE_EVERY == 0:
+            self._conn.execute("DELETE FROM sessions WHERE accessed < ?", (time.time() - self.ttl_seconds,))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """
+    Return the process-wide session store, creating it on first use
+
+    Returns:
+        SessionStore: The shared store
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SessionStore()
+    return _store
@@ -0,0 +1,260 @@
+"""
+Process-wide single-flight coalescing of identical generations.
+
+When many sessions ask for the same summary, quiz or tips at once (a
+class working from the same shared notes), only the first call runs; the
+others wait for it and get the same result or the same error. Each flight
+runs in its own thread, so it carries on for the remaining callers when
+the one that started it goes away. Once every caller has left, a
+streaming flight stops at its next item; a plain call runs to the end but
+its result is dropped.
+
+With STUDYBUDDY_SINGLE_FLIGHT_LOCK_DIR set, flights are also coordinated
+between processes that share the directory: a flight holds an exclusive
+lock file for its key while it runs, and the same flight in another
+process waits for the lock and then finds the result in the shared
+response cache.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import inc
+
+try:
+    import fcntl
+except ImportError:
+    # No flock (Windows): flights are only coalesced within a process
+    fcntl = None
+
+SINGLE_FLIGHT_DISABLED = os.environ.get("STUDYBUDDY_SINGLE_FLIGHT", "1") in ("", "0", "false")
+SINGLE_FLIGHT_LOCK_DIR = os.environ.get("STUDYBUDDY_SINGLE_FLIGHT_LOCK_DIR", "")
+# How often a flight waiting on another process's lock checks whether it is still wanted
+LOCK_POLL_SECONDS = 0.05
+
+
+class FlightCancelled(Exception):
+    """Raised inside a flight when every caller has left"""
+
+
+class Flight:
+    """One in-flight call and the callers waiting on it"""
+
+    __slots__ = ("key", "operation", "items", "result", "error", "done", "cancelled", "waiters", "changed")
+
+    def __init__(self, key, operation, lock):
+        self.key = key
+        self.operation = operation
+        self.items = []
+        self.result = None
+        self.error = None
+        self.done = False
+        self.cancelled = False
+        self.waiters = 0
+        self.changed = threading.Condition(lock)
+
+
+class SingleFlight:
+    """
+    Map of request key to the flight computing it.
+
+    Keys must identify the request completely (see cache.make_key); calls
+    with the same key share one flight while it is in progress. Finished
+    flights are forgotten straight away, so a failed call is retried by
+    the next caller rather than remembered.
+    """
+
+    def __init__(self, lock_dir=SINGLE_FLIGHT_LOCK_DIR, disabled=SINGLE_FLIGHT_DISABLED):
+        self.lock_dir = lock_dir if fcntl is not None else ""
+        self.disabled = disabled
+        self._lock = threading.Lock()
+        self._flights = {}
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+    def call(self, operation, key, fn, *args, **kwargs):
+        """
+        Call fn, or wait for an identical call already in flight
+
+        Args:
+            operation (str): Name of the operation, for metrics
+            key (str): Identifies identical calls
+            fn (callable): The function to run
+            *args: Positional arguments for fn
+            **kwargs: Keyword arguments for fn
+
+        Returns:
+            The result of the shared call
+
+        Raises:
+            Exception: Whatever the shared call raised
+        """
+        if self.disabled:
+            return fn(*args, **kwargs)
+        flight = self._join(operation, key, fn, args, kwargs, stream=False)
+        try:
+            with flight.changed:
+                while not flight.done:
+                    flight.changed.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        finally:
+            self._leave(flight)
+
+    def stream(self, operation, key, fn, *args, **kwargs):
+        """
+        Iterate over a generator function, or follow an identical one already in flight
+
+        Callers that join late get the items produced so far first, then
+        the rest as they arrive.
+
+        Args:
+            operation (str): Name of the operation, for metrics
+            key (str): Identifies identical calls
+            fn (callable): The generator function to run
+            *args: Positional arguments for fn
+            **kwargs: Keyword arguments for fn
+
+        Yields:
+            Each item of the shared generator
+
+        Raises:
+            Exception: Whatever the shared generator raised
+        """
+        if self.disabled:
+            yield from fn(*args, **kwargs)
+            return
+        flight = self._join(operation, key, fn, args, kwargs, stream=True)
+        try:
+            seen = 0
+            while True:
+                with flight.changed:
+                    while seen == len(flight.items) and not flight.done:
+                        flight.changed.wait()
+                    items = flight.items[seen:]
+                    done = flight.done
+                seen += len(items)
+                yield from items
+                if done:
+                    break
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            self._leave(flight)
+
+    def in_flight(self):
+        """
+        Returns:
+            int: Number of flights currently running
+        """
+        with self._lock:
+            return len(self._flights)
+
+    def _join(self, operation, key, fn, args, kwargs, stream):
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                inc("studybuddy_single_flight_total", operation=operation, role="follower")
+                return flight
+            flight = Flight(key, operation, self._lock)
+            flight.waiters = 1
+            self._flights[key] = flight
+        inc("studybuddy_single_flight_total", operation=operation, role="leader")
+        threading.Thread(
+            target=self._run, args=(flight, fn, args, kwargs, stream), daemon=True, name=f"flight-{operation}"
+        ).start()
+        return flight
+
+    def _leave(self, flight):
+        with self._lock:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.done:
+                # Nobody wants the result any more; later callers start afresh
+                flight.cancelled = True
+                if self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]
+                inc("studybuddy_single_flight_cancelled_total", operation=flight.operation)
+
+    def _run(self, flight, fn, args, kwargs, stream):
+        try:
+            with self._process_lock(flight):
+                if flight.cancelled:
+                    raise FlightCancelled()
+                result = fn(*args, **kwargs)
+                if stream:
+                    try:
+                        for item in result:
+                            with flight.changed:
+                                if flight.cancelled:
+                                    raise FlightCancelled()
+                                flight.items.append(item)
+                                flight.changed.notify_all()
+                    finally:
+                        result.close()
+                else:
+                    flight.result = result
+        except FlightCancelled:
+            pass
+        except Exception as e:
+            flight.error = e
+        finally:
+            with flight.changed:
+                flight.done = True
+                if self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]
+                flight.changed.notify_all()
+
+    @contextmanager
+    def _process_lock(self, flight):
+        # Hold <lock_dir>/<key>.lock while the flight runs. The holder deletes
+        # the file on release, so after locking, check that the file locked is
+        # still the one at the path; otherwise a newer flight owns the key.
+        if not self.lock_dir:
+            yield
+            return
+        path = os.path.join(self.lock_dir, f"{flight.key}.lock")
+        while True:
+            handle = open(path, "ab")
+            try:
+                while True:
+                    try:
+                        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if flight.cancelled:
+                            raise FlightCancelled()
+                        time.sleep(LOCK_POLL_SECONDS)
+                try:
+                    current = os.stat(path).st_ino == os.fstat(handle.fileno()).st_ino
+                except FileNotFoundError:
+                    current = False
+                if current:
+                    try:
+                        yield
+                    finally:
+                        os.unlink(path)
+                    return
+            finally:
+                handle.close()
+
+
+_flights = None
+_flights_lock = threading.Lock()
+
+
+def get_single_flight():
+    """
+    Return the process-wide single-flight map, creating it on first use
+
+    Returns:
+        SingleFlight: The shared map
+    """
+    global _flights
+    if _flights is None:
+        with _flights_lock:
+            if _flights is None:
+                _flights = SingleFlight()
+    return _flights
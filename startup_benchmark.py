@@ -0,0 +1,145 @@
+"""
+Cold-start benchmark for the Streamlit app.
+
+Each run starts a fresh interpreter, so nothing is warm:
+
+- imports: runs `python -X importtime` on the app's top-level imports
+  (read from app.py) and reports the total plus the slowest packages;
+- first render: runs app.py once with Streamlit's AppTest and times it
+  from process start until the Home page is built.
+
+    python startup_benchmark.py [--runs 5] [--top 12]
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(HERE, "app.py")
+
+# Packages that should only load once the model is actually used
+DEFERRED = ("openai", "httpx", "pydantic", "numpy")
+
+_RENDER = """
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({path!r}, default_timeout=60).run()
+if at.exception:
+    raise SystemExit(at.exception[0].value)
+"""
+
+
+def app_imports(path=APP_PATH):
+    """
+    Collect the top-level import statements of a script
+
+    Args:
+        path (str): The script
+
+    Returns:
+        str: The statements, one per line
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def parse_importtime(stderr):
+    """
+    Read `-X importtime` output
+
+    Args:
+        stderr (str): The interpreter's standard error
+
+    Returns:
+        dict: Top-level module name to cumulative import time in seconds, for
+            modules imported directly (not as a dependency of another one)
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented under the module that triggered them
+        if not name.startswith("  "):
+            package = name.strip().split(".")[0]
+            times[package] = times.get(package, 0) + int(cumulative) / 1e6
+    return times
+
+
+def _importtime(code):
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=HERE, capture_output=True, text=True, check=True,
+    )
+
+
+def measure_imports(code):
+    """
+    Import the given statements in a fresh interpreter
+
+    Modules the interpreter loads on its own at startup are left out.
+
+    Args:
+        code (str): Import statements
+
+    Returns:
+        tuple: ({package: seconds}, list of DEFERRED packages that were loaded)
+    """
+    startup = parse_importtime(_importtime("pass").stderr)
+    probe = f"{code}\nimport sys\nprint(','.join(m for m in {DEFERRED!r} if m in sys.modules))"
+    result = _importtime(probe)
+    lines = result.stdout.strip().splitlines()
+    loaded = [m for m in lines[-1].split(",") if m] if lines else []
+    times = parse_importtime(result.stderr)
+    return {package: seconds for package, seconds in times.items() if package not in startup}, loaded
+
+
+def measure_first_render():
+    """
+    Render the Home page once in a fresh interpreter
+
+    Returns:
+        float: Seconds from process start until the page was built
+    """
+    env = dict(os.environ)
+    # The Home page never calls the model, but the app stops early without a key
+    env.setdefault("OPENAI_API_KEY", "startup-benchmark")
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", _RENDER.format(path=APP_PATH)],
+                   cwd=HERE, env=env, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=12, help="number of packages to list")
+    args = parser.parse_args()
+
+    code = app_imports()
+    totals, per_package, loaded = [], {}, set()
+    for _ in range(args.runs):
+        times, deferred = measure_imports(code)
+        totals.append(sum(times.values()))
+        loaded.update(deferred)
+        for package, seconds in times.items():
+            per_package.setdefault(package, []).append(seconds)
+    renders = [measure_first_render() for _ in range(args.runs)]
+
+    print(f"runs={args.runs}")
+    print(f"app imports      median {statistics.median(totals) * 1000:8.1f} ms   min {min(totals) * 1000:8.1f} ms")
+    print(f"first render     median {statistics.median(renders) * 1000:8.1f} ms   min {min(renders) * 1000:8.1f} ms")
+    print(f"deferred packages loaded at import: {', '.join(sorted(loaded)) or 'none'}")
+    print()
+    print(f"{'package':<28}{'median ms':>12}")
+    slowest = sorted(per_package.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for package, samples in slowest[:args.top]:
+        print(f"{package:<28}{statistics.median(samples) * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Local stand-in for the OpenAI chat-completions endpoint.
+
+Serves POST /v1/chat/completions (plain and streamed) with the canned
+responses from backends.FakeBackend, so the app and benchmarks can run
+against a real HTTP hop without an API key:
+
+    python stub_server.py --port 8600 --latency 0.5
+    OPENAI_BASE_URL=http://127.0.0.1:8600/v1 OPENAI_API_KEY=stub streamlit run app.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backends import FakeBackend
+from chunking import estimate_tokens
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        prompt = "\n".join(m.get("content", "") for m in request.get("messages", []))
+        json_mode = (request.get("response_format") or {}).get("type") == "json_object"
+        content = self.server.fake.respond(prompt, request.get("max_tokens") or 1000, json_mode)
+
+        # Injected slowness for testing timeouts, retries and hedging
+        latency = self.server.fake.latency
+        if random.random() < self.server.slow_fraction:
+            latency += self.server.slow_latency
+        time.sleep(latency)
+
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(content),
+            "total_tokens": estimate_tokens(prompt) + estimate_tokens(content),
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = request.get("model", "gpt-4o")
+        if request.get("stream"):
+            self._send_stream(completion_id, model, content, usage)
+        else:
+            time.sleep(estimate_tokens(content) / self.server.fake.tokens_per_second)
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, completion_id, model, content, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta, finish_reason=None, usage=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if usage is not None:
+                chunk["usage"] = usage
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        event({"role": "assistant", "content": ""})
+        for piece in re.findall(r"\S+\s*|\s+", content):
+            time.sleep(1 / self.server.fake.tokens_per_second)
+            event({"content": piece})
+        event({}, finish_reason="stop", usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def serve(host="127.0.0.1", port=0, latency=0.5, tokens_per_second=80.0,
+          slow_fraction=0.0, slow_latency=0.0, background=True):
+    """
+    Start the stand-in server
+
+    Args:
+        host (str): Interface to bind
+        port (int): Port to bind (0 picks a free one)
+        latency (float): Seconds before the first token of every response
+        tokens_per_second (float): Generation speed after the first token
+        slow_fraction (float): Share of requests that get extra latency
+        slow_latency (float): Extra seconds added to those slow requests
+        background (bool): Serve from a daemon thread and return immediately
+
+    Returns:
+        ThreadingHTTPServer: The server; its URL is http://host:server.server_port/v1
+    """
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.fake = FakeBackend(latency=latency, tokens_per_second=tokens_per_second)
+    server.slow_fraction = slow_fraction
+    server.slow_latency = slow_latency
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        server.serve_forever()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--slow-fraction", type=float, default=0.0)
+    parser.add_argument("--slow-latency", type=float, default=0.0)
+    args = parser.parse_args()
+    print(f"Serving chat completions on http://{args.host}:{args.port}/v1")
+    serve(args.host, args.port, args.latency, args.tokens_per_second,
+          args.slow_fraction, args.slow_latency, background=False)
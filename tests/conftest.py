@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Set before the app modules are imported: no network, no shared caches on disk
+os.environ.setdefault("STUDYBUDDY_BACKEND", "fake")
+os.environ.setdefault("STUDYBUDDY_CACHE_DISABLED", "1")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+import async_batch
+import backends
+from async_batch import AdaptiveBackoff, BatchRunner, batch_generate
+from backends import FakeBackend
+from http_client import call_with_retries, rate_limit_retries
+
+
+def _rate_limit_error(retry_after=None):
+    headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+    response = httpx.Response(429, headers=headers, request=httpx.Request("POST", "http://test/v1/chat/completions"))
+    return RateLimitError("rate limited", response=response, body=None)
+
+
+class CountingBackend(FakeBackend):
+    """Fake backend that records how many calls run at once"""
+
+    def __init__(self, latency=0.05):
+        super().__init__(latency=latency, tokens_per_second=1e9)
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def complete(self, *args, **kwargs):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            return super().complete(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+class RateLimitedBackend(FakeBackend):
+    """Fake backend whose first `failures` calls get a 429"""
+
+    def __init__(self, failures):
+        super().__init__(latency=0, tokens_per_second=1e9)
+        self.failures = failures
+        self.calls = []
+
+    def complete(self, *args, **kwargs):
+        self.calls.append(time.monotonic())
+        if len(self.calls) <= self.failures:
+            raise _rate_limit_error()
+        return super().complete(*args, **kwargs)
+
+
+def test_calls_stay_within_the_concurrency_limit():
+    backend = CountingBackend()
+
+    async def run():
+        with BatchRunner(concurrency=3, backend=backend) as runner:
+            return await asyncio.gather(*(runner.complete(f"Prompt {i}", 50) for i in range(12)))
+
+    assert len(asyncio.run(run())) == 12
+    assert backend.peak == 3
+
+
+def test_rate_limit_errors_pause_and_retry(monkeypatch):
+    monkeypatch.setattr(async_batch.random, "uniform", lambda low, high: low)
+    backend = RateLimitedBackend(failures=2)
+
+    async def run():
+        with BatchRunner(concurrency=1, backend=backend) as runner:
+            runner.backoff = AdaptiveBackoff(base_delay=0.05)
+            return await runner.complete("Prompt", 50), runner.backoff
+
+    content, backoff = asyncio.run(run())
+    assert content
+    assert len(backend.calls) == 3
+    # The pause doubles after each 429
+    assert backend.calls[1] - backend.calls[0] >= 0.05
+    assert backend.calls[2] - backend.calls[1] >= 0.1
+    # and halves after the success
+    assert backoff.delay == pytest.approx(0.05)
+
+
+def test_gives_up_after_max_retries():
+    backend = RateLimitedBackend(failures=10)
+
+    async def run():
+        with BatchRunner(concurrency=1, max_retries=2, backend=backend) as runner:
+            runner.backoff = AdaptiveBackoff(base_delay=0.001)
+            await runner.complete("Prompt", 50)
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(run())
+    assert len(backend.calls) == 3
+
+
+def test_retry_after_sets_the_minimum_pause():
+    backoff = AdaptiveBackoff(base_delay=0.01)
+    backoff.rate_limited(retry_after=2)
+    assert backoff.resume_at - time.monotonic() >= 1.9
+
+
+def test_backend_429_retries_are_off_inside_the_block():
+    attempts = []
+
+    def call(timeout):
+        attempts.append(timeout)
+        raise _rate_limit_error()
+
+    with rate_limit_retries(False):
+        with pytest.raises(RateLimitError):
+            call_with_retries(call, "quiz")
+    assert len(attempts) == 1
+
+
+def test_batch_generate_shuts_down_its_threads(monkeypatch):
+    monkeypatch.setattr(backends, "_backend", FakeBackend(latency=0, tokens_per_second=1e9))
+    before = {t.name for t in threading.enumerate()}
+
+    async def run():
+        documents = ["Notes about cells. " * 20] * 3
+        return [r async for r in batch_generate(documents, num_questions=2, concurrency=2, tokens_per_minute=10 ** 9)]
+
+    results = asyncio.run(run())
+    assert [r["error"] for r in results] == [None, None, None]
+    time.sleep(0.1)
+    assert not any(t.name.startswith("batch-call") for t in threading.enumerate() if t.name not in before)
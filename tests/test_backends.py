@@ -0,0 +1,24 @@
+import json
+
+from backends import FakeBackend
+from utils import quiz_prompt
+
+
+def _questions(backend, prompt):
+    return [q["question"] for q in json.loads(backend.respond(prompt, 2000, json_mode=True))["questions"]]
+
+
+def test_fake_quiz_questions_do_not_depend_on_other_calls():
+    prompt = quiz_prompt("Cells divide by mitosis.", 5, "Mixed")
+    fresh = _questions(FakeBackend(), prompt)
+    backend = FakeBackend()
+    _questions(backend, quiz_prompt("Something else entirely.", 7, "True/False"))
+    assert _questions(backend, prompt) == fresh
+    assert len(set(fresh)) == 5
+
+
+def test_fake_repeats_of_a_prompt_get_new_questions():
+    backend = FakeBackend()
+    prompt = quiz_prompt("Cells divide by mitosis.", 3, "Mixed")
+    first, second = _questions(backend, prompt), _questions(backend, prompt)
+    assert not set(first) & set(second)
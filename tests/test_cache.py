@@ -0,0 +1,72 @@
+import cache
+from cache import ResponseCache, make_key
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_keys_ignore_whitespace_but_not_parameters():
+    assert make_key("summary", "Cells  divide.\n", summary_length="Short") == \
+        make_key("summary", "Cells divide.", summary_length="Short")
+    assert make_key("summary", "Cells divide.", summary_length="Short") != \
+        make_key("summary", "Cells divide.", summary_length="Long")
+
+
+def test_entries_expire_after_the_ttl(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    store = ResponseCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=60)
+    store.set("k", {"summary": "text"})
+    clock.now += 59
+    assert store.get("k") == {"summary": "text"}
+    clock.now += 1
+    assert store.get("k") is None
+    # Gone from disk too, not just from memory
+    assert ResponseCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=10 ** 9).get("k") is None
+
+
+def test_disk_tier_is_shared_and_survives_the_memory_tier(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    ResponseCache(path).set("k", ["a", "b"])
+    assert ResponseCache(path).get("k") == ["a", "b"]
+
+
+def test_memory_tier_keeps_the_most_recently_used(tmp_path):
+    store = ResponseCache(None, memory_items=2)
+    store.set("a", 1)
+    store.set("b", 2)
+    store.get("a")
+    store.set("c", 3)
+    assert (store.get("a"), store.get("b"), store.get("c")) == (1, None, 3)
+
+
+def test_disk_tier_evicts_least_recently_used_over_the_size_cap(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "EVICT_EVERY", 1)
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    path = str(tmp_path / "cache.sqlite3")
+    store = ResponseCache(path, memory_items=0, max_bytes=350)
+    for key in "abc":
+        clock.now += 1
+        store.set(key, "x" * 100)
+    # "a" was read after "b" was written, so "b" is the coldest
+    clock.now += 1
+    store.get("a")
+    clock.now += 1
+    store.set("d", "x" * 100)
+    reopened = ResponseCache(path, memory_items=0)
+    assert [key for key in "abcd" if reopened.get(key) is not None] == ["a", "c", "d"]
+
+
+def test_cached_values_cannot_be_changed_by_callers():
+    store = ResponseCache(None)
+    value = {"questions": [1, 2]}
+    store.set("k", value)
+    value["questions"].append(3)
+    store.get("k")["questions"].append(4)
+    assert store.get("k") == {"questions": [1, 2]}
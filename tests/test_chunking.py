@@ -0,0 +1,33 @@
+import random
+
+from chunking import CHUNK_MIN_SHARE, estimate_tokens, split_text
+
+
+def _document(paragraphs=300, seed=0):
+    rng = random.Random(seed)
+    words = "cell membrane protein enzyme energy glucose oxygen light carbon water plant leaf root".split()
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(20, 120))) + "." for _ in range(paragraphs)]
+
+
+def test_chunks_cover_the_text_within_the_budget():
+    paragraphs = _document()
+    chunks = split_text("\n\n".join(paragraphs), 1000)
+    assert "\n\n".join(chunks).split("\n\n") == paragraphs
+    assert all(estimate_tokens(chunk) <= 1000 for chunk in chunks)
+    assert all(estimate_tokens(chunk) >= 1000 * CHUNK_MIN_SHARE for chunk in chunks[:-1])
+
+
+def test_an_edit_only_changes_nearby_chunks():
+    paragraphs = _document()
+    before = split_text("\n\n".join(paragraphs), 1000)
+    edited = list(paragraphs)
+    edited.insert(len(edited) // 4, "A new paragraph about stomata.")
+    after = split_text("\n\n".join(edited), 1000)
+    assert len(set(after) - set(before)) <= 3
+    # Everything after the edit is chunked exactly as before
+    assert after[-len(before) // 2:] == before[-len(before) // 2:]
+
+
+def test_oversized_sentences_are_split():
+    chunks = split_text("word " * 5000, 500)
+    assert all(estimate_tokens(chunk) <= 500 for chunk in chunks)
@@ -0,0 +1,32 @@
+from utils import grade_quiz
+
+QUIZ = [
+    {"question": "Which gas do plants release?", "type": "multiple_choice",
+     "options": ["Oxygen", "Nitrogen", "Helium", "Argon"], "answer": "Oxygen"},
+    {"question": "Chlorophyll absorbs light.", "type": "true_false", "answer": "True"},
+    {"question": "_____ fixes carbon in the Calvin cycle.", "type": "fill_blank", "answer": "Rubisco"},
+]
+
+
+def test_all_correct():
+    assert grade_quiz(QUIZ, ["Oxygen", "True", "Rubisco"]) == (3, [True, True, True])
+
+
+def test_fill_blank_and_true_false_ignore_case_and_spaces():
+    assert grade_quiz(QUIZ, ["Oxygen", " true ", "  rubisco"]) == (3, [True, True, True])
+
+
+def test_multiple_choice_must_match_exactly():
+    assert grade_quiz(QUIZ, ["oxygen", "True", "Rubisco"]) == (2, [False, True, True])
+
+
+def test_unanswered_questions_are_wrong():
+    assert grade_quiz(QUIZ, [None, None, "Rubisco"]) == (1, [False, False, True])
+
+
+def test_missing_answers_are_wrong():
+    assert grade_quiz(QUIZ, ["Oxygen"]) == (1, [True, False, False])
+
+
+def test_empty_quiz():
+    assert grade_quiz([], []) == (0, [])
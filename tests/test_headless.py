@@ -0,0 +1,46 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+import headless
+
+
+@pytest.fixture(scope="module")
+def api():
+    server = headless.serve(port=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def _post(api, path, body):
+    request = urllib.request.Request(api + path, data=json.dumps(body).encode("utf-8"), method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+@pytest.mark.parametrize("body", [
+    {"text": "Notes", "summary_length": ["Short"]},
+    {"text": "Notes", "summary_length": {"Short": 1}},
+    {"text": "Notes", "summary_length": "Enormous"},
+])
+def test_bad_choices_are_client_errors(api, body):
+    status, payload = _post(api, "/summary", body)
+    assert status == 400
+    assert payload["error"].startswith("summary_length must be one of")
+
+
+@pytest.mark.parametrize("num_questions", [True, False, 0, 11, 2.5, "5"])
+def test_bad_question_counts_are_client_errors(api, num_questions):
+    status, payload = _post(api, "/quiz", {"text": "Notes about cells.", "num_questions": num_questions})
+    assert status == 400
+    assert payload["error"].startswith("num_questions must be an integer")
+
+
+def test_batch_rejects_out_of_range_question_counts(tmp_path):
+    with pytest.raises(ValueError):
+        headless.run_batch(str(tmp_path), str(tmp_path / "out"), num_questions=0)
@@ -0,0 +1,131 @@
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import openai
+import pytest
+
+import http_client
+import stub_server
+from backends import FakeBackend, OpenAIBackend
+from http_client import HedgedCaller, LatencyTracker, rate_limit_retries
+
+
+class FlakyHandler(stub_server.StubHandler):
+    """The stub's handler, answering with the next queued error status or delay first"""
+
+    def do_POST(self):
+        with self.server.lock:
+            self.server.requests += 1
+            status = self.server.errors.pop(0) if self.server.errors else None
+            delay = self.server.delays.pop(0) if self.server.delays else 0
+        time.sleep(delay)
+        if status is not None:
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            self._send_json(status, {"error": {"message": f"injected {status}"}})
+            return
+        super().do_POST()
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    server.daemon_threads = True
+    server.fake = FakeBackend(latency=0.01, tokens_per_second=1e6)
+    server.slow_fraction = 0.0
+    server.slow_latency = 0.0
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.errors = []
+    server.delays = []
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def quick_backoff(monkeypatch):
+    monkeypatch.setattr(http_client, "BACKOFF_BASE", 0.01)
+
+
+def _backend(stub, hedge=False):
+    return OpenAIBackend(api_key="stub", base_url=f"http://127.0.0.1:{stub.server_port}/v1", hedge=hedge)
+
+
+def test_plain_completion(stub):
+    assert _backend(stub).complete("Say hello", 20, operation="summary")
+    assert stub.requests == 1
+
+
+def test_server_errors_and_rate_limits_are_retried(stub):
+    stub.errors = [503, 429, 500]
+    assert _backend(stub).complete("Say hello", 20, operation="summary")
+    assert stub.requests == 4
+
+
+def test_retries_stop_after_max_retries(stub):
+    stub.errors = [503] * 10
+    with pytest.raises(openai.InternalServerError):
+        _backend(stub).complete("Say hello", 20, operation="summary")
+    assert stub.requests == http_client.MAX_RETRIES + 1
+
+
+def test_client_errors_are_not_retried(stub):
+    stub.errors = [400]
+    with pytest.raises(openai.BadRequestError):
+        _backend(stub).complete("Say hello", 20, operation="summary")
+    assert stub.requests == 1
+
+
+def test_rate_limit_retries_can_be_turned_off(stub):
+    stub.errors = [429, 503]
+    with rate_limit_retries(False), pytest.raises(openai.RateLimitError):
+        _backend(stub).complete("Say hello", 20, operation="summary")
+    assert stub.requests == 1
+    # Other errors are still retried
+    stub.errors = [503]
+    with rate_limit_retries(False):
+        assert _backend(stub).complete("Say hello", 20, operation="summary")
+
+
+def test_only_opening_a_stream_is_retried(stub):
+    stub.errors = [503]
+    assert "".join(_backend(stub).stream("Say hello", 20, operation="summary"))
+    assert stub.requests == 2
+
+
+def test_slow_calls_are_hedged(stub):
+    backend = _backend(stub, hedge=True)
+    hedges = []
+    tracker = LatencyTracker()
+    for _ in range(http_client.HEDGE_MIN_SAMPLES):
+        tracker.record("summary", 0.05)
+    backend.caller = HedgedCaller(hedge=True, tracker=tracker)
+    # The first request is slow; the hedge sent after the p95 wins
+    stub.delays = [1.0]
+    start = time.monotonic()
+
+    def call(timeout):
+        return backend.client.chat.completions.create(
+            model="gpt-4o", messages=[{"role": "user", "content": "Say hello"}], max_tokens=20, timeout=timeout)
+
+    result = backend.caller.call(call, "summary", on_hedge=lambda: hedges.append(1))
+    assert result.choices[0].message.content
+    assert time.monotonic() - start < 0.5
+    assert hedges == [1]
+    assert stub.requests == 2
+
+
+def test_fast_calls_are_not_hedged(stub):
+    tracker = LatencyTracker()
+    for _ in range(http_client.HEDGE_MIN_SAMPLES):
+        tracker.record("summary", 1.0)
+    backend = _backend(stub, hedge=True)
+    backend.caller = HedgedCaller(hedge=True, tracker=tracker)
+    assert backend.complete("Say hello", 20, operation="summary")
+    assert stub.requests == 1
+
+
+def test_no_hedging_without_enough_history():
+    assert LatencyTracker().percentile("summary", 0.95) is None
@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+
+from jobs import CANCELLED, DONE, FAILED, JobManager
+
+
+def _wait(manager, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job.done:
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def _ticks(count, delay=0.01):
+    for i in range(count):
+        time.sleep(delay)
+        yield i
+
+
+def test_result_and_progress_of_a_generator_job():
+    manager = JobManager(workers=2)
+    job = _wait(manager, manager.submit("quiz", _ticks, 5))
+    assert job.status == DONE
+    assert job.result == [0, 1, 2, 3, 4]
+    assert job.partial == [0, 1, 2, 3, 4]
+
+
+def test_errors_are_recorded():
+    manager = JobManager(workers=1)
+
+    def failing():
+        raise RuntimeError("model unavailable")
+
+    job = _wait(manager, manager.submit("summary", failing))
+    assert job.status == FAILED
+    assert job.error == "model unavailable"
+
+
+def test_same_key_attaches_to_the_running_job():
+    manager = JobManager(workers=2)
+    first = manager.submit("quiz", _ticks, 20, key="k")
+    second = manager.submit("quiz", _ticks, 20, key="k")
+    assert first == second
+    assert manager.get(first).watchers == 2
+    # One watcher leaving doesn't cancel it for the other
+    manager.cancel(first)
+    assert _wait(manager, first).status == DONE
+
+
+def test_submit_after_cancel_starts_a_new_job():
+    manager = JobManager(workers=2)
+    first = manager.submit("quiz", _ticks, 50, key="k")
+    time.sleep(0.05)
+    manager.cancel(first)
+    second = manager.submit("quiz", _ticks, 3, key="k")
+    assert second != first
+    assert _wait(manager, first).status == CANCELLED
+    job = _wait(manager, second)
+    assert job.status == DONE
+    assert job.result == [0, 1, 2]
+
+
+def test_submit_after_cancelling_a_plain_function_starts_a_new_job():
+    manager = JobManager(workers=2)
+    release = threading.Event()
+    first = manager.submit("tips", lambda: release.wait(5) and "stale", key="k")
+    time.sleep(0.05)
+    manager.cancel(first)
+    second = manager.submit("tips", lambda: "fresh", key="k")
+    assert second != first
+    assert _wait(manager, second).result == "fresh"
+    release.set()
+    job = _wait(manager, first)
+    assert job.status == CANCELLED
+
+
+def test_cancelled_queued_job_never_runs():
+    manager = JobManager(workers=1)
+    release = threading.Event()
+    ran = []
+    blocker = manager.submit("summary", release.wait, 5)
+    queued = manager.submit("summary", ran.append, 1)
+    manager.cancel(queued)
+    release.set()
+    _wait(manager, blocker)
+    assert manager.get(queued).status == CANCELLED
+    assert ran == []
+
+
+def test_cancel_after_the_worker_picked_up_the_job():
+    manager = JobManager(workers=1, retention_seconds=0)
+    # Reentrant, so cancel() can run while the worker waits for the lock in _run
+    manager._lock = threading.RLock()
+    ran = []
+    with manager._lock:
+        job_id = manager.submit("summary", ran.append, 1, key="k")
+        job = manager._jobs[job_id]
+        deadline = time.time() + 5
+        while not job.future.running() and time.time() < deadline:
+            time.sleep(0.01)
+        manager.cancel(job_id)
+    job.future.result(timeout=5)
+    assert job.status == CANCELLED
+    assert ran == []
+    # Finished jobs expire, so pollers stop seeing it
+    time.sleep(0.01)
+    assert manager.get(job_id) is None
+
+
+def test_pending_limit():
+    manager = JobManager(workers=1, max_pending=1)
+    release = threading.Event()
+    manager.submit("summary", release.wait, 5, key="running")
+    time.sleep(0.05)
+    manager.submit("summary", release.wait, 5, key="queued")
+    try:
+        with pytest.raises(RuntimeError):
+            manager.submit("summary", release.wait, 5, key="rejected")
+    finally:
+        release.set()
@@ -0,0 +1,36 @@
+import json
+
+from json_stream import ArrayObjectParser, iter_array_objects
+
+ITEMS = [
+    {"question": "Braces } and ] inside {strings} [are] text", "answer": "A"},
+    {"question": "Escaped \"quotes\" and \\ backslashes", "answer": "B", "options": ["x", "y"]},
+    {"question": "Nested", "answer": {"value": [1, 2, {"deep": True}]}},
+]
+
+
+def test_objects_arrive_one_character_at_a_time():
+    document = json.dumps({"questions": ITEMS})
+    parser = ArrayObjectParser()
+    seen = []
+    for position, char in enumerate(document):
+        for item in parser.feed(char):
+            seen.append((item, position))
+    assert [item for item, _ in seen] == ITEMS
+    # Each object is released as soon as its closing brace arrives, not at the end
+    assert seen[0][1] < len(document) // 2
+
+
+def test_top_level_array_in_uneven_pieces():
+    document = json.dumps(ITEMS)
+    pieces = [document[i:i + 7] for i in range(0, len(document), 7)]
+    assert list(iter_array_objects(pieces)) == ITEMS
+
+
+def test_only_the_first_array_is_read():
+    document = '{"questions": [{"a": 1}], "other": [{"b": 2}]}'
+    assert list(iter_array_objects([document])) == [{"a": 1}]
+
+
+def test_malformed_objects_are_skipped():
+    assert list(iter_array_objects(['[{"a": 1}, {"b": tru}, {"c": 3}]'])) == [{"a": 1}, {"c": 3}]
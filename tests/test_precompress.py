@@ -0,0 +1,34 @@
+from precompress import PRECOMPRESS_MIN_TOKENS, normalize, precompress
+
+
+def test_short_inputs_are_returned_unchanged():
+    text = "Key dates\n1990\nThe treaty was signed.\n3/4\nof members voted.\n2\nAnswer: True\nAnswer: True\nAnswer: True\n"
+    result = precompress(text)
+    assert result.text == text
+    assert result.ratio == 1.0
+
+
+def test_page_numbers_in_sequence_are_dropped_but_lone_numbers_kept():
+    pages = "\n".join(f"Sentence {i} about cells.\n{i}" for i in range(1, 6))
+    lines = normalize(pages + "\nThe year was\n1990\nand the ratio\n3/4").split("\n")
+    assert not any(line in ("1", "2", "3", "4", "5") for line in lines)
+    assert "1990" in lines and "3/4" in lines
+
+
+def test_labels_and_repeated_headers_are_dropped():
+    text = "\n".join(f"BIO 101 Notes\nPage {i}\nCells divide in stage {i}." for i in range(1, 5))
+    assert normalize(text).split("\n") == [
+        "BIO 101 Notes", "Cells divide in stage 1.", "Cells divide in stage 2.",
+        "Cells divide in stage 3.", "Cells divide in stage 4.",
+    ]
+
+
+def test_long_inputs_lose_duplicates_and_fit_the_budget():
+    paragraphs = [f"Paragraph {i} explains how enzyme {i} speeds reaction {i * 7} in the cell." for i in range(400)]
+    text = "\n\n".join(paragraphs + paragraphs[:100])
+    assert precompress(text, max_tokens=None).duplicates >= 100
+    result = precompress(text, max_tokens=PRECOMPRESS_MIN_TOKENS)
+    assert result.tokens <= PRECOMPRESS_MIN_TOKENS
+    # Kept sentences stay in their original order
+    kept = [int(line.split()[1]) for line in result.text.split("\n\n")]
+    assert kept == sorted(kept)
@@ -0,0 +1,66 @@
+import pytest
+
+from question_bank import QuestionBank
+
+NOTES = ("Photosynthesis takes place in the chloroplasts of plant cells. Chlorophyll absorbs light energy, "
+         "which splits water and releases oxygen. The Calvin cycle then fixes carbon dioxide into glucose "
+         "using the enzyme rubisco.")
+OTHER_NOTES = ("Mitochondria release energy from glucose through cellular respiration. Glycolysis happens in "
+               "the cytoplasm, and the Krebs cycle happens in the mitochondrial matrix, producing carbon dioxide.")
+
+
+def _question(text, answer, qtype="fill_blank"):
+    return {"question": text, "type": qtype, "answer": answer, "explanation": ""}
+
+
+QUESTIONS = [
+    _question("Which pigment absorbs light energy in the chloroplasts?", "Chlorophyll"),
+    _question("Which enzyme fixes carbon dioxide in the Calvin cycle?", "Rubisco"),
+    _question("Splitting water during photosynthesis releases which gas?", "Oxygen"),
+    _question("Photosynthesis takes place in the chloroplasts.", "True", "true_false"),
+]
+
+
+@pytest.fixture
+def bank(tmp_path):
+    bank = QuestionBank(str(tmp_path / "questions.sqlite3"))
+    bank.add(NOTES, QUESTIONS)
+    return bank
+
+
+def test_questions_are_stored_once(bank):
+    assert bank.add(NOTES, QUESTIONS) == 0
+    assert bank.add(NOTES, [_question("Which  pigment absorbs light energy in the CHLOROPLASTS?", "Chlorophyll")]) == 0
+
+
+def test_same_text_gets_its_questions_back(bank):
+    found = bank.find(NOTES, 10)
+    assert sorted(q["question"] for q in found) == sorted(q["question"] for q in QUESTIONS)
+
+
+def test_types_are_filtered(bank):
+    assert [q["type"] for q in bank.find(NOTES, 10, "True/False")] == ["true_false"]
+    assert bank.find(NOTES, 10, "Multiple Choice") == []
+
+
+@pytest.mark.skipif(not QuestionBank(":memory:").full_text, reason="SQLite built without FTS5")
+def test_edited_text_gets_only_questions_it_still_supports(bank):
+    # A new text: no section fingerprint matches, so only search hits qualify
+    edited = NOTES.replace("using the enzyme rubisco", "in the stroma") + " Plants store glucose as starch."
+    answers = {q["answer"] for q in bank.find(edited, 10)}
+    assert "Chlorophyll" in answers and "Oxygen" in answers
+    # The text no longer mentions rubisco, so that question isn't grounded in it
+    assert "Rubisco" not in answers
+
+
+def test_unrelated_text_gets_nothing(bank):
+    assert bank.find(OTHER_NOTES, 10) == []
+
+
+def test_repeated_finds_rotate_through_the_bank(bank):
+    first = {q["question"] for q in bank.find(NOTES, 2)}
+    second = {q["question"] for q in bank.find(NOTES, 2)}
+    assert len(first) == len(second) == 2
+    # Least-served questions come first, so the second quiz gets the other two
+    assert not first & second
+    assert first | second == {q["question"] for q in QUESTIONS}
@@ -0,0 +1,48 @@
+import pytest
+
+import backends
+import utils
+
+TEXT = "Photosynthesis turns light, water and carbon dioxide into glucose and oxygen. " * 30
+
+
+@pytest.fixture(autouse=True)
+def fast_fake_backend():
+    previous = backends.get_backend()
+    backends.set_backend(backends.FakeBackend(latency=0, tokens_per_second=1e9))
+    yield
+    backends.set_backend(previous)
+
+
+@pytest.mark.parametrize("question_type", ["Mixed", "Multiple Choice", "True/False", "Fill in the Blank"])
+@pytest.mark.parametrize("num_questions", [1, 5, 10])
+def test_quiz_has_the_requested_number_of_questions(question_type, num_questions):
+    assert len(utils.generate_quiz(TEXT, num_questions, question_type, parallel=True)) == num_questions
+    assert len(utils.generate_quiz(TEXT, num_questions, question_type)) == num_questions
+    assert len(list(utils.generate_quiz_stream(TEXT, num_questions, question_type))) == num_questions
+
+
+
+class ShortBackend(backends.FakeBackend):
+    """Returns one question fewer than asked for, and records what was asked"""
+
+    def __init__(self):
+        super().__init__(latency=0, tokens_per_second=1e9)
+        self.requested = []
+
+    def respond(self, prompt, max_tokens, json_mode=False):
+        count = int(backends._QUESTION_COUNT.search(prompt).group(1))
+        self.requested.append(count)
+        if count > 1:
+            prompt = prompt.replace(f"Create {count} ", f"Create {count - 1} ", 1)
+        return super().respond(prompt, max_tokens, json_mode)
+
+
+def test_fan_out_tops_up_once_after_merging():
+    backend = ShortBackend()
+    backends.set_backend(backend)
+    quiz = utils.generate_quiz(TEXT, 6, "Mixed", parallel=True)
+    assert len(quiz) == 6
+    # Three requests for 2 + 1 questions; their surplus covers the shortfall
+    assert backend.requested == [3, 3, 3]
+
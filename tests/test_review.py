@@ -0,0 +1,99 @@
+import pytest
+
+from review import AGAIN, DAY, EASY, GOOD, HARD, INITIAL_EASE, MIN_EASE, RELEARN_SECONDS, Card, CardStore, schedule
+
+NOW = 1_000_000.0
+
+
+def _card():
+    return Card(id=1, deck="d", question={"question": "Q?"})
+
+
+def test_good_reviews_follow_sm2_intervals():
+    card = _card()
+    intervals = []
+    for _ in range(4):
+        schedule(card, GOOD, NOW)
+        intervals.append(card.interval)
+    # 1 day, 6 days, then the interval times the ease (unchanged at grade 4)
+    assert intervals == [1.0, 6.0, 15.0, 37.5]
+    assert card.ease == pytest.approx(INITIAL_EASE)
+    assert card.due == NOW + 37.5 * DAY
+
+
+def test_ease_moves_with_the_grade():
+    easy, hard = _card(), _card()
+    schedule(easy, EASY, NOW)
+    schedule(hard, HARD, NOW)
+    assert easy.ease == pytest.approx(INITIAL_EASE + 0.1)
+    assert hard.ease == pytest.approx(INITIAL_EASE - 0.14)
+
+
+def test_forgetting_resets_the_card():
+    card = _card()
+    for _ in range(3):
+        schedule(card, GOOD, NOW)
+    schedule(card, AGAIN, NOW)
+    assert (card.repetitions, card.interval, card.lapses) == (0, 0.0, 1)
+    assert card.due == NOW + RELEARN_SECONDS
+    schedule(card, GOOD, NOW)
+    assert card.interval == 1.0
+
+
+def test_ease_never_drops_below_the_minimum():
+    card = _card()
+    for _ in range(20):
+        schedule(card, AGAIN, NOW)
+    assert card.ease == MIN_EASE
+
+
+def test_store_serves_missed_questions_first(tmp_path):
+    store = CardStore(str(tmp_path / "cards.sqlite3"))
+    quiz = [{"question": "Right?", "type": "true_false", "answer": "True"},
+            {"question": "Wrong?", "type": "true_false", "answer": "False"}]
+    store.add_results("deck", quiz, [True, False], now=NOW)
+    assert store.counts("deck", now=NOW) == (1, 2)
+    card = store.next_due("deck", now=NOW)
+    assert card.question["question"] == "Wrong?"
+    store.review(card, GOOD, now=NOW)
+    assert store.next_due("deck", now=NOW) is None
+    assert store.next_due("deck", now=NOW + DAY).question["question"] in ("Right?", "Wrong?")
+
+
+def test_retaking_a_quiz_before_cards_are_due_changes_nothing(tmp_path):
+    store = CardStore(str(tmp_path / "cards.sqlite3"))
+    quiz = [{"question": "Right?", "type": "true_false", "answer": "True"}]
+    for i in range(3):
+        store.add_results("deck", quiz, [True], now=NOW + i)
+    card = store.next_due("deck", now=NOW + 2 * DAY)
+    assert (card.repetitions, card.interval) == (1, 1.0)
+    # Once due, a correct answer is the next review
+    store.add_results("deck", quiz, [True], now=NOW + 2 * DAY)
+    assert store.next_due("deck", now=NOW + 8 * DAY).interval == 6.0
+    # A wrong answer still sends it back to the start, due or not
+    store.add_results("deck", quiz, [False], now=NOW + 3 * DAY)
+    assert store.next_due("deck", now=NOW + 3 * DAY).repetitions == 0
+
+
+def test_only_recent_decks_keep_their_heaps(tmp_path):
+    store = CardStore(str(tmp_path / "cards.sqlite3"), max_decks=2)
+    quiz = [{"question": "Wrong?", "type": "true_false", "answer": "False"}]
+    for deck in ("a", "b", "c"):
+        store.add_results(deck, quiz, [False], now=NOW)
+    assert list(store._heaps) == ["b", "c"]
+    # An evicted deck is rebuilt from disk
+    assert store.next_due("a", now=NOW).question == quiz[0]
+    assert list(store._heaps) == ["c", "a"]
+
+
+def test_abandoned_decks_expire(tmp_path):
+    path = str(tmp_path / "cards.sqlite3")
+    store = CardStore(path)
+    quiz = [{"question": "Wrong?", "type": "true_false", "answer": "False"}]
+    store.add_results("old", quiz, [False], now=NOW)
+    store._conn.execute("UPDATE decks SET used = 0 WHERE deck = 'old'")
+    store._conn.commit()
+    store.add_results("new", quiz, [False], now=NOW)
+    store = CardStore(path)
+    assert store.counts("old", now=NOW) == (0, 0)
+    assert store.counts("new", now=NOW) == (1, 1)
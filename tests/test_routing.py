@@ -0,0 +1,47 @@
+import pytest
+
+import routing
+from backends import MODEL
+from routing import (QUIZ_MAX_TOKENS, SECTION_NOTES_MAX_TOKENS, SMALL_MODEL, SMALL_MODEL_MAX_INPUT_TOKENS,
+                     SUMMARY_MAX_TOKENS, Route, route_quiz, route_section_notes, route_study_pack, route_summary)
+
+SHORT_TEXT = "Cells divide by mitosis. " * 20
+LONG_TEXT = "x" * (SMALL_MODEL_MAX_INPUT_TOKENS * 4 + 100)
+
+
+@pytest.mark.parametrize("length, model", [("Very Short", SMALL_MODEL), ("Short", SMALL_MODEL),
+                                           ("Medium", MODEL), ("Detailed", MODEL)])
+def test_summary_model_and_budget_follow_the_length(length, model):
+    assert route_summary(SHORT_TEXT, length) == Route(model, SUMMARY_MAX_TOKENS[length])
+
+
+def test_long_inputs_go_to_the_full_model():
+    assert route_summary(LONG_TEXT, "Very Short").model == MODEL
+    assert route_quiz(LONG_TEXT, 1, "True/False").model == MODEL
+
+
+def test_quiz_budget_grows_with_the_questions_up_to_a_cap():
+    small, large = route_quiz(SHORT_TEXT, 3, "True/False"), route_quiz(SHORT_TEXT, 4, "True/False")
+    assert small.model == SMALL_MODEL and large.model == MODEL
+    assert small.max_tokens < large.max_tokens
+    assert route_quiz(SHORT_TEXT, 5, "Multiple Choice").max_tokens > route_quiz(SHORT_TEXT, 5, "True/False").max_tokens
+    assert route_quiz(SHORT_TEXT, 100, "Multiple Choice").max_tokens == QUIZ_MAX_TOKENS
+
+
+def test_study_pack_is_small_only_when_both_parts_are():
+    assert route_study_pack(SHORT_TEXT, "Short", 3, "Mixed").model == SMALL_MODEL
+    assert route_study_pack(SHORT_TEXT, "Medium", 3, "Mixed").model == MODEL
+    assert route_study_pack(SHORT_TEXT, "Short", 5, "Mixed").model == MODEL
+    pack = route_study_pack(SHORT_TEXT, "Medium", 5, "Mixed")
+    assert pack.max_tokens == SUMMARY_MAX_TOKENS["Medium"] + route_quiz(SHORT_TEXT, 5, "Mixed").max_tokens
+
+
+def test_section_notes_use_the_small_model():
+    assert route_section_notes(LONG_TEXT) == Route(SMALL_MODEL, SECTION_NOTES_MAX_TOKENS)
+
+
+def test_disabled_routing_uses_the_old_fixed_budgets(monkeypatch):
+    monkeypatch.setattr(routing, "ROUTING_DISABLED", True)
+    assert route_summary(SHORT_TEXT, "Very Short") == Route(MODEL, 1000)
+    assert route_quiz(SHORT_TEXT, 1, "True/False") == Route(MODEL, QUIZ_MAX_TOKENS)
+    assert route_section_notes(SHORT_TEXT).model == MODEL
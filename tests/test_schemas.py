@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from schemas import extract_json, parse_questions, parse_study_pack, repair_question
+
+
+def test_repair_keeps_a_valid_question():
+    question = {"question": "Q?", "type": "multiple_choice", "options": ["A", "B"], "answer": "B",
+                "explanation": "Because."}
+    assert repair_question(question) == question
+
+
+def test_repair_normalizes_type_spellings():
+    assert repair_question({"question": "Q?", "type": "True/False", "answer": "true"}) == {
+        "question": "Q?", "type": "true_false", "answer": "True"}
+    assert repair_question({"question": "Q _____", "type": "Fill-in-the-blank", "answer": "x"})["type"] == "fill_blank"
+
+
+def test_repair_maps_option_letters_and_casing_to_options():
+    question = {"question": "Q?", "type": "mcq", "options": ["Red", "Green", "Blue"], "answer": "(b)"}
+    assert repair_question(question)["answer"] == "Green"
+    question["answer"] = "blue"
+    assert repair_question(question)["answer"] == "Blue"
+
+
+def test_repair_adds_an_answer_missing_from_the_options():
+    repaired = repair_question({"question": "Q?", "type": "multiple_choice", "options": ["A", "B"], "answer": "C"})
+    assert sorted(repaired["options"]) == ["A", "B", "C"]
+    assert repaired["answer"] == "C"
+
+
+def test_added_answers_are_not_always_the_last_option():
+    positions = set()
+    for i in range(20):
+        repaired = repair_question({"question": f"Question {i}?", "type": "multiple_choice",
+                                    "options": ["A", "B", "C"], "answer": "D"})
+        positions.add(repaired["options"].index("D"))
+        # The same question always gets the same order
+        assert repair_question({"question": f"Question {i}?", "type": "multiple_choice",
+                                "options": ["A", "B", "C"], "answer": "D"}) == repaired
+    assert len(positions) > 1
+
+
+def test_repair_turns_multiple_choice_without_options_into_fill_blank():
+    repaired = repair_question({"question": "Q?", "type": "multiple_choice", "answer": "Mitosis"})
+    assert repaired == {"question": "Q?", "type": "fill_blank", "answer": "Mitosis"}
+
+
+def test_repair_infers_a_missing_type():
+    assert repair_question({"question": "Q?", "choices": {"a": "X", "b": "Y"}, "answer": "Y"})["type"] == \
+        "multiple_choice"
+    assert repair_question({"question": "Q?", "answer": False}) == {
+        "question": "Q?", "type": "true_false", "answer": "False"}
+
+
+@pytest.mark.parametrize("item", [
+    None,
+    "a string",
+    {"question": "Q?"},
+    {"answer": "A"},
+    {"question": "Q?", "type": "true_false", "answer": "Maybe"},
+])
+def test_repair_rejects_what_cannot_be_salvaged(item):
+    assert repair_question(item) is None
+
+
+def test_extract_json_tolerates_fences_and_chatter():
+    assert extract_json('Sure! ```json\n{"questions": []}\n``` Hope that helps.') == {"questions": []}
+    with pytest.raises(ValueError):
+        extract_json("no json here")
+
+
+def test_parse_questions_finds_nested_lists_and_counts_drops():
+    content = json.dumps({"quiz": {"items": [
+        {"question": "Q1?", "type": "true_false", "answer": "True"},
+        {"question": "Q2?"},
+    ]}})
+    questions, dropped = parse_questions(content)
+    assert [q["question"] for q in questions] == ["Q1?"]
+    assert dropped == 1
+
+
+def test_parse_study_pack():
+    content = json.dumps({"summary": " A summary. ", "questions": [
+        {"question": "Q?", "type": "fill_blank", "answer": "x"}]})
+    summary, questions = parse_study_pack(content)
+    assert summary == "A summary."
+    assert len(questions) == 1
+    assert parse_study_pack(json.dumps({"questions": []})) == ("", [])
@@ -0,0 +1,63 @@
+import numpy as np
+
+from semantic_cache import SEMANTIC_MIN_WORDS, SemanticCache, term_frequencies
+
+NOTES = ("Photosynthesis takes place in the chloroplasts of plant cells. Light energy is absorbed by "
+         "chlorophyll and used to split water, releasing oxygen. The energy is stored in ATP and NADPH, "
+         "which the Calvin cycle uses to fix carbon dioxide into glucose. ")
+OTHER = ("The French Revolution began in 1789 with the storming of the Bastille. Financial crisis, "
+         "food shortages and resentment of privilege drove the Third Estate to form a National Assembly, "
+         "which abolished feudal rights and issued the Declaration of the Rights of Man. ")
+
+
+def test_a_lightly_edited_text_is_a_hit():
+    store = SemanticCache(threshold=0.9)
+    store.set("summary:Medium", NOTES * 2, "the summary")
+    edited = (NOTES * 2).replace("releasing oxygen", "giving off oxygen")
+    assert store.get("summary:Medium", edited) == "the summary"
+
+
+def test_different_text_is_a_miss():
+    store = SemanticCache(threshold=0.9)
+    store.set("summary:Medium", NOTES * 2, "the summary")
+    store.set("summary:Medium", OTHER * 2, "other summary")
+    mixed = NOTES + OTHER
+    assert store.get("summary:Medium", mixed) is None
+    assert store.get("summary:Medium", OTHER * 2) == "other summary"
+
+
+def test_the_threshold_decides():
+    edited = NOTES.replace("Light energy is absorbed by chlorophyll", "Chlorophyll absorbs sunlight") * 2
+    loose, strict = SemanticCache(threshold=0.5), SemanticCache(threshold=0.99)
+    for store in (loose, strict):
+        store.set("summary:Medium", NOTES * 2, "the summary")
+    assert loose.get("summary:Medium", edited) == "the summary"
+    assert strict.get("summary:Medium", edited) is None
+
+
+def test_namespaces_are_separate():
+    store = SemanticCache()
+    store.set("summary:Short", NOTES * 2, "short")
+    assert store.get("summary:Long", NOTES * 2) is None
+
+
+def test_short_texts_are_never_matched():
+    store = SemanticCache(threshold=0.0)
+    short = " ".join(["word"] * (SEMANTIC_MIN_WORDS - 1))
+    store.set("summary:Medium", short, "value")
+    assert store.get("summary:Medium", short) is None
+
+
+def test_the_least_recently_used_entry_is_replaced():
+    store = SemanticCache(capacity=2)
+    third = "Mitosis divides one cell nucleus into two identical nuclei through prophase, metaphase, " * 3
+    store.set("s", NOTES * 2, "notes")
+    store.set("s", OTHER * 2, "other")
+    store.get("s", NOTES * 2)
+    store.set("s", third, "third")
+    assert [store.get("s", t) for t in (NOTES * 2, OTHER * 2, third)] == ["notes", None, "third"]
+
+
+def test_term_frequencies_are_sublinear():
+    counts = term_frequencies("cell cell cell membrane", dimensions=64)
+    assert counts.max() == np.float32(1 + np.log(3))
@@ -0,0 +1,80 @@
+import sessions
+from sessions import CompressedText, SessionData, SessionStore
+
+QUIZ = [
+    {"question": "Which gas do plants release?", "type": "multiple_choice", "explanation": "Photosynthesis.",
+     "options": ["Oxygen", "Nitrogen"], "answer": "Oxygen"},
+    {"question": "Chlorophyll is green.", "type": "true_false", "explanation": "", "answer": "True"},
+]
+
+
+def _session(summary="Plants make sugar from light. " * 20):
+    data = SessionData()
+    data.summary = summary
+    data.quiz = QUIZ
+    data.answers = {"q0": "Oxygen", "q1": None}
+    data.tips = [{"title": "Focus", "tips": ["Put the phone away"]}]
+    data.correct_answers = 1
+    data.submitted = True
+    return data
+
+
+def _same(a, b):
+    return (a.summary, a.quiz, a.answers, a.tips, a.correct_answers, a.submitted) == \
+        (b.summary, b.quiz, b.answers, b.tips, b.correct_answers, b.submitted)
+
+
+def test_long_text_is_compressed():
+    text = "Plants make sugar from light. " * 20
+    packed = CompressedText(text)
+    assert packed.compressed and packed.nbytes < len(text)
+    assert packed.text == text
+    assert not CompressedText("short").compressed
+
+
+def test_session_data_round_trips_through_json():
+    data = _session()
+    assert _same(SessionData.from_json(data.to_json()), data)
+
+
+def test_cold_sessions_spill_to_disk_and_come_back(tmp_path):
+    data = _session()
+    store = SessionStore(str(tmp_path / "sessions.sqlite3"), max_bytes=int(data.nbytes * 2.5))
+    for session_id in ("a", "b", "c"):
+        store.save(session_id, _session())
+    # Over the cap, the least recently used session went to disk
+    assert store.stats() == {"in_memory": 2, "bytes_in_memory": 2 * data.nbytes, "on_disk": 1}
+    assert "a" not in store._sessions
+    assert _same(store.get("a"), data)
+    # Saving it again brings it back into memory and off the disk
+    store.save("a", store.get("a"))
+    assert "a" in store._sessions
+    assert store.stats()["in_memory"] == 2
+
+
+def test_oversized_sessions_live_on_disk(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.sqlite3"), session_max_bytes=100)
+    store.save("big", _session())
+    assert store.stats()["in_memory"] == 0
+    assert _same(store.get("big"), _session())
+
+
+def test_spilled_sessions_survive_a_restart(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    SessionStore(path, session_max_bytes=100).save("s", _session())
+    assert _same(SessionStore(path).get("s"), _session())
+
+
+def test_unknown_sessions_are_empty(tmp_path):
+    data = SessionStore(str(tmp_path / "sessions.sqlite3")).get("nobody")
+    assert (data.summary, data.quiz, data.submitted) == ("", [], False)
+
+
+def test_abandoned_sessions_on_disk_expire(tmp_path, monkeypatch):
+    monkeypatch.setattr(sessions, "EXPIRE_EVERY", 1)
+    store = SessionStore(str(tmp_path / "sessions.sqlite3"), session_max_bytes=100, ttl_seconds=60)
+    store.save("old", _session())
+    store._conn.execute("UPDATE sessions SET accessed = 0")
+    store.save("new", _session())
+    assert store.get("old").summary == ""
+    assert store.get("new").summary
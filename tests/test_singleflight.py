@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def _start(n, target):
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def test_concurrent_calls_share_one_run():
+    flights = SingleFlight(lock_dir="", disabled=False)
+    calls = []
+    release = threading.Event()
+    results = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "done"
+
+    threads = _start(10, lambda: results.append(flights.call("op", "key", slow)))
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert results == ["done"] * 10
+    assert flights.in_flight() == 0
+
+
+def test_an_error_reaches_every_caller_and_is_not_remembered():
+    flights = SingleFlight(lock_dir="", disabled=False)
+    release = threading.Event()
+    errors = []
+
+    def failing():
+        release.wait(5)
+        raise ValueError("boom")
+
+    def caller():
+        try:
+            flights.call("op", "key", failing)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = _start(5, caller)
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert errors == ["boom"] * 5
+    # The next caller runs the function again
+    assert flights.call("op", "key", lambda: "retried") == "retried"
+
+
+def test_different_keys_run_separately():
+    flights = SingleFlight(lock_dir="", disabled=False)
+    assert flights.call("op", "a", lambda: 1) == 1
+    assert flights.call("op", "b", lambda: 2) == 2
+
+
+def test_stream_followers_get_every_item():
+    flights = SingleFlight(lock_dir="", disabled=False)
+    started = threading.Event()
+
+    def numbers():
+        started.set()
+        for i in range(5):
+            time.sleep(0.02)
+            yield i
+
+    results = []
+    threads = _start(3, lambda: results.append(list(flights.stream("op", "key", numbers))))
+    for thread in threads:
+        thread.join(5)
+    assert results == [[0, 1, 2, 3, 4]] * 3
+
+
+def test_stream_stops_once_every_caller_has_left():
+    flights = SingleFlight(lock_dir="", disabled=False)
+    produced = []
+    closed = threading.Event()
+
+    def endless():
+        try:
+            for i in range(1000):
+                produced.append(i)
+                time.sleep(0.01)
+                yield i
+        finally:
+            closed.set()
+
+    stream = flights.stream("op", "key", endless)
+    assert next(stream) == 0
+    stream.close()
+    assert closed.wait(2)
+    assert len(produced) < 1000
+    assert flights.in_flight() == 0
+
+
+def test_disabled_calls_straight_through():
+    flights = SingleFlight(lock_dir="", disabled=True)
+    with pytest.raises(KeyError):
+        flights.call("op", "key", {}.__getitem__, "missing")
+    assert list(flights.stream("op", "key", iter, [1, 2])) == [1, 2]
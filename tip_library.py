@@ -0,0 +1,210 @@
+"""
+Precomputed study-tip library.
+
+Everything on the Study Tips form except "additional info" comes from a
+fixed list of options, so tips for those fields can be generated once,
+offline, and assembled locally for each submission. The library stores
+tips per (field, option, category); assembly picks from the fields that
+feed each category.
+
+Build (or rebuild) the library with:
+
+    python tip_library.py build [--output tip_library.json] [--workers 4]
+"""
+import argparse
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from backends import get_backend
+from schemas import parse_tip_categories
+
+# Options offered by the Study Tips form
+SUBJECTS = ["Math", "Science", "History", "Literature", "Languages", "Computer Science", "Other"]
+LEARNING_STYLES = ["Visual", "Auditory", "Reading/Writing", "Kinesthetic", "I'm not sure"]
+CHALLENGES = [
+    "Staying focused",
+    "Remembering information",
+    "Understanding complex concepts",
+    "Finding motivation",
+    "Managing study time",
+    "Test anxiety",
+    "Information overload"
+]
+STUDY_TIMES = ["Less than 1 hour", "1-2 hours", "2-3 hours", "3-4 hours", "4+ hours"]
+STUDY_ENVIRONMENTS = ["At home", "Library", "Coffee shop", "School/Campus", "Different places"]
+
+FIELDS = {
+    "subject": ("Subject", SUBJECTS),
+    "learning_style": ("Learning Style", LEARNING_STYLES),
+    "challenges": ("Challenge", CHALLENGES),
+    "study_time": ("Study Time Available", STUDY_TIMES),
+    "study_environment": ("Study Environment", STUDY_ENVIRONMENTS),
+}
+
+# Tip categories, with the profile fields that contribute to each, most specific first
+CATEGORIES = {
+    "Study Environment Optimization": ["study_environment", "challenges", "learning_style"],
+    "Learning Techniques": ["subject", "learning_style", "challenges"],
+    "Memory and Retention Strategies": ["learning_style", "subject", "challenges"],
+    "Focus and Motivation Tips": ["challenges", "study_environment", "study_time"],
+    "Time Management Strategies": ["study_time", "challenges", "subject"],
+}
+
+TIPS_PER_CATEGORY = 4
+LIBRARY_PATH = os.environ.get("STUDYBUDDY_TIP_LIBRARY", "tip_library.json")
+
+
+def _field_prompt(field, option, categories):
+    label = FIELDS[field][0]
+    titles = "\n".join(f"    - {title}" for title in categories)
+    return f"""
+    Generate study tips for a student whose profile includes:
+
+    {label}: {option}
+
+    Give 3 practical, specific tips that follow from this one attribute,
+    for each of these categories:
+{titles}
+
+    Response should be in valid JSON format with this structure:
+    {{
+        "categories": [
+            {{
+                "title": "Category Name",
+                "tips": ["Specific tip 1", "Specific tip 2", "Specific tip 3"]
+            }}
+        ]
+    }}
+
+    Use the category names exactly as given.
+    """
+
+
+def build_library(path=LIBRARY_PATH, workers=4):
+    """
+    Generate the tip library with one model call per form option
+
+    Args:
+        path (str): Where to write the library JSON
+        workers (int): Number of concurrent model calls
+
+    Returns:
+        dict: The library that was written
+    """
+    jobs = []
+    for field in FIELDS:
+        categories = [title for title, fields in CATEGORIES.items() if field in fields]
+        for option in FIELDS[field][1]:
+            jobs.append((field, option, categories))
+
+    def run(job):
+        field, option, categories = job
+        content = get_backend().complete(_field_prompt(field, option, categories), max_tokens=1000, json_mode=True,
+                                      operation="tips")
+        parsed, _ = parse_tip_categories(content)
+        by_title = {category["title"].lower(): category["tips"] for category in parsed}
+        return field, option, {title: by_title.get(title.lower(), []) for title in categories}
+
+    library = {"version": 1, "fields": {field: {} for field in FIELDS}}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for field, option, tips in pool.map(run, jobs):
+            library["fields"][field][option] = tips
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(library, f, ensure_ascii=False, indent=1)
+    return library
+
+
+_library = None
+_library_lock = threading.Lock()
+
+
+def load_library(path=LIBRARY_PATH):
+    """
+    Load the tip library, once per process
+
+    Args:
+        path (str): Location of the library JSON
+
+    Returns:
+        dict: The library, or None if it hasn't been built
+    """
+    global _library
+    if _library is None:
+        with _library_lock:
+            if _library is None:
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        _library = json.load(f)
+                except (OSError, ValueError):
+                    _library = {}
+    return _library or None
+
+
+def assemble_tips(study_profile, library):
+    """
+    Build categorized tips for a profile from the precomputed library
+
+    Args:
+        study_profile (dict): User's study preferences and challenges
+        library (dict): The library from load_library()
+
+    Returns:
+        list: Categorized study tips, or None if the library doesn't cover this profile
+    """
+    fields = library["fields"]
+    result = []
+    for title, contributors in CATEGORIES.items():
+        # One list of candidate tips per contributing option, most specific field first
+        sources = []
+        for field in contributors:
+            options = study_profile[field] if field == "challenges" else [study_profile[field]]
+            for option in options:
+                tips = fields.get(field, {}).get(option, {}).get(title)
+                if tips:
+                    sources.append(tips)
+        # Take tips round-robin so every contributing option is represented
+        tips = []
+        for position in range(max((len(s) for s in sources), default=0)):
+            for source in sources:
+                if position < len(source) and source[position] not in tips:
+                    tips.append(source[position])
+        if not tips:
+            return None
+        result.append({"title": title, "tips": tips[:TIPS_PER_CATEGORY]})
+    return result
+
+
+def merge_tips(base, extra):
+    """
+    Add personalized tips to assembled ones, matching categories by title
+
+    Args:
+        base (list): Categorized tips from assemble_tips()
+        extra (list): Additional categorized tips
+
+    Returns:
+        list: The combined categories
+    """
+    merged = [{"title": c["title"], "tips": list(c["tips"])} for c in base]
+    by_title = {c["title"].lower(): c for c in merged}
+    for category in extra:
+        target = by_title.get(category["title"].lower())
+        if target is None:
+            merged.append(category)
+        else:
+            target["tips"] = category["tips"] + [t for t in target["tips"] if t not in category["tips"]]
+    return merged
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--output", default=LIBRARY_PATH)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    built = build_library(args.output, args.workers)
+    count = sum(len(options) for options in built["fields"].values())
+    print(f"Wrote tips for {count} options to {args.output}")
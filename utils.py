@@ -1,73 +1,300 @@
+import itertools
 import os
-from openai import OpenAI
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from backends import get_backend
+from cache import CACHE_DISABLED, get_cache, make_key, normalize_text
+from chunking import estimate_tokens, split_text
+from dedup import NearDuplicateFilter
+from json_stream import iter_array_objects
+from metrics import inc, timed
+from precompress import precompress
+from question_bank import get_question_bank
+from routing import route_quiz, route_section_notes, route_study_pack, route_summary
+from singleflight import get_single_flight
+from schemas import parse_questions, parse_study_pack, parse_tip_categories, repair_question
+from tip_library import assemble_tips, load_library, merge_tips
 
-# Initialize OpenAI client
-# the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
-# do not change this unless explicitly requested by the user
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-openai = OpenAI(api_key=OPENAI_API_KEY)
+# Operations whose results are also reused for near-duplicate inputs
+SEMANTIC_OPERATIONS = ("summary", "quiz")
 
-def summarize_text(text, summary_length="Medium"):
+def _semantic_cache():
+    # Imported on first use so NumPy isn't loaded before the first page renders
+    from semantic_cache import get_semantic_cache
+    return get_semantic_cache()
+
+def _cache_get(operation, text, **params):
     """
-    Summarize text using OpenAI GPT-4o
+    Look up a previous result: exact input first, then near-duplicates
     
     Args:
-        text (str): The text to summarize
-        summary_length (str): The desired length of the summary
+        operation (str): Name of the operation
+        text (str): The input text
+        **params: Other parameters the result depends on
     
     Returns:
-        str: The summarized text
+        The cached result, or None
+    """
+    value = get_cache().get(make_key(operation, text, **params))
+    result = "exact"
+    if value is None and operation in SEMANTIC_OPERATIONS and not CACHE_DISABLED:
+        value = _semantic_cache().get(make_key(operation, "", **params), text)
+        result = "semantic"
+    inc("studybuddy_cache_lookups_total", operation=operation, result=result if value is not None else "miss")
+    return value
+
+def _cache_set(operation, text, value, **params):
+    get_cache().set(make_key(operation, text, **params), value)
+    if operation in SEMANTIC_OPERATIONS and not CACHE_DISABLED:
+        _semantic_cache().set(make_key(operation, "", **params), text, value)
+
+_warm_up_started = False
+_warm_up_lock = threading.Lock()
+
+def warm_up(background=True):
+    """
+    Load the model client, the response caches and NumPy ahead of the first request
+    
+    Call this once the first page has rendered; later calls do nothing.
+    
+    Args:
+        background (bool): Run in a daemon thread instead of blocking
+    
+    Returns:
+        threading.Thread: The warm-up thread, or None if it ran inline or had already started
     """
-    # Map summary length to a descriptor and approximate word count
-    length_map = {
-        "Very Short": "extremely concise (around 100 words)",
-        "Short": "brief (around 200 words)", 
-        "Medium": "moderately detailed (around 350 words)",
-        "Detailed": "comprehensive but still summarized (around 500 words)"
-    }
+    global _warm_up_started
+    with _warm_up_lock:
+        if _warm_up_started:
+            return None
+        _warm_up_started = True
+    if not background:
+        _warm_up()
+        return None
+    thread = threading.Thread(target=_warm_up, daemon=True, name="warm-up")
+    thread.start()
+    return thread
+
+def _warm_up():
+    try:
+        get_backend()
+        get_cache()
+        if not CACHE_DISABLED:
+            _semantic_cache()
+    except Exception:
+        # Nothing is lost: the first real request sets up whatever failed and reports the error
+        pass
+
+# Map summary length to a descriptor and approximate word count
+LENGTH_MAP = {
+    "Very Short": "extremely concise (around 100 words)",
+    "Short": "brief (around 200 words)", 
+    "Medium": "moderately detailed (around 350 words)",
+    "Detailed": "comprehensive but still summarized (around 500 words)"
+}
+
+# Inputs longer than this (in tokens) are summarized section by section first
+SUMMARY_CHUNK_THRESHOLD = int(os.environ.get("STUDYBUDDY_SUMMARY_CHUNK_THRESHOLD", "6000"))
+SUMMARY_CHUNK_TOKENS = 3000
+SUMMARY_WORKERS = int(os.environ.get("STUDYBUDDY_SUMMARY_WORKERS", "4"))
+
+def _summarize_chunk(chunk):
+    # Section notes are cached on their own, so editing one part of a long
+    # document only re-summarizes the sections that changed
+    cached = _cache_get("summary_chunk", chunk)
+    if cached is not None:
+        return cached
     
     prompt = f"""
-    Summarize the following text in a {length_map[summary_length]} summary.
+    The following text is one section of a longer document.
+    Write concise notes on its key concepts, main ideas, and important details
+    so they can be combined with the notes from the other sections.
+    
+    SECTION:
+    {chunk}
+    """
+    route = route_section_notes(chunk)
+    notes = get_backend().complete(prompt, max_tokens=route.max_tokens, temperature=0.3, model=route.model,
+                                   operation="summary_chunk")
+    _cache_set("summary_chunk", chunk, notes)
+    return notes
+
+def _summarize_chunks(chunks):
+    # Keep only a bounded window of chunks in flight so a long stream of
+    # chunks never has to be held in memory all at once
+    notes = []
+    with ThreadPoolExecutor(max_workers=SUMMARY_WORKERS) as pool:
+        window = deque()
+        for chunk in chunks:
+            window.append(pool.submit(_summarize_chunk, chunk))
+            if len(window) >= SUMMARY_WORKERS * 2:
+                notes.append(window.popleft().result())
+        while window:
+            notes.append(window.popleft().result())
+    return notes
+
+def condense_for_summary(text, operation="summary"):
+    """
+    Map step for long inputs: drop boilerplate and repeated sentences
+    locally, then summarize chunks in parallel until the combined notes fit
+    in a single summary prompt
+    
+    Nothing is trimmed by ranking here, so every part of a long input still
+    reaches the summary through its section notes. A text that is still too
+    long is chunked before it is cleaned up, one chunk at a time, so an edit
+    only changes the chunks it touches and the other section notes come
+    from the cache.
+    
+    Args:
+        text (str): The text to summarize
+        operation (str): What the text is for, for metrics
+    
+    Returns:
+        str: The deduplicated text if it is short enough, otherwise the joined section notes
+    """
+    condensed = precompress(text, max_tokens=None, operation=operation).text
+    if estimate_tokens(condensed) <= SUMMARY_CHUNK_THRESHOLD:
+        return condensed
+    chunks = (precompress(chunk, max_tokens=None, operation=operation).text
+              for chunk in split_text(text, SUMMARY_CHUNK_TOKENS))
+    text = "\n\n".join(_summarize_chunks(chunks))
+    while estimate_tokens(text) > SUMMARY_CHUNK_THRESHOLD:
+        text = "\n\n".join(_summarize_chunks(split_text(text, SUMMARY_CHUNK_TOKENS)))
+    return text
+
+def condense_chunks(chunks):
+    """
+    Turn a stream of document chunks into text small enough for one prompt
+    
+    Short documents come back unchanged. Longer ones are summarized chunk
+    by chunk as the chunks are read, and the section notes are returned.
+    
+    Args:
+        chunks (iterable): Chunks of the document, e.g. from ingest.iter_chunks()
+    
+    Returns:
+        str: Text to pass to summarize_text or generate_quiz
+    """
+    chunks = iter(chunks)
+    head = []
+    total = 0
+    for chunk in chunks:
+        head.append(chunk)
+        total += estimate_tokens(chunk)
+        if total > SUMMARY_CHUNK_THRESHOLD:
+            break
+    else:
+        return "\n\n".join(head)
+    notes = _summarize_chunks(itertools.chain(head, chunks))
+    return condense_for_summary("\n\n".join(notes))
+
+def summary_prompt(text, summary_length):
+    """
+    Args:
+        text (str): The text to summarize (already short enough for one prompt)
+        summary_length (str): Summary length option
+    
+    Returns:
+        str: The summary prompt
+    """
+    return f"""
+    Summarize the following text in a {LENGTH_MAP[summary_length]} summary.
     Focus on the key concepts, main ideas, and important details.
     Use clear, straightforward language suitable for a student.
     
     TEXT TO SUMMARIZE:
     {text}
     """
+
+@timed("summary")
+def summarize_text(text, summary_length="Medium"):
+    """
+    Summarize text using OpenAI GPT-4o
+    
+    Args:
+        text (str): The text to summarize
+        summary_length (str): The desired length of the summary
+    
+    Returns:
+        str: The summarized text
+    """
+    # Identical requests in flight from other sessions share one call
+    key = make_key("summary", text, summary_length=summary_length)
+    return get_single_flight().call("summary", key, _summarize_text, text, summary_length)
+
+def _summarize_text(text, summary_length):
+    # Reuse a previous summary of the same (or nearly the same) text if we have one
+    cached = _cache_get("summary", text, summary_length=summary_length)
+    if cached is not None:
+        return cached
     
     try:
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=1000
-        )
-        return response.choices[0].message.content
+        condensed = condense_for_summary(text)
+        route = route_summary(condensed, summary_length)
+        summary = get_backend().complete(summary_prompt(condensed, summary_length), max_tokens=route.max_tokens,
+                                         model=route.model, operation="summary")
+        _cache_set("summary", text, summary, summary_length=summary_length)
+        return summary
     except Exception as e:
-        raise Exception(f"Error generating summary: {str(e)}")
+        raise Exception(f"Error generating summary: {str(e)}") from e
 
-def generate_quiz(text, num_questions=5, question_type="Mixed"):
+@timed("summary_stream")
+def summarize_text_stream(text, summary_length="Medium"):
     """
-    Generate quiz questions from text using OpenAI GPT-4o
+    Summarize text using OpenAI GPT-4o, yielding the summary as it is generated
     
+    Args:
+        text (str): The text to summarize
+        summary_length (str): The desired length of the summary
+    
+    Yields:
+        str: Pieces of the summary in order; joined they form the full summary
+    """
+    key = make_key("summary_stream", text, summary_length=summary_length)
+    yield from get_single_flight().stream("summary_stream", key, _summarize_text_stream, text, summary_length)
+
+def _summarize_text_stream(text, summary_length):
+    # A cached summary is returned in one piece
+    cached = _cache_get("summary", text, summary_length=summary_length)
+    if cached is not None:
+        yield cached
+        return
+    
+    try:
+        condensed = condense_for_summary(text)
+        route = route_summary(condensed, summary_length)
+        parts = []
+        for delta in get_backend().stream(summary_prompt(condensed, summary_length), max_tokens=route.max_tokens,
+                                          model=route.model, operation="summary"):
+            parts.append(delta)
+            yield delta
+    except Exception as e:
+        raise Exception(f"Error generating summary: {str(e)}") from e
+    
+    # Only cache summaries that streamed to completion
+    _cache_set("summary", text, "".join(parts), summary_length=summary_length)
+
+# Map question types to descriptions
+TYPE_MAP = {
+    "Multiple Choice": "multiple-choice questions with 4 options each",
+    "True/False": "true/false questions",
+    "Fill in the Blank": "fill-in-the-blank questions",
+    "Mixed": "a mix of multiple-choice, true/false, and fill-in-the-blank questions"
+}
+
+def quiz_prompt(text, num_questions, question_type):
+    """
     Args:
         text (str): The text to generate questions from
-        num_questions (int): Number of questions to generate
-        question_type (str): Type of questions to generate
+        num_questions (int): Number of questions to ask for
+        question_type (str): Question type option
     
     Returns:
-        list: List of question dictionaries
+        str: The quiz prompt
     """
-    # Map question types to descriptions
-    type_map = {
-        "Multiple Choice": "multiple-choice questions with 4 options each",
-        "True/False": "true/false questions",
-        "Fill in the Blank": "fill-in-the-blank questions",
-        "Mixed": "a mix of multiple-choice, true/false, and fill-in-the-blank questions"
-    }
-    
-    prompt = f"""
-    Create {num_questions} educational {type_map[question_type]} based on the following text.
+    return f"""
+    Create {num_questions} educational {TYPE_MAP[question_type]} based on the following text.
     Make sure the questions test understanding of key concepts rather than trivial details.
     For each question, provide the correct answer and a brief explanation.
     
@@ -99,32 +326,471 @@ def generate_quiz(text, num_questions=5, question_type="Mixed"):
     TEXT FOR QUIZ:
     {text}
     """
+
+# Largest number of questions one fan-out request is asked for
+QUIZ_FAN_OUT_SIZE = 3
+QUIZ_WORKERS = int(os.environ.get("STUDYBUDDY_QUIZ_WORKERS", "4"))
+# Questions at least this similar (shingled Jaccard) count as duplicates
+QUIZ_DUPLICATE_THRESHOLD = 0.7
+# Most follow-up requests made to replace dropped or duplicate questions
+QUIZ_TOP_UP_ATTEMPTS = 3
+
+def _repair_streamed(question):
+    # Questions parsed one at a time skip parse_questions, so count drops here
+    repaired = repair_question(question)
+    if repaired is None:
+        inc("studybuddy_parse_dropped_items_total", kind="quiz")
+    return repaired
+
+def parse_quiz(content):
+    """
+    Parse a quiz response, repairing what we can and dropping what we can't
+    
+    Args:
+        content (str): The model's JSON response
+    
+    Returns:
+        list: The valid question dictionaries
+    
+    Raises:
+        ValueError: If no question could be recovered
+    """
+    questions, _ = parse_questions(content)
+    if not questions:
+        raise ValueError("Invalid response format from API")
+    return questions
+
+def _missing_questions(text, questions, num_questions, question_type):
+    """
+    Request only the questions a salvaged response is short of, asking
+    again (up to QUIZ_TOP_UP_ATTEMPTS times) while duplicates keep it short
     
+    Args:
+        text (str): The text to generate questions from
+        questions (list): The valid questions we already have
+        num_questions (int): Number of questions wanted in total
+        question_type (str): Type of questions to generate
+    
+    Returns:
+        list: Up to num_questions - len(questions) new, non-duplicate questions
+    """
+    seen = NearDuplicateFilter(QUIZ_DUPLICATE_THRESHOLD)
+    for question in questions:
+        seen.add(question["question"])
+    found = []
+    for _ in range(QUIZ_TOP_UP_ATTEMPTS):
+        shortfall = num_questions - len(questions) - len(found)
+        if shortfall <= 0:
+            break
+        route = route_quiz(text, shortfall, question_type)
+        try:
+            content = get_backend().complete(quiz_prompt(text, shortfall, question_type),
+                                             max_tokens=route.max_tokens, json_mode=True, model=route.model,
+                                             operation="quiz")
+        except Exception:
+            # Keep what earlier attempts found
+            if not found:
+                raise
+            break
+        try:
+            extra, _ = parse_questions(content)
+        except ValueError:
+            continue
+        found += [q for q in extra if seen.add(q["question"])][:shortfall]
+    return found
+
+def _banked_questions(text, num_questions, question_type):
+    # Questions already written for this material, so only the rest are generated
+    if CACHE_DISABLED:
+        return []
+    return get_question_bank().find(text, num_questions, question_type)
+
+def _repeat_quiz(text, cached, num_questions, question_type):
+    """
+    Serve a quiz that is already cached again, rotating in banked questions
+    
+    The exact cache would otherwise hand back the same questions every time
+    ("Take Another Quiz" on the same notes) for as long as it keeps them.
+    The bank returns its least-served questions first, so while it holds
+    questions beyond the cached ones, each repeat shows some new ones.
+    
+    Args:
+        text (str): The text the quiz is on
+        cached (list): The cached quiz
+        num_questions (int): Number of questions wanted
+        question_type (str): Type of questions
+    
+    Returns:
+        list: The quiz to serve
+    """
+    banked = _banked_questions(text, num_questions, question_type)
+    served = {normalize_text(q["question"]).lower() for q in cached}
+    if all(normalize_text(q["question"]).lower() in served for q in banked):
+        return cached
+    seen = NearDuplicateFilter(QUIZ_DUPLICATE_THRESHOLD)
+    for question in banked:
+        seen.add(question["question"])
+    return banked + [q for q in cached if seen.add(q["question"])][:num_questions - len(banked)]
+
+def _bank_questions(text, questions):
+    if not CACHE_DISABLED and questions:
+        get_question_bank().add(text, questions)
+
+def _fan_out_plan(text, num_questions, question_type):
+    """
+    Split one quiz request into smaller independent requests
+    
+    Mixed quizzes get one request per question type. Other quizzes get one
+    request per section of the source text, when the text is long enough to
+    split. Each request asks for one extra question so duplicates can be
+    dropped without running short.
+    
+    Args:
+        text (str): The text to generate questions from
+        num_questions (int): Number of questions wanted in total
+        question_type (str): Type of questions to generate
+    
+    Returns:
+        list: (text, num_questions, question_type) tuples, one per request
+    """
+    if question_type == "Mixed":
+        types = ["Multiple Choice", "True/False", "Fill in the Blank"]
+        counts = [num_questions // 3 + (1 if i < num_questions % 3 else 0) for i in range(3)]
+        return [(text, count + 1, qtype) for qtype, count in zip(types, counts) if count]
+    
+    groups = -(-num_questions // QUIZ_FAN_OUT_SIZE)
+    sections = split_text(text, estimate_tokens(text) // groups + 1) if groups > 1 else [text]
+    if len(sections) < 2:
+        return [(text, num_questions, question_type)]
+    # Merge any surplus sections so there is one per request
+    per_group = -(-len(sections) // groups)
+    sections = ["\n\n".join(sections[i:i + per_group]) for i in range(0, len(sections), per_group)]
+    base, extra = divmod(num_questions, len(sections))
+    return [
+        (section, base + (1 if i < extra else 0) + 1, question_type)
+        for i, section in enumerate(sections)
+    ]
+
+def _fan_out_questions(text, num_questions, question_type):
+    """
+    Run the fan-out requests concurrently and yield unique questions as
+    each request finishes, stopping at num_questions
+    
+    Args:
+        text (str): The text to generate questions from
+        num_questions (int): Number of questions to generate
+        question_type (str): Type of questions to generate
+    
+    Yields:
+        dict: Question dictionaries in completion order
+    """
+    seen = NearDuplicateFilter(QUIZ_DUPLICATE_THRESHOLD)
+    produced = []
+    errors = []
+    
+    def take(questions):
+        for question in questions:
+            question = _repair_streamed(question)
+            if len(produced) < num_questions and question and seen.add(question["question"]):
+                produced.append(question)
+                yield question
+    
+    plan = _fan_out_plan(text, num_questions, question_type)
+    pool = ThreadPoolExecutor(max_workers=QUIZ_WORKERS)
     try:
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            response_format={"type": "json_object"},
-            max_tokens=2000
-        )
-        
-        import json
-        result = json.loads(response.choices[0].message.content)
-        
-        # Ensure it's a list
-        if not isinstance(result, list):
-            if "questions" in result:
-                # Sometimes the model might nest the questions
-                return result["questions"]
+        # No top-up per request: a short request would cost a second round trip on the
+        # critical path, so the shortfall is made up once, after merging
+        futures = [
+            pool.submit(_quiz_questions, *request, use_bank=False, compress=False, top_up=False)
+            for request in plan
+        ]
+        for future in as_completed(futures):
+            try:
+                yield from take(future.result())
+            except Exception as e:
+                errors.append(e)
+            if len(produced) >= num_questions:
+                return
+    finally:
+        # Don't hold the caller up for requests we no longer need
+        pool.shutdown(wait=False, cancel_futures=True)
+    
+    # Top up from the whole text if short answers, duplicates or failures left us short
+    if len(produced) < num_questions:
+        try:
+            yield from take(_missing_questions(text, list(produced), num_questions, question_type))
+        except Exception as e:
+            errors.append(e)
+    if not produced and errors:
+        raise errors[0]
+
+@timed("quiz")
+def generate_quiz(text, num_questions=5, question_type="Mixed", parallel=False):
+    """
+    Generate quiz questions from text using OpenAI GPT-4o
+    
+    Args:
+        text (str): The text to generate questions from
+        num_questions (int): Number of questions to generate
+        question_type (str): Type of questions to generate
+        parallel (bool): Split the quiz into several concurrent smaller requests
+    
+    Returns:
+        list: List of question dictionaries
+    """
+    if parallel:
+        return list(generate_quiz_stream(text, num_questions, question_type, parallel=True))
+    
+    key = make_key("quiz", text, num_questions=num_questions, question_type=question_type)
+    return get_single_flight().call("quiz", key, _generate_quiz, text, num_questions, question_type)
+
+def _generate_quiz(text, num_questions, question_type):
+    try:
+        return _quiz_questions(text, num_questions, question_type)
+    except Exception as e:
+        raise Exception(f"Error generating quiz: {str(e)}") from e
+
+def _quiz_questions(text, num_questions, question_type, use_bank=True, compress=True, top_up=True):
+    # Reuse a previous quiz for the same (or nearly the same) text and options if we have one
+    cached = _cache_get("quiz", text, num_questions=num_questions, question_type=question_type)
+    if cached is not None:
+        return _repeat_quiz(text, cached, num_questions, question_type) if use_bank else cached
+    
+    banked = _banked_questions(text, num_questions, question_type) if use_bank else []
+    result = list(banked)
+    shortfall = num_questions - len(result)
+    if shortfall > 0:
+        source = precompress(text, operation="quiz").text if compress else text
+        route = route_quiz(source, shortfall, question_type)
+        content = get_backend().complete(quiz_prompt(source, shortfall, question_type), max_tokens=route.max_tokens,
+                                         json_mode=True, model=route.model, operation="quiz")
+        try:
+            generated, _ = parse_questions(content)
+        except ValueError:
+            generated = []
+        if banked:
+            seen = NearDuplicateFilter(QUIZ_DUPLICATE_THRESHOLD)
+            for question in banked:
+                seen.add(question["question"])
+            generated = [q for q in generated if seen.add(q["question"])]
+        result += generated[:shortfall]
+        if top_up:
+            result += _missing_questions(source, result, num_questions, question_type)
+    if not result:
+        raise ValueError("Invalid response format from API")
+    _bank_questions(text, result[len(banked):])
+    # A short quiz (left for the caller to top up) isn't cached
+    if len(result) >= num_questions:
+        _cache_set("quiz", text, result, num_questions=num_questions, question_type=question_type)
+    return result
+
+@timed("quiz_stream")
+def generate_quiz_stream(text, num_questions=5, question_type="Mixed", parallel=False):
+    """
+    Generate quiz questions from text using OpenAI GPT-4o, yielding each
+    question as soon as the model has finished writing it
+    
+    Args:
+        text (str): The text to generate questions from
+        num_questions (int): Number of questions to generate
+        question_type (str): Type of questions to generate
+        parallel (bool): Split the quiz into several concurrent smaller requests
+            and yield questions, minus near-duplicates, as each one finishes
+    
+    Yields:
+        dict: Question dictionaries in order
+    """
+    key = make_key("quiz_stream", text, num_questions=num_questions, question_type=question_type, parallel=parallel)
+    yield from get_single_flight().stream(
+        "quiz_stream", key, _generate_quiz_stream, text, num_questions, question_type, parallel
+    )
+
+def _generate_quiz_stream(text, num_questions, question_type, parallel):
+    # A cached quiz is replayed straight away
+    params = {"num_questions": num_questions, "question_type": question_type}
+    if parallel:
+        params["parallel"] = True
+    cached = _cache_get("quiz", text, **params)
+    if cached is not None:
+        yield from _repeat_quiz(text, cached, num_questions, question_type)
+        return
+    
+    # Start with questions from the bank; generate only the shortfall
+    banked = _banked_questions(text, num_questions, question_type)
+    questions = list(banked)
+    yield from banked
+    shortfall = num_questions - len(questions)
+    try:
+        if shortfall > 0:
+            prompt_text = precompress(text, operation="quiz").text
+            if parallel:
+                source = _fan_out_questions(prompt_text, shortfall, question_type)
             else:
-                # Or create a new list with appropriate structure
-                raise ValueError("Invalid response format from API")
-        
-        return result
+                route = route_quiz(prompt_text, shortfall, question_type)
+                deltas = get_backend().stream(quiz_prompt(prompt_text, shortfall, question_type),
+                                              max_tokens=route.max_tokens, json_mode=True, model=route.model,
+                                              operation="quiz")
+                source = (q for q in map(_repair_streamed, iter_array_objects(deltas)) if q)
+            seen = NearDuplicateFilter(QUIZ_DUPLICATE_THRESHOLD)
+            for question in banked:
+                seen.add(question["question"])
+            for question in source:
+                # Skip anything the bank already supplied
+                if banked and not seen.add(question["question"]):
+                    continue
+                if len(questions) < num_questions:
+                    questions.append(question)
+                    yield question
+            if not parallel:
+                # Top up if some questions had to be dropped
+                for question in _missing_questions(prompt_text, questions, num_questions, question_type):
+                    questions.append(question)
+                    yield question
+    except Exception as e:
+        raise Exception(f"Error generating quiz: {str(e)}") from e
+    
+    if not questions:
+        raise Exception("Error generating quiz: Invalid response format from API")
+    _bank_questions(text, questions[len(banked):])
+    _cache_set("quiz", text, questions, **params)
+
+def _study_pack_prompt(text, summary_length, num_questions, question_type):
+    return f"""
+    Write a study pack for the following text, in two parts.
+    
+    1. Summarize the text in a {LENGTH_MAP[summary_length]} summary.
+    Focus on the key concepts, main ideas, and important details.
+    Use clear, straightforward language suitable for a student.
+    
+    2. Create {num_questions} educational {TYPE_MAP[question_type]} based on the text.
+    Make sure the questions test understanding of key concepts rather than trivial details.
+    For each question, provide the correct answer and a brief explanation.
+    
+    Response should be in valid JSON format with this structure:
+    {{
+        "summary": "The summary text",
+        "questions": [
+            {{
+                "question": "Question text",
+                "type": "multiple_choice",
+                "options": ["Option A", "Option B", "Option C", "Option D"],
+                "answer": "Option A",
+                "explanation": "Brief explanation of why this is correct"
+            }},
+            {{
+                "question": "True/False question text",
+                "type": "true_false",
+                "answer": "True",
+                "explanation": "Brief explanation of why this is correct"
+            }},
+            {{
+                "question": "Fill in the blank: _____ is a key concept.",
+                "type": "fill_blank",
+                "answer": "Answer",
+                "explanation": "Brief explanation of why this is correct"
+            }}
+        ]
+    }}
+    
+    Note: The structure for each question should match its type, and only include relevant fields.
+    
+    TEXT:
+    {text}
+    """
+
+@timed("pack")
+def generate_study_pack(text, summary_length="Medium", num_questions=5, question_type="Mixed"):
+    """
+    Summarize text and generate a quiz on it with a single OpenAI request
+    
+    The summary and quiz are cached as if summarize_text and generate_quiz
+    had made them, so either can be fetched on its own later.
+    
+    Args:
+        text (str): The text to summarize and quiz on
+        summary_length (str): The desired length of the summary
+        num_questions (int): Number of questions to generate
+        question_type (str): Type of questions to generate
+    
+    Returns:
+        dict: {"summary": str, "quiz": list of question dictionaries}
+    """
+    key = make_key("pack", text, summary_length=summary_length, num_questions=num_questions,
+                   question_type=question_type)
+    return get_single_flight().call(
+        "pack", key, _generate_study_pack, text, summary_length, num_questions, question_type
+    )
+
+def _generate_study_pack(text, summary_length, num_questions, question_type):
+    # With one half already cached, only the other half needs a request
+    summary = _cache_get("summary", text, summary_length=summary_length)
+    if summary is not None:
+        return {"summary": summary, "quiz": generate_quiz(text, num_questions, question_type)}
+    quiz = _cache_get("quiz", text, num_questions=num_questions, question_type=question_type)
+    if quiz is not None:
+        return {"summary": summarize_text(text, summary_length), "quiz": quiz}
+    
+    banked = _banked_questions(text, num_questions, question_type)
+    shortfall = num_questions - len(banked)
+    if shortfall <= 0:
+        _cache_set("quiz", text, banked, num_questions=num_questions, question_type=question_type)
+        return {"summary": summarize_text(text, summary_length), "quiz": banked}
+    
+    try:
+        condensed = condense_for_summary(text, operation="pack")
+        route = route_study_pack(condensed, summary_length, shortfall, question_type)
+        content = get_backend().complete(_study_pack_prompt(condensed, summary_length, shortfall, question_type),
+                                         max_tokens=route.max_tokens, json_mode=True, model=route.model,
+                                         operation="pack")
+        try:
+            summary, generated = parse_study_pack(content)
+        except ValueError:
+            summary, generated = "", []
+        if banked:
+            seen = NearDuplicateFilter(QUIZ_DUPLICATE_THRESHOLD)
+            for question in banked:
+                seen.add(question["question"])
+            generated = [q for q in generated if seen.add(q["question"])]
+        quiz = banked + generated[:shortfall]
+        quiz += _missing_questions(condensed, quiz, num_questions, question_type)
+        if not quiz:
+            raise ValueError("Invalid response format from API")
     except Exception as e:
-        raise Exception(f"Error generating quiz: {str(e)}")
+        raise Exception(f"Error generating study pack: {str(e)}") from e
+    
+    _bank_questions(text, quiz[len(banked):])
+    _cache_set("quiz", text, quiz, num_questions=num_questions, question_type=question_type)
+    if summary:
+        _cache_set("summary", text, summary, summary_length=summary_length)
+    else:
+        # The quiz came through but the summary didn't: ask for it on its own
+        summary = summarize_text(text, summary_length)
+    return {"summary": summary, "quiz": quiz}
+
+def grade_quiz(quiz, answers):
+    """
+    Grade a student's answers to a quiz
+    
+    Args:
+        quiz (list): Question dictionaries from generate_quiz
+        answers (list): The student's answer to each question, in order (None if unanswered)
+    
+    Returns:
+        tuple: (number correct, list of True/False per question)
+    """
+    results = []
+    for q, answer in zip(quiz, answers):
+        if answer is None:
+            results.append(False)
+        elif q['type'] == 'multiple_choice':
+            results.append(answer == q['answer'])
+        else:
+            # True/false and fill-in-the-blank ignore case and surrounding spaces
+            results.append(str(answer).strip().lower() == str(q['answer']).strip().lower())
+    results += [False] * (len(quiz) - len(results))
+    return sum(results), results
 
+@timed("tips")
 def generate_study_tips(study_profile):
     """
     Generate personalized study tips based on user profile using OpenAI GPT-4o
@@ -135,6 +801,19 @@ def generate_study_tips(study_profile):
     Returns:
         list: Categorized study tips
     """
+    # The structured fields are covered by the precomputed tip library, so
+    # the model is only needed to personalize for the free-text notes
+    library = load_library()
+    base = assemble_tips(study_profile, library) if library else None
+    if base is not None and not study_profile["additional_info"].strip():
+        return base
+    
+    # Identical requests in flight from other sessions share one call
+    profile_key = dict(study_profile, challenges=sorted(study_profile["challenges"]))
+    key = make_key("tips", study_profile["additional_info"], study_profile=profile_key)
+    return get_single_flight().call("tips", key, _personalized_tips, study_profile, base)
+
+def _personalized_tips(study_profile, base):
     prompt = f"""
     Generate personalized study tips and strategies for a student with the following profile:
     
@@ -168,27 +847,53 @@ def generate_study_tips(study_profile):
     Each category should have 3-5 actionable tips.
     """
     
+    if base is not None:
+        base_tips = "\n".join(f"    {c['title']}: " + " | ".join(c["tips"]) for c in base)
+        prompt = f"""
+    A student has these study tips, chosen from their profile:
+    
+{base_tips}
+    
+    They also told us: {study_profile['additional_info']}
+    
+    Write 1-2 extra practical, specific tips for each category that address
+    what they told us. Don't repeat the existing tips. Use the category names
+    exactly as given.
+    
+    Response should be in valid JSON format with this structure:
+    {{
+        "categories": [
+            {{
+                "title": "Category Name",
+                "tips": ["Specific tip 1", "Specific tip 2"]
+            }}
+        ]
+    }}
+    """
+    
+    # Reuse tips generated for an identical profile if we have them
+    profile_key = dict(study_profile, challenges=sorted(study_profile["challenges"]))
+    cached = _cache_get("tips", study_profile["additional_info"], study_profile=profile_key)
+    if cached is not None:
+        return cached
+    
     try:
-        response = openai.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            response_format={"type": "json_object"},
-            max_tokens=2000
-        )
-        
-        import json
-        result = json.loads(response.choices[0].message.content)
-        
-        # Ensure it's a list
-        if not isinstance(result, list):
-            if "categories" in result:
-                # Sometimes the model might nest the categories
-                return result["categories"]
-            else:
-                # Or create a new list with appropriate structure
-                raise ValueError("Invalid response format from API")
+        result = []
+        # Salvage whatever categories are usable; only ask again if none are
+        for attempt in range(2):
+            content = get_backend().complete(prompt, max_tokens=2000, json_mode=True, operation="tips")
+            try:
+                result, _ = parse_tip_categories(content)
+            except ValueError:
+                result = []
+            if result:
+                break
+        if not result:
+            raise ValueError("Invalid response format from API")
+        if base is not None:
+            result = merge_tips(base, result)
         
+        _cache_set("tips", study_profile["additional_info"], result, study_profile=profile_key)
         return result
     except Exception as e:
-        raise Exception(f"Error generating study tips: {str(e)}")
+        raise Exception(f"Error generating study tips: {str(e)}") from e